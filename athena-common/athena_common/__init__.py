@@ -0,0 +1,40 @@
+from athena_common.errors import (
+    AdmissionRejectedError,
+    AthenaError,
+    AthenaThrottledError,
+    InvalidColumnsError,
+    QueryCancelledError,
+    QueryFailedError,
+    QueryTimeoutError,
+)
+from athena_common.admission import BATCH, INTERACTIVE, AdmissionController, QueueClass, admission_from_env
+from athena_common.cache import (
+    DynamoCacheIndex,
+    MemoryCacheIndex,
+    ResultCache,
+    S3CacheIndex,
+    cache_from_env,
+    query_hash,
+    reaches_today,
+)
+from athena_common.decoder import ResultSetDecoder, arrow_type, decode_rows, iter_records, result_schema
+from athena_common.delivery import copy_s3_object, deliver_athena_output, use_server_side_copy
+from athena_common.executor import AthenaExecutor, BackoffPolicy
+from athena_common.formats import FORMATS, OutputFormat, output_format
+from athena_common.jobs import (
+    FAILED,
+    RUNNING,
+    SUCCEEDED,
+    DynamoJobIndex,
+    JobStore,
+    MemoryJobIndex,
+    complete_job,
+    jobs_from_env,
+)
+from athena_common.partitions import PartitionLayout, resolve_layout
+from athena_common.projection import ColumnProjection, resolve_projection, select_list
+from athena_common.results import ResultReader, S3RangeStream
+from athena_common.sharding import ShardedExport, iter_manifest_batches, merge_intervals, split_range
+from athena_common.singleflight import DynamoLeaseIndex, MemoryLeaseIndex, SingleFlight, single_flight_from_env
+from athena_common.unload import UNLOAD_FORMATS, UnloadExport, count_query, unload_query
+from athena_common.writers import S3MultipartWriter, write_json
@@ -0,0 +1,222 @@
+import os
+import time
+import uuid
+import random
+
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+from athena_common.errors import AdmissionRejectedError
+from athena_common.singleflight import DynamoLeaseIndex
+
+logger = Logger(service="AthenaAdmission")
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+FINISHED_STATES = ("SUCCEEDED", "FAILED", "CANCELLED")
+
+
+class QueueClass:
+    """Wait policy of one priority class: how many callers may wait, for how long, polling how often."""
+
+    def __init__(self, max_waiting: int, max_wait: float, poll_interval: float):
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+
+
+DEFAULT_CLASSES = {
+    INTERACTIVE: QueueClass(max_waiting=50, max_wait=10.0, poll_interval=0.25),
+    BATCH: QueueClass(max_waiting=10, max_wait=60.0, poll_interval=1.0),
+}
+
+
+class AdmissionController:
+    """
+    Distributed cap on running Athena queries: `capacity` slots (the
+    workgroup's active-query quota, minus headroom for other clients), each
+    a lease in the lease table. A caller holds a slot from just before
+    start_query_execution until its query finishes.
+
+    - A slot is free when empty, expired, or its query already finished
+      (checked with one BatchGetQueryExecution when all slots look taken),
+      so slots of asynchronous jobs or of crashed callers come back.
+    - The last `reserved` free slots only go to interactive requests.
+    - Callers that find no slot wait in a bounded queue per class (also
+      leases): interactive waits shortly and polls often, batch waits
+      longer. A full queue or an exhausted wait raises
+      AdmissionRejectedError instead of piling onto Athena.
+    - Slots go first come, first served: a caller (queued or new) only
+      takes a free slot that the waiters who arrived before it cannot use.
+    """
+
+    def __init__(self, index, client=None, capacity: int = 20, reserved: int = 0, classes: dict = None,
+                 start_timeout: int = 60, lease_seconds: int = 1800,
+                 sleep=time.sleep, clock=time.time, rng=None):
+        self.index = index
+        self.client = client or boto3.client("athena")
+        self.capacity = capacity
+        self.reserved = min(reserved, capacity - 1)
+        self.classes = classes or DEFAULT_CLASSES
+        # a slot not bound to a query within start_timeout is free again
+        self.start_timeout = start_timeout
+        self.lease_seconds = lease_seconds
+        self._sleep = sleep
+        self._clock = clock
+        self._rng = rng or random.Random()
+
+    def _slots(self) -> list:
+        return [f"slot#{n}" for n in range(self.capacity)]
+
+    def acquire(self, priority: str = INTERACTIVE) -> tuple:
+        """
+        Returns:
+            tuple: The slot (key, owner); pass it to attach() and release().
+                None when the lease table is unavailable (the query goes
+                ahead unmetered rather than failing).
+
+        Raises:
+            AdmissionRejectedError: Wait queue full, or no slot within max_wait.
+        """
+        queue_class = self.classes[priority]
+        # the arrival time orders the waiters
+        owner = f"{self._clock():.6f}-{uuid.uuid4().hex}"
+        deadline = self._clock() + queue_class.max_wait
+        waiting = None
+        try:
+            while True:
+                slot = self._take(owner, priority)
+                if slot:
+                    return slot
+                if waiting is None:
+                    waiting = self._enqueue(owner, priority, deadline)
+                if self._clock() >= deadline:
+                    raise AdmissionRejectedError(
+                        f"No Athena slot for a {priority} query within {queue_class.max_wait}s")
+                self._sleep(queue_class.poll_interval * (0.5 + self._rng.random()))
+        except ClientError as e:
+            logger.warning(f"Admission table unavailable, starting the query without a slot: {e}")
+            return None
+        finally:
+            if waiting:
+                self.release((waiting, owner))
+
+    def _queues(self) -> list:
+        return [f"fila#{priority}#{n}" for priority, queue_class in self.classes.items()
+                for n in range(queue_class.max_waiting)]
+
+    def _take(self, owner: str, priority: str):
+        now = self._clock()
+        keys = self._slots()
+        leases = self.index.get_many(keys + self._queues(), now)
+        slots = {key: lease for key, lease in leases.items() if key.startswith("slot#")}
+        candidates = [(key, None) for key in keys if key not in slots]
+        if not candidates:
+            candidates = list(self._finished(slots).items())
+        if len(candidates) <= self._held_back(leases, owner, priority, len(candidates)):
+            return None
+        self._rng.shuffle(candidates)
+        for key, query_execution_id in candidates:
+            if self.index.acquire(key, owner, int(now + self.start_timeout), now, replacing=query_execution_id):
+                return key, owner
+        return None
+
+    def _held_back(self, leases: dict, owner: str, priority: str, free: int) -> int:
+        """
+        How many of the `free` slots `owner` must leave alone: those the
+        earlier waiters will take, plus the reserve for a batch caller.
+        """
+        ticket = _ticket(owner)
+        interactive = other = 0
+        for key, lease in leases.items():
+            if key.startswith("fila#") and lease["dono"] != owner and _ticket(lease["dono"]) < ticket:
+                if key.startswith(f"fila#{INTERACTIVE}#"):
+                    interactive += 1
+                else:
+                    other += 1
+        if priority != INTERACTIVE:
+            return interactive + other + self.reserved
+        # earlier batch waiters can only use what is left above the reserve
+        return interactive + min(other, max(0, free - interactive - self.reserved))
+
+    def _finished(self, leases: dict) -> dict:
+        """Slots whose query already finished: {slot key: QueryExecutionId}."""
+        by_query = {lease["query_execution_id"]: key for key, lease in leases.items() if lease["query_execution_id"]}
+        finished = {}
+        ids = list(by_query)
+        for start in range(0, len(ids), 50):
+            try:
+                response = self.client.batch_get_query_execution(QueryExecutionIds=ids[start:start + 50])
+            except ClientError as e:
+                logger.warning(f"Could not check the queries holding Athena slots: {e}")
+                return finished
+            for execution in response.get("QueryExecutions", []):
+                if execution["Status"]["State"] in FINISHED_STATES:
+                    query_execution_id = execution["QueryExecutionId"]
+                    finished[by_query[query_execution_id]] = query_execution_id
+        return finished
+
+    def _enqueue(self, owner: str, priority: str, deadline: float) -> str:
+        now = self._clock()
+        keys = [f"fila#{priority}#{n}" for n in range(self.classes[priority].max_waiting)]
+        taken = self.index.get_many(keys, now)
+        for key in keys:
+            if key not in taken and self.index.acquire(key, owner, int(deadline) + 1, now):
+                return key
+        raise AdmissionRejectedError(f"Athena wait queue for {priority} queries is full")
+
+    def attach(self, slot: tuple, query_execution_id: str):
+        """Bind the slot to its query (from now on it is freed when the query finishes)."""
+        key, owner = slot
+        try:
+            self.index.attach(key, owner, query_execution_id, expires_at=int(self._clock() + self.lease_seconds))
+        except ClientError as e:
+            # the slot then frees itself after start_timeout
+            logger.warning(f"Could not bind {query_execution_id} to Athena slot {key}: {e}")
+
+    def release(self, slot: tuple):
+        """Give the slot back (or leave a wait queue position)."""
+        key, owner = slot
+        try:
+            self.index.release(key, owner)
+        except ClientError as e:
+            # the slot comes back once its query is seen finished, or at expiry
+            logger.warning(f"Could not release Athena slot {key}: {e}")
+
+    def query_finished(self, query_execution_id: str):
+        """
+        Give back the slot bound to a query nobody waited on (asynchronous
+        jobs), from whichever invocation sees it finish.
+        """
+        try:
+            leases = self.index.get_many(self._slots(), self._clock())
+            for key, lease in leases.items():
+                if lease["query_execution_id"] == query_execution_id:
+                    self.index.release_query(key, query_execution_id)
+        except ClientError as e:
+            logger.warning(f"Could not release the Athena slot of {query_execution_id}: {e}")
+
+
+def _ticket(owner: str) -> float:
+    """Arrival time of a waiter; owners without one count as the earliest."""
+    try:
+        return float(owner.split("-", 1)[0])
+    except ValueError:
+        return 0.0
+
+
+def admission_from_env(client=None):
+    """
+    AdmissionController with ATHENA_ADMISSION_SLOTS slots (unset or 0 = off)
+    on ATHENA_ADMISSION_TABLE or the result cache table; ATHENA_ADMISSION_RESERVED
+    of them kept for interactive requests (default a quarter).
+    """
+    capacity = int(os.getenv("ATHENA_ADMISSION_SLOTS", "0"))
+    table = os.getenv("ATHENA_ADMISSION_TABLE") or os.getenv("RESULT_CACHE_TABLE")
+    if not capacity or not table:
+        return None
+    index = DynamoLeaseIndex(boto3.client("dynamodb"), table, prefix="a#")
+    return AdmissionController(index, client, capacity=capacity,
+                               reserved=int(os.getenv("ATHENA_ADMISSION_RESERVED", str(capacity // 4))))
@@ -0,0 +1,232 @@
+import os
+import re
+import json
+import time
+import hashlib
+from datetime import datetime, timezone
+
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="AthenaResultCache")
+
+# partition changes that make cached results stale
+PARTITION_CHANGES = ("CreatePartition", "BatchCreatePartition", "UpdatePartition",
+                     "BatchUpdatePartition", "DeletePartition", "BatchDeletePartition")
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and drop the trailing ';' so formatting does not split the cache."""
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+
+def reaches_today(data_fim) -> bool:
+    """
+    Whether a lookup ending at `data_fim` (date, 'YYYY-MM-DD', or None for
+    an open range) covers the current UTC day.
+    """
+    if not data_fim:
+        return True
+    return str(data_fim)[:10] >= datetime.now(timezone.utc).date().isoformat()
+
+
+def query_hash(query: str, variant: str = "") -> str:
+    """sha256 of the normalized query plus the output variant (e.g. tipo_arquivo)."""
+    return hashlib.sha256(f"{normalize_query(query)}|{variant}".encode()).hexdigest()
+
+
+class MemoryCacheIndex:
+    """Local stand-in for the cache index (tests, runs outside AWS)."""
+
+    def __init__(self):
+        self.entries = {}
+        self.generations = {}
+
+    def lookup(self, key: str, table: str) -> tuple:
+        return self.entries.get(key), self.generations.get(table, 0)
+
+    def put(self, key: str, entry: dict):
+        self.entries[key] = entry
+
+    def bump(self, table: str):
+        self.generations[table] = self.generations.get(table, 0) + 1
+
+
+class DynamoCacheIndex:
+    """
+    One DynamoDB table (hash key `chave`, TTL on `expira_em`) holding both
+    the query entries (q#<hash>) and a generation counter per source table
+    (t#<table>). A lookup is a single BatchGetItem.
+    """
+
+    def __init__(self, client, table_name: str):
+        self.client = client
+        self.table_name = table_name
+
+    def lookup(self, key: str, table: str) -> tuple:
+        keys = [{"chave": {"S": f"q#{key}"}}, {"chave": {"S": f"t#{table}"}}]
+        response = self.client.batch_get_item(
+            RequestItems={self.table_name: {"Keys": keys, "ConsistentRead": True}}
+        )
+        items = {i["chave"]["S"]: i for i in response.get("Responses", {}).get(self.table_name, [])}
+        entry = items.get(f"q#{key}")
+        generation = items.get(f"t#{table}")
+        return (
+            json.loads(entry["entrada"]["S"]) if entry else None,
+            int(generation["geracao"]["N"]) if generation else 0,
+        )
+
+    def put(self, key: str, entry: dict):
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "chave": {"S": f"q#{key}"},
+                "entrada": {"S": json.dumps(entry)},
+                "expira_em": {"N": str(int(entry["expires_at"]))},
+            },
+        )
+
+    def bump(self, table: str):
+        self.client.update_item(
+            TableName=self.table_name,
+            Key={"chave": {"S": f"t#{table}"}},
+            UpdateExpression="ADD geracao :um",
+            ExpressionAttributeValues={":um": {"N": "1"}},
+        )
+
+
+class S3CacheIndex:
+    """
+    Same index as small JSON objects under `prefix` (queries/<hash>.json and
+    tables/<table>.json), for deployments without a DynamoDB table.
+    Expiry relies on expires_at; a lifecycle rule on the prefix cleans up.
+    """
+
+    def __init__(self, client, bucket: str, prefix: str = "athena_cache"):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/")
+
+    def _read(self, key: str):
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        return json.loads(body)
+
+    def _write(self, key: str, value: dict):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(value),
+                               ContentType="application/json")
+
+    def lookup(self, key: str, table: str) -> tuple:
+        generation = self._read(f"{self.prefix}/tables/{table}.json") or {}
+        return self._read(f"{self.prefix}/queries/{key}.json"), generation.get("geracao", 0)
+
+    def put(self, key: str, entry: dict):
+        self._write(f"{self.prefix}/queries/{key}.json", entry)
+
+    def bump(self, table: str):
+        # last writer wins; a lost bump only costs one extra miss on the next event
+        key = f"{self.prefix}/tables/{table}.json"
+        current = self._read(key) or {}
+        self._write(key, {"geracao": current.get("geracao", 0) + 1})
+
+
+class ResultCache:
+    """
+    Application-level cache of finished lookups: normalized query hash ->
+    last good QueryExecutionId and delivered output key.
+
+    An entry is served while it is younger than ttl_seconds and the source
+    table's generation has not moved since it was written. The generation
+    is bumped by `invalidation_handler` whenever ingest adds partitions.
+
+    Ingest also adds files to partitions that already exist (the current
+    hour's), which changes no generation. A lookup reaching the current day
+    is therefore stored with recent_ttl_seconds: it can be that stale, not
+    ttl_seconds.
+    """
+
+    def __init__(self, index, ttl_seconds: int = 3600, recent_ttl_seconds: int = 60):
+        self.index = index
+        self.ttl_seconds = ttl_seconds
+        self.recent_ttl_seconds = recent_ttl_seconds
+
+    def lookup(self, query: str, table: str, variant: str = "") -> tuple:
+        """
+        Returns:
+            tuple: (entry or None, generation). Pass the generation to store()
+                so a result computed while partitions were landing is not
+                cached as fresh.
+        """
+        try:
+            entry, generation = self.index.lookup(query_hash(query, variant), table)
+        except ClientError as e:
+            logger.warning(f"Result cache unavailable, going to Athena: {e}")
+            return None, None
+        if entry is None:
+            return None, generation
+        if entry["expires_at"] < time.time() or entry["generation"] != generation:
+            return None, generation
+        logger.info(f"Result cache hit: {entry['query_execution_id']} -> {entry['output_key']}")
+        return entry, generation
+
+    def store(self, query: str, table: str, query_execution_id: str, output_key: str,
+              generation: int, variant: str = "", recent: bool = False):
+        """`recent`: the lookup covers the current day (see reaches_today); short TTL."""
+        if generation is None:
+            return
+        now = time.time()
+        ttl_seconds = self.recent_ttl_seconds if recent else self.ttl_seconds
+        entry = {
+            "query_execution_id": query_execution_id,
+            "output_key": output_key,
+            "table": table,
+            "generation": generation,
+            "created_at": int(now),
+            "expires_at": int(now + ttl_seconds),
+        }
+        try:
+            self.index.put(query_hash(query, variant), entry)
+        except ClientError as e:
+            logger.warning(f"Could not store result cache entry: {e}")
+
+    def invalidate(self, table: str):
+        self.index.bump(table)
+        logger.info(f"Result cache invalidated for table {table}")
+
+
+def cache_from_env():
+    """
+    ResultCache from RESULT_CACHE_TABLE (DynamoDB) or RESULT_CACHE_BUCKET
+    (+ RESULT_CACHE_PREFIX); None when neither is set.
+    """
+    ttl = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+    recent_ttl = int(os.getenv("RESULT_CACHE_RECENT_TTL_SECONDS", "60"))
+    if os.getenv("RESULT_CACHE_TABLE"):
+        return ResultCache(DynamoCacheIndex(boto3.client("dynamodb"), os.environ["RESULT_CACHE_TABLE"]),
+                           ttl, recent_ttl)
+    if os.getenv("RESULT_CACHE_BUCKET"):
+        index = S3CacheIndex(boto3.client("s3"), os.environ["RESULT_CACHE_BUCKET"],
+                             os.getenv("RESULT_CACHE_PREFIX", "athena_cache"))
+        return ResultCache(index, ttl, recent_ttl)
+    return None
+
+
+def invalidation_handler(event, context, cache: ResultCache = None):
+    """
+    Lambda target for the EventBridge rule on "Glue Data Catalog Table State
+    Change": bumps the generation of the table whose partitions changed.
+    Files added to an existing partition raise no event; those are covered
+    by the short TTL of lookups reaching the current day.
+    """
+    cache = cache or cache_from_env()
+    detail = event.get("detail", {})
+    if cache is None or detail.get("typeOfChange") not in PARTITION_CHANGES:
+        return {"invalidated": None}
+    table = detail["tableName"]
+    cache.invalidate(table)
+    return {"invalidated": table}
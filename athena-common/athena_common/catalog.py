@@ -0,0 +1,32 @@
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="AthenaCatalog")
+
+
+# (database, table) -> Glue table; only successful reads are kept
+_tables = {}
+
+
+def get_table(database: str, table: str) -> dict:
+    """
+    Glue table definition, read once per container and shared by the
+    partition layout and the column projection. {} when the catalog cannot
+    be read; callers fall back to not pruning / not validating, and the
+    next call tries the catalog again.
+    """
+    key = (database, table)
+    if key not in _tables:
+        try:
+            _tables[key] = boto3.client("glue").get_table(DatabaseName=database, Name=table)["Table"]
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Could not read {database}.{table} from the Glue catalog: {e}")
+            return {}
+    return _tables[key]
+
+
+def table_columns(table: dict) -> list:
+    """Data columns followed by partition keys, lower-cased as Athena exposes them."""
+    columns = table.get("StorageDescriptor", {}).get("Columns", []) + table.get("PartitionKeys", [])
+    return [column["Name"].lower() for column in columns]
@@ -0,0 +1,116 @@
+import boto3
+import pyarrow as pa
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="AthenaResultDecoder")
+
+# get_query_results returns at most 1000 rows per call
+MAX_PAGE_SIZE = 1000
+
+_TYPES = {
+    "boolean": pa.bool_(),
+    "tinyint": pa.int8(),
+    "smallint": pa.int16(),
+    "integer": pa.int32(),
+    "int": pa.int32(),
+    "bigint": pa.int64(),
+    "float": pa.float32(),
+    "real": pa.float32(),
+    "double": pa.float64(),
+    "date": pa.date32(),
+    # microseconds also hold Iceberg timestamp(6) values; Hive ones are milliseconds
+    "timestamp": pa.timestamp("us"),
+}
+
+
+def arrow_type(column: dict) -> pa.DataType:
+    """
+    Arrow type of one ResultSetMetadata.ColumnInfo entry. varchar/char keep
+    strings (codes like agencia keep their leading zeros), and so do types
+    without a plain Arrow equivalent (array, map, row, json, varbinary,
+    timestamp with time zone, ...).
+    """
+    name = column["Type"].lower().split("(", 1)[0].strip()
+    if name == "decimal":
+        return pa.decimal128(column.get("Precision") or 38, column.get("Scale") or 0)
+    return _TYPES.get(name, pa.string())
+
+
+def result_schema(column_info: list) -> pa.Schema:
+    """Arrow schema of a result set, in the SELECT's column order."""
+    return pa.schema([pa.field(column["Name"], arrow_type(column)) for column in column_info])
+
+
+def decode_rows(rows: list, schema: pa.Schema) -> pa.RecordBatch:
+    """
+    One record batch from get_query_results rows (without the header row).
+    Cells are read column by column into Arrow string arrays and cast once
+    per column; no per-row dict is built. A cell without VarCharValue is
+    NULL and stays null; {"VarCharValue": ""} stays an empty string.
+    """
+    if not rows:
+        return pa.RecordBatch.from_pylist([], schema=schema)
+    arrays = []
+    for field, cells in zip(schema, zip(*(row["Data"] for row in rows))):
+        values = pa.array([cell.get("VarCharValue") for cell in cells], pa.string())
+        arrays.append(values if field.type == pa.string() else values.cast(field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_records(batches):
+    """Rows as dicts, one batch converted at a time (the lazy dict view)."""
+    for batch in batches:
+        yield from batch.to_pylist()
+
+
+class ResultSetDecoder:
+    """
+    Typed reader of get_query_results pages: ColumnInfo gives the Arrow
+    schema and every page becomes one record batch, so numbers and dates
+    come out parsed and NULLs stay null. Meant for small results and for the
+    schema itself; large results are cheaper through ResultReader, which
+    takes the same schema.
+
+    Dicts (iter_records) and DataFrames (read_table().to_pandas(), pandas is
+    only imported then) are built on demand from the batches.
+    """
+
+    def __init__(self, client=None, page_size: int = MAX_PAGE_SIZE):
+        self.client = client or boto3.client("athena")
+        self.page_size = min(page_size, MAX_PAGE_SIZE)
+
+    def schema(self, query_execution_id: str) -> pa.Schema:
+        """Schema of a finished query, from a single one-row call."""
+        response = self.client.get_query_results(QueryExecutionId=query_execution_id, MaxResults=1)
+        return result_schema(response["ResultSet"]["ResultSetMetadata"]["ColumnInfo"])
+
+    def _pages(self, query_execution_id: str):
+        paginator = self.client.get_paginator("get_query_results")
+        pages = paginator.paginate(QueryExecutionId=query_execution_id,
+                                   PaginationConfig={"PageSize": self.page_size})
+        schema = None
+        for page in pages:
+            rows = page["ResultSet"]["Rows"]
+            if schema is None:
+                schema = result_schema(page["ResultSet"]["ResultSetMetadata"]["ColumnInfo"])
+                rows = rows[1:]  # header row of a SELECT
+            yield schema, rows
+
+    def iter_batches(self, query_execution_id: str):
+        """
+        Yields:
+            pyarrow.RecordBatch: One per page (up to page_size rows).
+        """
+        for schema, rows in self._pages(query_execution_id):
+            if rows:
+                yield decode_rows(rows, schema)
+
+    def read_table(self, query_execution_id: str) -> pa.Table:
+        schema, batches = None, []
+        for schema, rows in self._pages(query_execution_id):
+            if rows:
+                batches.append(decode_rows(rows, schema))
+        if schema is None:
+            return pa.table({})
+        logger.info(f"Decoded {sum(b.num_rows for b in batches)} rows of {query_execution_id}")
+        return pa.Table.from_batches(batches, schema=schema)
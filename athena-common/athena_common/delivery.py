@@ -0,0 +1,80 @@
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from aws_lambda_powertools import Logger
+
+from athena_common.formats import output_format
+from athena_common.results import output_location, split_s3_uri
+
+logger = Logger(service="AthenaDelivery")
+
+DEFAULT_COPY_PART_SIZE = 64 * 1024 * 1024
+# single CopyObject is one server-side stream (and capped at 5 GiB); above this, copy parts in parallel
+DEFAULT_MULTIPART_THRESHOLD = 128 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+def use_server_side_copy(output) -> bool:
+    """CSV requests are delivered by copying Athena's own output unless CSV_DELIVERY=stream."""
+    return output.name == "csv" and os.getenv("CSV_DELIVERY", "copy") == "copy"
+
+
+def copy_s3_object(s3, source_bucket: str, source_key: str, bucket: str, key: str,
+                   content_type: str = None, metadata: dict = None,
+                   part_size: int = DEFAULT_COPY_PART_SIZE,
+                   multipart_threshold: int = DEFAULT_MULTIPART_THRESHOLD, max_workers: int = 8) -> int:
+    """
+    Server-side copy of an S3 object with new content type/metadata; the
+    bytes never pass through the caller. Large objects are copied as
+    UploadPartCopy ranges, `max_workers` at a time.
+
+    Returns:
+        int: Size of the copied object in bytes.
+    """
+    size = s3.head_object(Bucket=source_bucket, Key=source_key)["ContentLength"]
+    source = {"Bucket": source_bucket, "Key": source_key}
+    extra = {}
+    if content_type:
+        extra["ContentType"] = content_type
+    extra["Metadata"] = metadata or {}
+
+    if size <= multipart_threshold:
+        s3.copy_object(Bucket=bucket, Key=key, CopySource=source, MetadataDirective="REPLACE", **extra)
+        logger.info(f"Copied s3://{source_bucket}/{source_key} -> s3://{bucket}/{key} ({size} bytes)")
+        return size
+
+    part_size = max(part_size, math.ceil(size / MAX_PARTS))
+    upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, **extra)["UploadId"]
+
+    def copy_part(number):
+        start = (number - 1) * part_size
+        end = min(start + part_size, size) - 1
+        response = s3.upload_part_copy(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number,
+                                       CopySource=source, CopySourceRange=f"bytes={start}-{end}")
+        return {"PartNumber": number, "ETag": response["CopyPartResult"]["ETag"]}
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-copy") as pool:
+            parts = list(pool.map(copy_part, range(1, math.ceil(size / part_size) + 1)))
+        s3.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                     MultipartUpload={"Parts": parts})
+    except Exception:
+        s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    logger.info(f"Copied s3://{source_bucket}/{source_key} -> s3://{bucket}/{key} "
+                f"({size} bytes, {len(parts)} parts)")
+    return size
+
+
+def deliver_athena_output(s3, execution: dict, bucket: str, key: str, metadata: dict = None, **kwargs) -> int:
+    """
+    Deliver the CSV Athena wrote for `execution` as the final CSV output by
+    server-side copy. Valid when the request wants csv: the file already has
+    the header, the SELECT's column order, every value quoted and NULL as an
+    empty field, like CsvFormat.
+    """
+    source_bucket, source_key = split_s3_uri(output_location(execution))
+    metadata = {"query-execution-id": execution["QueryExecutionId"], **(metadata or {})}
+    return copy_s3_object(s3, source_bucket, source_key, bucket, key,
+                          content_type=output_format("csv").content_type, metadata=metadata, **kwargs)
@@ -0,0 +1,60 @@
+class AthenaError(Exception):
+    """Base error for the shared Athena execution path."""
+
+    def __init__(self, message: str, query_execution_id: str = None):
+        super().__init__(message)
+        self.query_execution_id = query_execution_id
+
+
+class QueryFailedError(AthenaError):
+    """
+    The query reached FAILED. Carries Athena's error category/type and the
+    Retryable flag so callers can decide between retrying and a 4xx.
+    """
+
+    def __init__(self, message: str, query_execution_id: str = None, error_category: int = None,
+                 error_type: int = None, retryable: bool = False):
+        super().__init__(message, query_execution_id)
+        self.error_category = error_category
+        self.error_type = error_type
+        self.retryable = retryable
+
+    @classmethod
+    def from_execution(cls, execution: dict) -> "QueryFailedError":
+        status = execution.get("Status", {})
+        detail = status.get("AthenaError", {})
+        reason = status.get("StateChangeReason", "unknown reason")
+        return cls(
+            f"Athena query failed: {reason}",
+            query_execution_id=execution.get("QueryExecutionId"),
+            error_category=detail.get("ErrorCategory"),
+            error_type=detail.get("ErrorType"),
+            retryable=detail.get("Retryable", False),
+        )
+
+
+class QueryCancelledError(AthenaError):
+    """The query was cancelled (by a user, or by us on timeout)."""
+
+
+class QueryTimeoutError(AthenaError):
+    """
+    The invocation ran out of time before the query finished. The execution
+    is cancelled unless the executor was told otherwise.
+    """
+
+
+class AthenaThrottledError(AthenaError):
+    """start_query_execution was rejected with TooManyRequestsException."""
+
+
+class AdmissionRejectedError(AthenaThrottledError):
+    """No Athena slot freed up in time (or the wait queue was full); retry later."""
+
+
+class InvalidColumnsError(ValueError):
+    """Requested columns (campos or a profile) that the table does not have."""
+
+    def __init__(self, columns: list):
+        super().__init__(f"Invalid columns: {', '.join(columns)}")
+        self.columns = columns
@@ -0,0 +1,256 @@
+import time
+import random
+
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+from athena_common.errors import (
+    AthenaThrottledError,
+    QueryCancelledError,
+    QueryFailedError,
+    QueryTimeoutError,
+)
+
+logger = Logger(service="AthenaExecutor")
+
+THROTTLING_CODES = ("ThrottlingException", "TooManyRequestsException")
+
+
+class BackoffPolicy:
+    """
+    Delay between get_query_execution polls. The delay grows with the time
+    already spent in the current phase (a fixed fraction of it, between
+    `initial` and `max_delay`, minus jitter), so short queries are seen
+    almost immediately and long ones do not burn API quota.
+
+    The phase clock restarts when the query leaves the queue: the queue time
+    Athena reports (QueryQueueTimeInMillis) is subtracted from the elapsed
+    time, so a query that waited 20s in a busy workgroup and then runs for
+    500ms is still picked up quickly.
+    """
+
+    def __init__(self, initial: float = 0.2, ratio: float = 0.4, max_delay: float = 2.0,
+                 jitter: float = 0.3, rng: random.Random = None):
+        self.initial = initial
+        self.ratio = ratio
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def fixed(cls, seconds: float) -> "BackoffPolicy":
+        """Constant interval without jitter (the old wait_for_query behaviour)."""
+        return cls(initial=seconds, ratio=0.0, max_delay=seconds, jitter=0.0)
+
+    def delay(self, elapsed: float, state: str = "RUNNING", statistics: dict = None) -> float:
+        """
+        Args:
+            elapsed (float): Seconds since the wait started.
+            state (str): Last state seen (QUEUED or RUNNING).
+            statistics (dict): QueryExecution.Statistics from the last poll.
+
+        Returns:
+            float: Seconds to sleep before the next poll.
+        """
+        in_phase = elapsed
+        if state == "RUNNING":
+            queued = (statistics or {}).get("QueryQueueTimeInMillis") or 0
+            in_phase = max(0.0, elapsed - queued / 1000)
+        delay = min(self.max_delay, max(self.initial, self.ratio * in_phase))
+        if self.jitter:
+            delay *= 1 - self.jitter * self._rng.random()
+        return delay
+
+
+class AthenaExecutor:
+    """
+    Starts Athena queries and waits for them with BackoffPolicy, bounded by
+    the Lambda invocation's remaining time. Failures surface as the typed
+    errors in athena_common.errors.
+    """
+
+    def __init__(self, client=None, database: str = None, output_location: str = None,
+                 workgroup: str = None, backoff: BackoffPolicy = None, safety_margin_ms: int = 3000,
+                 cancel_on_timeout: bool = True, result_reuse_minutes: int = 0,
+                 single_flight=None, admission=None, sleep=time.sleep, clock=time.monotonic):
+        self.client = client or boto3.client("athena")
+        self.database = database
+        self.output_location = output_location
+        self.workgroup = workgroup
+        self.backoff = backoff or BackoffPolicy()
+        self.safety_margin_ms = safety_margin_ms
+        self.cancel_on_timeout = cancel_on_timeout
+        # > 0: Athena may answer with the result of an identical query run
+        # within this many minutes (ResultReuseConfiguration)
+        self.result_reuse_minutes = result_reuse_minutes
+        # SingleFlight: identical queries already in flight are joined, not started again
+        self.single_flight = single_flight
+        # executions joined through single_flight: other callers own them, never cancel
+        self._joined = set()
+        # AdmissionController: a slot is taken before each submission, given back when it finishes
+        self.admission = admission
+        self._slots = {}
+        self._sleep = sleep
+        self._clock = clock
+
+    def start(self, query: str, database: str = None, output_location: str = None, variant: str = "",
+              priority: str = "interactive") -> str:
+        """
+        Submit the query and return its QueryExecutionId. database and
+        output_location override the executor's defaults for this call.
+        With single_flight, an identical query (same database, output
+        location and `variant`) still running is joined instead. With
+        admission, the submission first waits for a slot of its `priority`
+        class ('interactive' or 'batch').
+
+        Raises:
+            AthenaThrottledError: Athena rejected the submission (TooManyRequestsException).
+            AdmissionRejectedError: No slot was available in time.
+        """
+        params = {"QueryString": query}
+        database = database or self.database
+        output_location = output_location or self.output_location
+        if database:
+            params["QueryExecutionContext"] = {"Database": database}
+        if output_location:
+            params["ResultConfiguration"] = {"OutputLocation": output_location}
+        if self.workgroup:
+            params["WorkGroup"] = self.workgroup
+        if self.result_reuse_minutes:
+            params["ResultReuseConfiguration"] = {
+                "ResultReuseByAgeConfiguration": {"Enabled": True, "MaxAgeInMinutes": self.result_reuse_minutes}
+            }
+        if self.single_flight is None:
+            return self._submit(params, priority)
+        submitted = []
+
+        def submit():
+            submitted.append(self._submit(params, priority))
+            return submitted[-1]
+
+        query_execution_id = self.single_flight.start(
+            query, submit, self.client, variant=f"{database}|{output_location}|{self.workgroup}|{variant}"
+        )
+        if query_execution_id not in submitted:
+            self._joined.add(query_execution_id)
+        return query_execution_id
+
+    def submit(self, query: str, database: str = None, output_location: str = None, variant: str = "",
+               priority: str = "interactive") -> str:
+        """
+        start() for a query this executor will not wait() on (asynchronous
+        jobs): nothing is kept about it here, so a warm container does not
+        accumulate an entry per submission. Its admission slot stays bound
+        to the query; AdmissionController.query_finished() gives it back.
+        """
+        query_execution_id = self.start(query, database, output_location, variant, priority)
+        self._joined.discard(query_execution_id)
+        self._slots.pop(query_execution_id, None)
+        return query_execution_id
+
+    def _submit(self, params: dict, priority: str = "interactive") -> str:
+        slot = self.admission.acquire(priority) if self.admission else None
+        try:
+            response = self.client.start_query_execution(**params)
+        except ClientError as e:
+            if slot:
+                self.admission.release(slot)
+            if e.response["Error"]["Code"] in THROTTLING_CODES:
+                raise AthenaThrottledError(f"Athena rejected the query: {e}") from e
+            raise
+        query_execution_id = response["QueryExecutionId"]
+        if slot:
+            self.admission.attach(slot, query_execution_id)
+            self._slots[query_execution_id] = slot
+        logger.info(f"Athena query started with execution ID: {query_execution_id}")
+        return query_execution_id
+
+    def _finished(self, query_execution_id: str):
+        """Give back the admission slot of a query that reached a terminal state."""
+        self._joined.discard(query_execution_id)
+        slot = self._slots.pop(query_execution_id, None)
+        if slot:
+            self.admission.release(slot)
+
+    def wait(self, query_execution_id: str, context=None, timeout: float = None) -> dict:
+        """
+        Poll until the query reaches a terminal state.
+
+        Args:
+            query_execution_id (str): Execution to wait for.
+            context: Lambda context; its remaining time (minus safety_margin_ms)
+                bounds the wait.
+            timeout (float): Optional extra bound in seconds.
+
+        Returns:
+            dict: The QueryExecution of the SUCCEEDED query.
+
+        Raises:
+            QueryFailedError, QueryCancelledError, QueryTimeoutError
+        """
+        started = self._clock()
+        deadline = None if timeout is None else started + timeout
+        polls = 0
+        state, statistics = "QUEUED", {}
+        while True:
+            polls += 1
+            execution = self._poll(query_execution_id)
+            if execution is not None:
+                state = execution["Status"]["State"]
+                if state in ("SUCCEEDED", "FAILED", "CANCELLED"):
+                    self._finished(query_execution_id)
+                if state == "SUCCEEDED":
+                    reused = execution.get("Statistics", {}).get("ResultReuseInformation", {})
+                    logger.info(f"Athena query {query_execution_id} succeeded after {polls} polls "
+                                f"(reused previous result: {reused.get('ReusedPreviousResult', False)}).")
+                    return execution
+                if state == "FAILED":
+                    raise QueryFailedError.from_execution(execution)
+                if state == "CANCELLED":
+                    raise QueryCancelledError("Athena query was cancelled.", query_execution_id)
+                statistics = execution.get("Statistics", {})
+
+            delay = self.backoff.delay(self._clock() - started, state, statistics)
+            budget = self._budget(context, deadline)
+            if budget is not None and budget <= 0:
+                self._give_up(query_execution_id)
+            if budget is not None:
+                delay = min(delay, budget)
+            self._sleep(delay)
+
+    def run(self, query: str, context=None, timeout: float = None, priority: str = "interactive") -> dict:
+        """start() followed by wait(); returns the SUCCEEDED QueryExecution."""
+        return self.wait(self.start(query, priority=priority), context=context, timeout=timeout)
+
+    def _poll(self, query_execution_id: str):
+        try:
+            response = self.client.get_query_execution(QueryExecutionId=query_execution_id)
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in THROTTLING_CODES:
+                raise
+            logger.warning(f"get_query_execution throttled for {query_execution_id}; backing off.")
+            return None
+        return response["QueryExecution"]
+
+    def _budget(self, context, deadline):
+        """Seconds left before we must stop waiting, or None when unbounded."""
+        budgets = []
+        if context is not None:
+            budgets.append((context.get_remaining_time_in_millis() - self.safety_margin_ms) / 1000)
+        if deadline is not None:
+            budgets.append(deadline - self._clock())
+        return min(budgets) if budgets else None
+
+    def _give_up(self, query_execution_id: str):
+        if self.cancel_on_timeout and query_execution_id not in self._joined:
+            try:
+                self.client.stop_query_execution(QueryExecutionId=query_execution_id)
+                self._finished(query_execution_id)
+            except ClientError as e:
+                logger.warning(f"Could not cancel Athena query {query_execution_id}: {e}")
+        self._joined.discard(query_execution_id)
+        raise QueryTimeoutError(
+            f"Athena query {query_execution_id} did not finish within the invocation time.",
+            query_execution_id,
+        )
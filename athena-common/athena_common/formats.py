@@ -0,0 +1,129 @@
+import gzip
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from athena_common.writers import write_json
+
+
+def _project(batch, columns: list = None):
+    return batch.select(columns) if columns else batch
+
+
+def _empty_schema(columns: list = None) -> pa.Schema:
+    return pa.schema([(column, pa.string()) for column in columns or ()])
+
+
+class OutputFormat:
+    """
+    One output file type. write() consumes the shared stream of Arrow record
+    batches (ResultReader.iter_batches) into a binary sink, one batch at a
+    time, and returns the number of rows written.
+    """
+
+    name = None
+    extension = None
+    content_type = "application/octet-stream"
+
+    def write(self, batches, sink, columns: list = None) -> int:
+        raise NotImplementedError
+
+    def file_name(self, base: str) -> str:
+        return f"{base}.{self.extension}"
+
+
+class JsonFormat(OutputFormat):
+    """Compact JSON array (the historical output)."""
+
+    name = "json"
+    extension = "json"
+    content_type = "application/json"
+
+    def write(self, batches, sink, columns: list = None) -> int:
+        return write_json(batches, sink, columns)
+
+
+class NdjsonGzipFormat(OutputFormat):
+    """
+    One JSON object per line, gzip-compressed. Stored as application/gzip
+    (not Content-Encoding: gzip) so HTTP clients keep the .gz as downloaded.
+    """
+
+    name = "ndjson"
+    extension = "ndjson.gz"
+    content_type = "application/gzip"
+
+    def __init__(self, compresslevel: int = 6):
+        self.compresslevel = compresslevel
+
+    def write(self, batches, sink, columns: list = None) -> int:
+        with gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=self.compresslevel) as compressed:
+            return write_json(batches, compressed, columns, ndjson=True)
+
+
+class CsvFormat(OutputFormat):
+    """CSV with a header line; NULL is written as an empty field."""
+
+    name = "csv"
+    extension = "csv"
+    content_type = "text/csv"
+
+    def write(self, batches, sink, columns: list = None) -> int:
+        writer, rows = None, 0
+        for batch in batches:
+            batch = _project(batch, columns)
+            if writer is None:
+                writer = pacsv.CSVWriter(sink, batch.schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+        if writer is None:
+            writer = pacsv.CSVWriter(sink, _empty_schema(columns))
+        writer.close()
+        return rows
+
+
+class ParquetFormat(OutputFormat):
+    """Parquet, one row group per ~row_group_size rows."""
+
+    name = "parquet"
+    extension = "parquet"
+    content_type = "application/vnd.apache.parquet"
+
+    def __init__(self, compression: str = "zstd", row_group_size: int = 128 * 1024):
+        self.compression = compression
+        self.row_group_size = row_group_size
+
+    def write(self, batches, sink, columns: list = None) -> int:
+        writer, pending, pending_rows, rows = None, [], 0, 0
+        for batch in batches:
+            batch = _project(batch, columns)
+            if writer is None:
+                writer = pq.ParquetWriter(sink, batch.schema, compression=self.compression)
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            rows += batch.num_rows
+            # result batches are small (~1 MiB of CSV); group them so row groups are not tiny
+            if pending_rows >= self.row_group_size:
+                writer.write_table(pa.Table.from_batches(pending))
+                pending, pending_rows = [], 0
+        if writer is None:
+            writer = pq.ParquetWriter(sink, _empty_schema(columns), compression=self.compression)
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending))
+        writer.close()
+        return rows
+
+
+FORMATS = {fmt.name: fmt for fmt in (JsonFormat(), NdjsonGzipFormat(), CsvFormat(), ParquetFormat())}
+
+
+def output_format(tipo_arquivo: str, default: str = None) -> OutputFormat:
+    """
+    Output format for a payload's tipo_arquivo ('json', 'ndjson', 'csv',
+    'parquet'). Unknown values fall back to `default`, or raise ValueError.
+    """
+    fmt = FORMATS.get((tipo_arquivo or "").lower()) or FORMATS.get(default)
+    if fmt is None:
+        raise ValueError(f"Unsupported tipo_arquivo {tipo_arquivo!r}; expected one of {sorted(FORMATS)}")
+    return fmt
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="AthenaJobs")
+
+RUNNING = "RUNNING"
+DELIVERING = "DELIVERING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+
+TERMINAL_QUERY_STATES = ("SUCCEEDED", "FAILED", "CANCELLED")
+
+
+class MemoryJobIndex:
+    """Local stand-in for the job table (tests, runs outside AWS)."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def get(self, job_id: str):
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def put(self, job: dict, expected_version: int = None) -> bool:
+        current = self.jobs.get(job["job_id"])
+        if expected_version is None and current is not None:
+            return False
+        if expected_version is not None and (current is None or current["versao"] != expected_version):
+            return False
+        self.jobs[job["job_id"]] = dict(job)
+        return True
+
+
+class DynamoJobIndex:
+    """
+    One DynamoDB table (hash key `job_id`, TTL on `expira_em`). The job is
+    a JSON attribute; `versao` makes every state change a conditional
+    write, so two deliveries of the same event cannot both claim a job.
+    """
+
+    def __init__(self, client, table_name: str):
+        self.client = client
+        self.table_name = table_name
+
+    def get(self, job_id: str):
+        response = self.client.get_item(TableName=self.table_name, Key={"job_id": {"S": job_id}},
+                                        ConsistentRead=True)
+        item = response.get("Item")
+        return json.loads(item["job"]["S"]) if item else None
+
+    def put(self, job: dict, expected_version: int = None) -> bool:
+        params = {
+            "TableName": self.table_name,
+            "Item": {
+                "job_id": {"S": job["job_id"]},
+                "versao": {"N": str(job["versao"])},
+                "estado": {"S": job["estado"]},
+                "job": {"S": json.dumps(job)},
+                "expira_em": {"N": str(job["expira_em"])},
+            },
+        }
+        if expected_version is None:
+            params["ConditionExpression"] = "attribute_not_exists(job_id)"
+        else:
+            params["ConditionExpression"] = "versao = :versao"
+            params["ExpressionAttributeValues"] = {":versao": {"N": str(expected_version)}}
+        try:
+            self.client.put_item(**params)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+
+class JobStore:
+    """
+    Asynchronous lookups: the handler starts the query, records a job keyed
+    by its QueryExecutionId and answers 202; the Athena state-change event
+    later claims the job, delivers the output and records where it went.
+
+    RUNNING -> DELIVERING -> SUCCEEDED, or FAILED. A job stuck in
+    DELIVERING (the delivering invocation died) can be claimed again after
+    `stale_seconds`.
+    """
+
+    def __init__(self, index, ttl_seconds: int = 86400, stale_seconds: int = 900):
+        self.index = index
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+
+    def create(self, job_id: str, request: dict) -> dict:
+        """New RUNNING job; the existing one when the execution was joined (single-flight)."""
+        now = int(time.time())
+        job = {
+            "job_id": job_id,
+            "estado": RUNNING,
+            "versao": 0,
+            "pedido": request,
+            "resultado": None,
+            "erro": None,
+            "criado_em": now,
+            "atualizado_em": now,
+            "expira_em": now + self.ttl_seconds,
+        }
+        if not self.index.put(job):
+            return self.index.get(job_id)
+        logger.info(f"Job {job_id} submitted")
+        return job
+
+    def get(self, job_id: str):
+        return self.index.get(job_id)
+
+    def _transition(self, job: dict, estado: str, **changes):
+        updated = {**job, **changes, "estado": estado, "versao": job["versao"] + 1,
+                   "atualizado_em": int(time.time())}
+        return updated if self.index.put(updated, expected_version=job["versao"]) else None
+
+    def claim(self, job_id: str):
+        """The job, now DELIVERING; None when it is not ours, already done or claimed."""
+        job = self.index.get(job_id)
+        if job is None:
+            return None
+        stale = job["estado"] == DELIVERING and job["atualizado_em"] + self.stale_seconds < time.time()
+        if job["estado"] != RUNNING and not stale:
+            return None
+        return self._transition(job, DELIVERING)
+
+    def succeed(self, job: dict, result: dict):
+        if self._transition(job, SUCCEEDED, resultado=result) is None:
+            logger.warning(f"Job {job['job_id']} changed while its output was delivered")
+
+    def fail(self, job: dict, error: str):
+        if self._transition(job, FAILED, erro=error) is None:
+            logger.warning(f"Job {job['job_id']} changed before it could be marked failed")
+
+
+def jobs_from_env():
+    """JobStore on ATHENA_JOBS_TABLE (DynamoDB); None, i.e. synchronous lookups, when unset."""
+    if not os.getenv("ATHENA_JOBS_TABLE"):
+        return None
+    return JobStore(DynamoJobIndex(boto3.client("dynamodb"), os.environ["ATHENA_JOBS_TABLE"]),
+                    ttl_seconds=int(os.getenv("ATHENA_JOBS_TTL_SECONDS", "86400")))
+
+
+def complete_job(event: dict, store: JobStore, deliver, athena_client=None, admission=None) -> dict:
+    """
+    Handles one "Athena Query State Change" event (EventBridge). For a job
+    of ours reaching a terminal state: deliver(job, execution) writes the
+    output and returns the result recorded on the job; a FAILED/CANCELLED
+    query, or a delivery error, marks the job FAILED. With `admission`,
+    the job's slot is given back first.
+    """
+    detail = event.get("detail", {})
+    job_id, state = detail.get("queryExecutionId"), detail.get("currentState")
+    if store is None or state not in TERMINAL_QUERY_STATES:
+        return {"job_id": None}
+    job = store.claim(job_id)
+    if job is None:
+        return {"job_id": None}
+    if admission is not None:
+        admission.query_finished(job_id)
+
+    athena_client = athena_client or boto3.client("athena")
+    execution = athena_client.get_query_execution(QueryExecutionId=job_id)["QueryExecution"]
+    if state != "SUCCEEDED":
+        store.fail(job, execution["Status"].get("StateChangeReason", state))
+        return {"job_id": job_id, "estado": FAILED}
+    try:
+        result = deliver(job, execution)
+    except Exception as e:
+        store.fail(job, str(e))
+        raise
+    store.succeed(job, result)
+    logger.info(f"Job {job_id} delivered")
+    return {"job_id": job_id, "estado": SUCCEEDED}
@@ -0,0 +1,115 @@
+import os
+import datetime
+
+from athena_common.catalog import get_table
+
+# partition columns we know how to derive from a date, and their format
+DATE_KEY_FORMATS = {
+    "anomesdia": "%Y%m%d",
+    "anomes": "%Y%m",
+    "dt": "%Y-%m-%d",
+    "data": "%Y-%m-%d",
+    "ano": "%Y",
+    "mes": "%m",
+    "dia": "%d",
+}
+
+NUMERIC_TYPES = ("int", "integer", "bigint", "smallint", "tinyint")
+
+
+def _as_date(value) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+class PartitionKey:
+    def __init__(self, name: str, fmt: str, numeric: bool = False):
+        self.name = name
+        self.fmt = fmt
+        self.numeric = numeric
+
+    def render(self, value: str) -> str:
+        return str(int(value)) if self.numeric else f"'{value}'"
+
+
+class PartitionLayout:
+    """
+    Date-derived partition keys of a table, outermost first (e.g. anomesdia,
+    or ano/mes/dia). The keys must hold the same date the lookup filters on
+    (data_inicio/data_fim), with zero-padded, year-first formats, so that
+    ranges over the partition values are ranges over dates.
+    """
+
+    def __init__(self, keys: list):
+        self.keys = keys
+
+    @classmethod
+    def parse(cls, spec: str) -> "PartitionLayout":
+        """'ano:%Y:int,mes:%m,dia:%d' or just 'anomesdia' (known name, default format)."""
+        keys = []
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            name, _, rest = item.partition(":")
+            fmt, _, kind = rest.partition(":")
+            keys.append(PartitionKey(name, fmt or DATE_KEY_FORMATS[name], kind in NUMERIC_TYPES))
+        return cls(keys)
+
+    @classmethod
+    def from_glue(cls, glue, database: str, table: str) -> "PartitionLayout":
+        return cls.from_table(glue.get_table(DatabaseName=database, Name=table)["Table"])
+
+    @classmethod
+    def from_table(cls, table: dict) -> "PartitionLayout":
+        """Leading partition keys of the Glue table that are known date keys."""
+        keys = []
+        for column in table.get("PartitionKeys", []):
+            name = column["Name"]
+            if name not in DATE_KEY_FORMATS:
+                break
+            keys.append(PartitionKey(name, DATE_KEY_FORMATS[name], column.get("Type") in NUMERIC_TYPES))
+        return cls(keys)
+
+    def bounds(self, data_inicio, data_fim=None) -> list:
+        """
+        [(key, low, high), ...] from the outermost key inward. A finer key is
+        only bounded while every coarser one is pinned to a single value
+        (e.g. mes is bounded only when the range falls inside one ano).
+        """
+        start = _as_date(data_inicio)
+        end = _as_date(data_fim) if data_fim else None
+        result = []
+        for key in self.keys:
+            low = start.strftime(key.fmt)
+            high = end.strftime(key.fmt) if end else None
+            result.append((key, low, high))
+            if high != low:
+                break
+        return result
+
+    def predicate(self, data_inicio, data_fim=None):
+        """SQL predicate on the partition columns, or None without a layout/date."""
+        if not self.keys or not data_inicio:
+            return None
+        clauses = []
+        for key, low, high in self.bounds(data_inicio, data_fim):
+            if high is None:
+                clauses.append(f"{key.name} >= {key.render(low)}")
+            elif high == low:
+                clauses.append(f"{key.name} = {key.render(low)}")
+            else:
+                clauses.append(f"{key.name} BETWEEN {key.render(low)} AND {key.render(high)}")
+        return " AND ".join(clauses)
+
+
+def resolve_layout(database: str = None, table: str = None) -> PartitionLayout:
+    """
+    ATHENA_PARTITION_LAYOUT when set (an empty value disables pruning);
+    otherwise the table's partition keys from the Glue catalog, read once
+    per container.
+    """
+    spec = os.getenv("ATHENA_PARTITION_LAYOUT")
+    if spec is not None:
+        return PartitionLayout.parse(spec)
+    if not database or not table:
+        return PartitionLayout([])
+    return PartitionLayout.from_table(get_table(database, table))
@@ -0,0 +1,69 @@
+import os
+import re
+import json
+
+from athena_common.catalog import get_table, table_columns
+from athena_common.errors import InvalidColumnsError
+
+IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class ColumnProjection:
+    """
+    Which columns a lookup reads. Precedence: the payload's `campos`, then
+    the client's profile (by cnpj_base_participante), then the tipo_arquivo
+    profile; with none of them the query stays SELECT *.
+
+    profiles: {"tipo_arquivo": {"csv": [...]}, "cliente": {"<cnpj>": [...]}}
+    schema: column names of the table, or a callable returning them (so the
+        catalog is only read when a projection is actually requested).
+        None/empty skips the schema check; names are still required to be
+        plain identifiers since they go into the SQL as is.
+    """
+
+    def __init__(self, profiles: dict = None, schema=None):
+        self.profiles = profiles or {}
+        self._schema = schema
+
+    @property
+    def schema(self) -> list:
+        if callable(self._schema):
+            self._schema = self._schema()
+        return self._schema
+
+    def columns(self, campos: list = None, tipo_arquivo: str = None, cliente: str = None):
+        """Validated column list, or None for every column."""
+        requested = (
+            campos
+            or self.profiles.get("cliente", {}).get(cliente)
+            or self.profiles.get("tipo_arquivo", {}).get(tipo_arquivo)
+        )
+        if not requested:
+            return None
+        return self.validate(requested)
+
+    def validate(self, columns: list) -> list:
+        columns = list(dict.fromkeys(column.strip().lower() for column in columns))
+        known = set(self.schema or ())
+        invalid = [c for c in columns if not IDENTIFIER.match(c) or (known and c not in known)]
+        if invalid:
+            raise InvalidColumnsError(invalid)
+        return columns
+
+
+def select_list(columns: list = None) -> str:
+    return ", ".join(columns) if columns else "*"
+
+
+def resolve_projection(database: str = None, table: str = None) -> ColumnProjection:
+    """
+    Profiles from ATHENA_COLUMN_PROFILES (JSON, see ColumnProjection) and
+    the table schema from the Glue catalog, shared with the partition
+    layout lookup.
+    """
+    profiles = json.loads(os.getenv("ATHENA_COLUMN_PROFILES") or "{}")
+
+    def schema():
+        return table_columns(get_table(database, table))
+
+    return ColumnProjection(profiles, schema if database and table else None)
@@ -0,0 +1,166 @@
+import io
+import csv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import boto3
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="AthenaResultReader")
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+def split_s3_uri(uri: str) -> tuple:
+    """'s3://bucket/a/b.csv' -> ('bucket', 'a/b.csv')"""
+    parsed = urlparse(uri)
+    return parsed.netloc, parsed.path.lstrip("/")
+
+
+def output_location(execution: dict) -> str:
+    """OutputLocation of a finished QueryExecution (the CSV Athena wrote)."""
+    return execution["ResultConfiguration"]["OutputLocation"]
+
+
+class S3RangeStream(io.RawIOBase):
+    """
+    Sequential read-only view of an S3 object, fetched as byte-range GETs of
+    `part_size` issued `max_workers` at a time ahead of the reader. Parts are
+    handed out in order, so memory stays at about max_workers parts.
+    """
+
+    def __init__(self, s3, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                 max_workers: int = 4, size: int = None):
+        super().__init__()
+        self._s3 = s3
+        self._bucket = bucket
+        self._key = key
+        self._part_size = part_size
+        self._max_workers = max_workers
+        self.size = size if size is not None else s3.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        self.requests = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-range")
+        self._pending = deque()
+        self._next_offset = 0
+        self._buf = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def _get(self, start: int, end: int) -> bytes:
+        response = self._s3.get_object(Bucket=self._bucket, Key=self._key, Range=f"bytes={start}-{end}")
+        return response["Body"].read()
+
+    def _fill(self):
+        while len(self._pending) < self._max_workers and self._next_offset < self.size:
+            start = self._next_offset
+            end = min(start + self._part_size, self.size) - 1
+            self._pending.append(self._pool.submit(self._get, start, end))
+            self._next_offset = end + 1
+            self.requests += 1
+
+    def readinto(self, b) -> int:
+        written = 0
+        while written < len(b):
+            if not self._buf:
+                self._fill()
+                if not self._pending:
+                    break
+                self._buf = memoryview(self._pending.popleft().result())
+                self._fill()
+            n = min(len(b) - written, len(self._buf))
+            b[written:written + n] = self._buf[:n]
+            self._buf = self._buf[n:]
+            written += n
+        return written
+
+    def close(self):
+        if self.closed:
+            return
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown(wait=False)
+        super().close()
+
+
+class ResultReader:
+    """
+    Reads the CSV Athena already wrote to OutputLocation instead of paging
+    get_query_results (1000 rows per call). The file is streamed with
+    parallel range GETs and parsed incrementally into Arrow record batches.
+
+    Athena quotes every value and writes NULL as an empty unquoted field, so
+    with `nulls=True` a NULL stays null and "" stays an empty string. Columns
+    are read as strings (codes like agencia keep their leading zeros) unless
+    a typed schema is given.
+    """
+
+    def __init__(self, s3_client=None, part_size: int = DEFAULT_PART_SIZE, max_workers: int = 4,
+                 block_size: int = 1024 * 1024):
+        self.s3_client = s3_client or boto3.client("s3")
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.block_size = block_size
+
+    def _stream(self, location: str) -> S3RangeStream:
+        bucket, key = split_s3_uri(location)
+        return S3RangeStream(self.s3_client, bucket, key, self.part_size, self.max_workers)
+
+    def iter_batches(self, execution: dict, nulls: bool = True, schema: pa.Schema = None):
+        """
+        Args:
+            execution (dict): SUCCEEDED QueryExecution (or {'ResultConfiguration': ...}).
+            nulls (bool): Keep NULLs as null; False turns them into "" like the
+                VarCharValue-based readers did.
+            schema (pa.Schema): Column types (ResultSetDecoder.schema); columns
+                not in it, or every column without it, are read as strings.
+
+        Yields:
+            pyarrow.RecordBatch: Batches of up to ~block_size bytes of CSV.
+        """
+        location = output_location(execution)
+        raw = self._stream(location)
+        if raw.size == 0:
+            raw.close()
+            return
+        source = io.BufferedReader(raw, buffer_size=self.block_size)
+        try:
+            names = self._header(source)
+            reader = pacsv.open_csv(
+                source,
+                read_options=pacsv.ReadOptions(block_size=self.block_size),
+                # Athena quotes every value, and a quoted value may span lines
+                parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                convert_options=pacsv.ConvertOptions(
+                    column_types=self._column_types(names, schema),
+                    strings_can_be_null=nulls,
+                    quoted_strings_can_be_null=False,
+                ),
+            )
+            for batch in reader:
+                yield batch
+        finally:
+            source.close()
+            logger.info(f"Read {raw.size} bytes from {location} in {raw.requests} range GETs")
+
+    def read_table(self, execution: dict, nulls: bool = True, schema: pa.Schema = None) -> pa.Table:
+        batches = list(self.iter_batches(execution, nulls=nulls, schema=schema))
+        if not batches:
+            return pa.table({})
+        return pa.Table.from_batches(batches)
+
+    @staticmethod
+    def _column_types(names: list, schema: pa.Schema = None) -> dict:
+        types = {field.name: field.type for field in schema} if schema is not None else {}
+        return {name: types.get(name, pa.string()) for name in names}
+
+    @staticmethod
+    def _header(source: io.BufferedReader) -> list:
+        """Column names from the header line, read without consuming the stream."""
+        # peek() returns the whole first buffer (block_size bytes), far more than a header line
+        line = source.peek().split(b"\n", 1)[0].decode("utf-8")
+        return next(csv.reader([line]))
@@ -0,0 +1,194 @@
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pyarrow as pa
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+from athena_common.partitions import _as_date
+from athena_common.results import output_location
+
+logger = Logger(service="AthenaShardedExport")
+
+MANIFEST_VERSION = 1
+UNITS = ("day", "month", "year")
+
+
+def merge_intervals(intervals: list) -> list:
+    """
+    Merge (data_inicio, data_fim) date intervals, like utils.merge_intervals:
+    contained intervals disappear, overlapping or contiguous ones are joined.
+    Returns a new sorted list; the input is left untouched.
+    """
+    merged = []
+    for start, end in sorted((_as_date(s), _as_date(e)) for s, e in intervals):
+        if merged and start <= merged[-1][1] + datetime.timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _next_boundary(day: datetime.date, unit: str, count: int) -> datetime.date:
+    if unit == "day":
+        return day + datetime.timedelta(days=count)
+    if unit == "year":
+        return datetime.date(day.year + count, 1, 1)
+    months = day.year * 12 + day.month - 1 + count
+    return datetime.date(months // 12, months % 12 + 1, 1)
+
+
+def split_range(data_inicio, data_fim, unit: str = "month", per_shard: int = 1) -> list:
+    """
+    Split [data_inicio, data_fim] into consecutive sub-ranges that start and
+    end on calendar `unit` boundaries (except the two ends), `per_shard`
+    units each. Month/year shards line up with ano/mes/anomesdia partitions,
+    so each shard's predicate prunes to exactly its own partitions.
+    """
+    if unit not in UNITS:
+        raise ValueError(f"unit must be one of {UNITS}, got {unit!r}")
+    start, end = _as_date(data_inicio), _as_date(data_fim)
+    shards = []
+    while start <= end:
+        boundary = _next_boundary(start, unit, per_shard)
+        shard_end = min(end, boundary - datetime.timedelta(days=1))
+        shards.append((start, shard_end))
+        start = shard_end + datetime.timedelta(days=1)
+    return shards
+
+
+class ShardedExport:
+    """
+    Runs one Athena query per date shard, up to `parallelism` at a time, and
+    describes the result as a manifest: the shard outputs in date order.
+    The shard outputs stay where Athena wrote them; `iter_manifest_batches`
+    reads them back as one logical result.
+
+    build_query(data_inicio, data_fim) must return the SQL of one shard
+    (the same lookup with the shard's dates, so partition pruning applies).
+    `disjoint` tells that each row matches a single shard (the query filters
+    one date column to the shard's range); the manifest records it so the
+    reader skips cross-shard deduplication.
+    """
+
+    def __init__(self, executor, parallelism: int = 4, unit: str = "month", per_shard: int = 1,
+                 disjoint: bool = False):
+        self.executor = executor
+        self.parallelism = max(1, parallelism)
+        self.unit = unit
+        self.per_shard = per_shard
+        self.disjoint = disjoint
+
+    def shards(self, intervals: list) -> list:
+        """Merged intervals, each split on partition-aligned boundaries."""
+        return [shard for start, end in merge_intervals(intervals)
+                for shard in split_range(start, end, self.unit, self.per_shard)]
+
+    def run(self, intervals: list, build_query, context=None) -> dict:
+        """
+        Args:
+            intervals (list): [(data_inicio, data_fim), ...]; overlaps are merged first.
+            build_query: Callable (data_inicio, data_fim) -> SQL.
+            context: Lambda context bounding every wait.
+
+        Returns:
+            dict: The manifest.
+
+        Raises:
+            The first shard's error (QueryFailedError, QueryTimeoutError, ...);
+            the other shards still running are cancelled.
+        """
+        shards = self.shards(intervals)
+        started = {}
+        lock = threading.Lock()
+        failed = threading.Event()
+
+        def run_shard(order, start, end):
+            query_execution_id = self.executor.start(build_query(start.isoformat(), end.isoformat()),
+                                                     priority="batch")
+            with lock:
+                started[order] = query_execution_id
+                # another shard failed while this one was being submitted
+                if failed.is_set():
+                    self._cancel([query_execution_id])
+                    return order, None
+            try:
+                return order, self.executor.wait(query_execution_id, context=context)
+            except Exception:
+                with lock:
+                    started.pop(order)  # already terminal, nothing to cancel
+                raise
+
+        executions = {}
+        pool = ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="athena-shard")
+        try:
+            futures = [pool.submit(run_shard, i, start, end) for i, (start, end) in enumerate(shards)]
+            for future in as_completed(futures):
+                order, execution = future.result()
+                executions[order] = execution
+        except Exception:
+            pool.shutdown(wait=False, cancel_futures=True)
+            with lock:
+                failed.set()
+                self._cancel([qid for order, qid in started.items() if order not in executions])
+            raise
+        pool.shutdown()
+
+        logger.info(f"Sharded export finished: {len(shards)} shards, parallelism {self.parallelism}")
+        return {
+            "versao": MANIFEST_VERSION,
+            "disjunto": self.disjoint,
+            "shards": [
+                {
+                    "ordem": i,
+                    "data_inicio": start.isoformat(),
+                    "data_fim": end.isoformat(),
+                    "query_execution_id": executions[i]["QueryExecutionId"],
+                    "output_location": output_location(executions[i]),
+                    "bytes_scanned": executions[i].get("Statistics", {}).get("DataScannedInBytes"),
+                }
+                for i, (start, end) in enumerate(shards)
+            ],
+        }
+
+    def _cancel(self, query_execution_ids):
+        for query_execution_id in query_execution_ids:
+            try:
+                self.executor.client.stop_query_execution(QueryExecutionId=query_execution_id)
+            except ClientError as e:
+                logger.warning(f"Could not cancel shard query {query_execution_id}: {e}")
+
+
+def iter_manifest_batches(reader, manifest: dict, key_columns: list, nulls: bool = True):
+    """
+    Record batches of every shard, in manifest order.
+
+    For a disjoint manifest the batches are passed through untouched.
+    Otherwise a row whose key_columns values were already returned by an
+    earlier shard is dropped, so rows whose vinculo interval overlaps
+    several shards come out once; repeated rows within a single shard are
+    kept as the query returned them. The keys seen are held in memory, so
+    key_columns should be a narrow identifying set (not the whole row).
+
+    Raises:
+        ValueError: No key_columns for a manifest whose shards may overlap.
+    """
+    shards = sorted(manifest["shards"], key=lambda s: s["ordem"])
+    if not manifest.get("disjunto") and not key_columns:
+        raise ValueError("key_columns are required to merge shards that may overlap")
+    seen = set()
+    for shard in shards:
+        shard_keys = set()
+        execution = {"ResultConfiguration": {"OutputLocation": shard["output_location"]}}
+        for batch in reader.iter_batches(execution, nulls=nulls):
+            if manifest.get("disjunto"):
+                yield batch
+                continue
+            keys = list(zip(*(batch.column(name).to_pylist() for name in key_columns)))
+            shard_keys.update(keys)
+            if seen:
+                batch = batch.filter(pa.array([key not in seen for key in keys]))
+            if batch.num_rows:
+                yield batch
+        seen |= shard_keys
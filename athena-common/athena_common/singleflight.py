@@ -0,0 +1,267 @@
+import os
+import time
+import uuid
+import threading
+
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+from athena_common.cache import query_hash
+
+logger = Logger(service="AthenaSingleFlight")
+
+# a lease pointing at one of these is taken over instead of joined
+DEAD_STATES = ("FAILED", "CANCELLED")
+# BatchGetItem accepts at most this many keys per request
+BATCH_GET_LIMIT = 100
+
+
+class MemoryLeaseIndex:
+    """Local stand-in for the lease table (tests, threads of one container)."""
+
+    def __init__(self):
+        self.leases = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float):
+        lease = self.leases.get(key)
+        return dict(lease) if lease and lease["expira_em"] > now else None
+
+    def get_many(self, keys: list, now: float) -> dict:
+        """Live leases among `keys`, by key (absent = free)."""
+        return {key: lease for key in keys if (lease := self.get(key, now))}
+
+    def acquire(self, key: str, owner: str, expires_at: int, now: float, replacing: str = None) -> bool:
+        with self._lock:
+            current = self.leases.get(key)
+            if replacing is not None:
+                if current is None or current.get("query_execution_id") != replacing:
+                    return False
+            elif current is not None and current["expira_em"] > now:
+                return False
+            self.leases[key] = {"dono": owner, "query_execution_id": None, "expira_em": expires_at}
+            return True
+
+    def attach(self, key: str, owner: str, query_execution_id: str, expires_at: int = None):
+        with self._lock:
+            lease = self.leases.get(key)
+            if lease and lease["dono"] == owner:
+                lease["query_execution_id"] = query_execution_id
+                if expires_at is not None:
+                    lease["expira_em"] = expires_at
+
+    def release(self, key: str, owner: str):
+        with self._lock:
+            if self.leases.get(key, {}).get("dono") == owner:
+                del self.leases[key]
+
+    def release_query(self, key: str, query_execution_id: str):
+        with self._lock:
+            if self.leases.get(key, {}).get("query_execution_id") == query_execution_id:
+                del self.leases[key]
+
+
+class DynamoLeaseIndex:
+    """
+    Leases as `<prefix><key>` items of a table keyed by `chave` with TTL
+    on `expira_em` (the result cache table fits). Taking a lease is a
+    conditional put, so exactly one caller wins it.
+    """
+
+    def __init__(self, client, table_name: str, prefix: str = "f#", max_attempts: int = 5,
+                 backoff: float = 0.05, sleep=time.sleep):
+        self.client = client
+        self.table_name = table_name
+        self.prefix = prefix
+        # BatchGetItem rounds for the UnprocessedKeys of one chunk, with doubling delays
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._sleep = sleep
+
+    def _key(self, key: str) -> dict:
+        return {"chave": {"S": f"{self.prefix}{key}"}}
+
+    @staticmethod
+    def _lease(item: dict, now: float):
+        if not item or int(item["expira_em"]["N"]) <= now:
+            return None
+        return {
+            "dono": item["dono"]["S"],
+            "query_execution_id": item.get("query_execution_id", {}).get("S"),
+            "expira_em": int(item["expira_em"]["N"]),
+        }
+
+    def get(self, key: str, now: float):
+        item = self.client.get_item(TableName=self.table_name, Key=self._key(key), ConsistentRead=True).get("Item")
+        return self._lease(item, now)
+
+    def get_many(self, keys: list, now: float) -> dict:
+        """
+        Live leases among `keys`, by key (absent = free). One BatchGetItem
+        per BATCH_GET_LIMIT keys; UnprocessedKeys are asked again with
+        backoff, and a ClientError is raised if some are still unread
+        after max_attempts (a key must not look free just because it was
+        throttled).
+        """
+        leases = {}
+        for start in range(0, len(keys), BATCH_GET_LIMIT):
+            for item in self._batch_get([self._key(key) for key in keys[start:start + BATCH_GET_LIMIT]]):
+                lease = self._lease(item, now)
+                if lease:
+                    leases[item["chave"]["S"][len(self.prefix):]] = lease
+        return leases
+
+    def _batch_get(self, keys: list) -> list:
+        items = []
+        request = {self.table_name: {"Keys": keys, "ConsistentRead": True}}
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self._sleep(self.backoff * 2 ** (attempt - 1))
+            response = self.client.batch_get_item(RequestItems=request)
+            items += response.get("Responses", {}).get(self.table_name, [])
+            request = response.get("UnprocessedKeys")
+            if not request:
+                return items
+        unread = len(request.get(self.table_name, {}).get("Keys", []))
+        raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException",
+                                     "Message": f"{unread} lease keys still unprocessed after "
+                                                f"{self.max_attempts} attempts"}}, "BatchGetItem")
+
+    def _conditional(self, call, **params) -> bool:
+        try:
+            call(TableName=self.table_name, **params)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def acquire(self, key: str, owner: str, expires_at: int, now: float, replacing: str = None) -> bool:
+        item = {**self._key(key), "dono": {"S": owner}, "expira_em": {"N": str(expires_at)}}
+        if replacing is None:
+            condition = "attribute_not_exists(chave) OR expira_em <= :agora"
+            values = {":agora": {"N": str(int(now))}}
+        else:
+            condition = "query_execution_id = :anterior"
+            values = {":anterior": {"S": replacing}}
+        return self._conditional(self.client.put_item, Item=item, ConditionExpression=condition,
+                                 ExpressionAttributeValues=values)
+
+    def attach(self, key: str, owner: str, query_execution_id: str, expires_at: int = None):
+        update, values = "SET query_execution_id = :qid", {":qid": {"S": query_execution_id}, ":dono": {"S": owner}}
+        if expires_at is not None:
+            update += ", expira_em = :expira"
+            values[":expira"] = {"N": str(expires_at)}
+        self._conditional(self.client.update_item, Key=self._key(key), UpdateExpression=update,
+                          ConditionExpression="dono = :dono", ExpressionAttributeValues=values)
+
+    def release(self, key: str, owner: str):
+        self._conditional(self.client.delete_item, Key=self._key(key), ConditionExpression="dono = :dono",
+                          ExpressionAttributeValues={":dono": {"S": owner}})
+
+    def release_query(self, key: str, query_execution_id: str):
+        """Free the lease if it is still bound to this execution (any owner)."""
+        self._conditional(self.client.delete_item, Key=self._key(key),
+                          ConditionExpression="query_execution_id = :qid",
+                          ExpressionAttributeValues={":qid": {"S": query_execution_id}})
+
+
+class SingleFlight:
+    """
+    At most one Athena execution per distinct query in flight. The first
+    caller of a query takes a lease on its normalized hash and starts the
+    execution; callers arriving while the lease lives get the same
+    QueryExecutionId and wait on it instead of starting a duplicate.
+
+    A lease lives `lease_seconds`. One whose query FAILED or was CANCELLED
+    (e.g. its first caller timed out) is taken over by the next caller.
+    If the holder has not published its QueryExecutionId within
+    `attach_timeout` seconds, the caller starts its own execution.
+    """
+
+    def __init__(self, index, lease_seconds: int = 120, attach_timeout: float = 5.0,
+                 poll_interval: float = 0.1, sleep=time.sleep, clock=time.time):
+        self.index = index
+        self.lease_seconds = lease_seconds
+        self.attach_timeout = attach_timeout
+        self.poll_interval = poll_interval
+        self._sleep = sleep
+        self._clock = clock
+
+    def start(self, query: str, submit, client=None, variant: str = "") -> str:
+        """
+        Args:
+            query (str): SQL; its normalized hash (plus variant) is the lease key.
+            submit: Callable () -> QueryExecutionId that really starts the query.
+            client: Athena client, to check the state of a lease's execution.
+            variant (str): Extra key part (database, output variant, ...).
+
+        Returns:
+            str: QueryExecutionId, started here or joined.
+        """
+        key = query_hash(query, variant)
+        owner = uuid.uuid4().hex
+        deadline = self._clock() + self.attach_timeout
+        while True:
+            now = self._clock()
+            try:
+                lease = self.index.get(key, now)
+                query_execution_id = lease.get("query_execution_id") if lease else None
+                leader = None
+                if lease is None or self._dead(client, query_execution_id):
+                    leader = self.index.acquire(key, owner, int(now + self.lease_seconds), now,
+                                                replacing=query_execution_id)
+            except ClientError as e:
+                logger.warning(f"Single-flight lease unavailable, starting the query directly: {e}")
+                return submit()
+            if leader:
+                return self._lead(key, owner, submit)
+            if leader is False:
+                continue  # another caller took the lease first: read it again
+            if query_execution_id:
+                logger.info(f"Joined in-flight Athena query {query_execution_id}")
+                return query_execution_id
+            if now >= deadline:
+                logger.warning("Lease holder has not started its query; starting a separate execution")
+                return submit()
+            self._sleep(self.poll_interval)
+
+    def _lead(self, key: str, owner: str, submit) -> str:
+        try:
+            query_execution_id = submit()
+        except Exception:
+            try:
+                self.index.release(key, owner)
+            except ClientError as e:
+                logger.warning(f"Could not release single-flight lease: {e}")
+            raise
+        try:
+            self.index.attach(key, owner, query_execution_id)
+        except ClientError as e:
+            # the query runs anyway; later callers start their own after attach_timeout
+            logger.warning(f"Could not publish {query_execution_id} on its lease: {e}")
+        return query_execution_id
+
+    @staticmethod
+    def _dead(client, query_execution_id: str) -> bool:
+        if client is None or not query_execution_id:
+            return False
+        try:
+            execution = client.get_query_execution(QueryExecutionId=query_execution_id)["QueryExecution"]
+        except ClientError:
+            return False
+        return execution["Status"]["State"] in DEAD_STATES
+
+
+def single_flight_from_env():
+    """
+    SingleFlight on ATHENA_SINGLE_FLIGHT_TABLE, or on the result cache table
+    (RESULT_CACHE_TABLE); None when neither is set or
+    ATHENA_SINGLE_FLIGHT_SECONDS is 0.
+    """
+    table = os.getenv("ATHENA_SINGLE_FLIGHT_TABLE") or os.getenv("RESULT_CACHE_TABLE")
+    lease_seconds = int(os.getenv("ATHENA_SINGLE_FLIGHT_SECONDS", "120"))
+    if not table or not lease_seconds:
+        return None
+    return SingleFlight(DynamoLeaseIndex(boto3.client("dynamodb"), table), lease_seconds=lease_seconds)
@@ -0,0 +1,115 @@
+import os
+
+import boto3
+from aws_lambda_powertools import Logger
+
+from athena_common.decoder import ResultSetDecoder
+from athena_common.results import split_s3_uri
+from athena_common.sharding import MANIFEST_VERSION
+
+logger = Logger(service="AthenaUnloadExport")
+
+# WITH (...) of each tipo_arquivo. json/ndjson: one object per line, gzip;
+# csv: TEXTFILE, no header line (the manifest carries the column order)
+UNLOAD_FORMATS = {
+    "parquet": "format = 'PARQUET', compression = 'ZSTD'",
+    "json": "format = 'JSON', compression = 'GZIP'",
+    "ndjson": "format = 'JSON', compression = 'GZIP'",
+    "csv": "format = 'TEXTFILE', field_delimiter = ',', compression = 'GZIP'",
+}
+
+
+def _strip(query: str) -> str:
+    return query.strip().rstrip(";").strip()
+
+
+def unload_query(query: str, destination: str, tipo_arquivo: str) -> str:
+    """
+    UNLOAD of a SELECT into `destination` (an s3:// prefix that must not
+    contain objects yet): Athena's workers write the files in parallel.
+    """
+    options = UNLOAD_FORMATS.get((tipo_arquivo or "").lower())
+    if options is None:
+        raise ValueError(f"UNLOAD does not support tipo_arquivo {tipo_arquivo!r}; "
+                         f"expected one of {sorted(UNLOAD_FORMATS)}")
+    if not destination.endswith("/"):
+        destination += "/"
+    return f"UNLOAD ({_strip(query)})\nTO '{destination}'\nWITH ({options})"
+
+
+def count_query(query: str) -> str:
+    """Preflight row count of a SELECT (same predicates, so the same partitions are pruned)."""
+    return f"SELECT COUNT(*) AS linhas FROM ({_strip(query)}) resultado"
+
+
+class UnloadExport:
+    """
+    Export mode for large lookups: the query is wrapped in UNLOAD and the
+    rows never pass through the Lambda. `should_unload` switches the mode on
+    at `min_rows` (0 = never), estimated by a preflight COUNT(*).
+    """
+
+    def __init__(self, executor, s3_client=None, min_rows: int = 0):
+        self.executor = executor
+        self.s3_client = s3_client or boto3.client("s3")
+        self.min_rows = min_rows
+
+    @classmethod
+    def from_env(cls, executor, s3_client=None) -> "UnloadExport":
+        return cls(executor, s3_client, min_rows=int(os.getenv("ATHENA_UNLOAD_MIN_ROWS", "0")))
+
+    def estimate_rows(self, query: str, context=None) -> int:
+        execution = self.executor.run(count_query(query), context=context)
+        table = ResultSetDecoder(self.executor.client).read_table(execution["QueryExecutionId"])
+        return table.column(0)[0].as_py() if table.num_rows else 0
+
+    def should_unload(self, query: str, context=None) -> bool:
+        if not self.min_rows:
+            return False
+        rows = self.estimate_rows(query, context)
+        logger.info(f"Preflight count: {rows} rows (UNLOAD from {self.min_rows})")
+        return rows >= self.min_rows
+
+    def run(self, query: str, destination: str, tipo_arquivo: str, context=None) -> dict:
+        """
+        Args:
+            query (str): The lookup's SELECT.
+            destination (str): s3://bucket/prefix/ for the data files; must be empty.
+            tipo_arquivo (str): 'parquet', 'json', 'ndjson' or 'csv'.
+            context: Lambda context bounding the wait.
+
+        Returns:
+            dict: The manifest, listing the files Athena wrote.
+        """
+        execution = self.executor.run(unload_query(query, destination, tipo_arquivo), context=context,
+                                      priority="batch")
+        return self.manifest(execution, destination, tipo_arquivo)
+
+    def start(self, query: str, destination: str, tipo_arquivo: str) -> str:
+        """Submit the UNLOAD without waiting (asynchronous jobs); returns its QueryExecutionId."""
+        return self.executor.submit(unload_query(query, destination, tipo_arquivo), priority="batch")
+
+    def manifest(self, execution: dict, destination: str, tipo_arquivo: str) -> dict:
+        """Manifest of a finished UNLOAD: the files Athena wrote under `destination`."""
+        if not destination.endswith("/"):
+            destination += "/"
+        files = self._list(destination)
+        logger.info(f"UNLOAD wrote {len(files)} files to {destination}")
+        return {
+            "versao": MANIFEST_VERSION,
+            "modo": "unload",
+            "query_execution_id": execution["QueryExecutionId"],
+            "tipo_arquivo": tipo_arquivo,
+            "formato": UNLOAD_FORMATS[tipo_arquivo.lower()],
+            "destino": destination,
+            "bytes_scanned": execution.get("Statistics", {}).get("DataScannedInBytes"),
+            "arquivos": files,
+        }
+
+    def _list(self, destination: str) -> list:
+        bucket, prefix = split_s3_uri(destination)
+        files = []
+        for page in self.s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+            files.extend({"s3_uri": f"s3://{bucket}/{item['Key']}", "bytes": item["Size"]}
+                         for item in page.get("Contents", []))
+        return sorted(files, key=lambda f: f["s3_uri"])
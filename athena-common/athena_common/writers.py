@@ -0,0 +1,187 @@
+import io
+import json
+import datetime
+import decimal
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="AthenaResultWriter")
+
+# S3 rejects multipart parts under 5 MiB (except the last one)
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+
+def _json_default(value):
+    """Typed result columns (ResultSetDecoder.schema): dates as ISO text, decimals as exact text."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# json.dumps() with options builds a new encoder per call
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Write-only stream to an S3 object. Bytes are buffered into `part_size`
+    parts and uploaded by `max_workers` threads while the caller keeps
+    serializing, with at most `max_workers` parts in flight, so memory stays
+    at about (max_workers + 1) parts whatever the object size.
+
+    Objects smaller than one part go up in a single put_object. close()
+    completes the upload; leaving a `with` block on an exception (or
+    calling abort()) aborts it, so no orphan parts are billed.
+    """
+
+    def __init__(self, s3, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                 max_workers: int = 4, content_type: str = "application/octet-stream",
+                 content_encoding: str = None, metadata: dict = None):
+        super().__init__()
+        self._s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self._part_size = part_size
+        self._max_workers = max_workers
+        self._extra = {"ContentType": content_type}
+        if content_encoding:
+            self._extra["ContentEncoding"] = content_encoding
+        if metadata:
+            self._extra["Metadata"] = metadata
+        self._buffer = bytearray()
+        self._pool = None
+        self._pending = deque()
+        self._parts = []
+        self._upload_id = None
+        self.bytes_written = 0
+
+    def writable(self):
+        return True
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def __del__(self):
+        # IOBase would close() here, completing a half-written object; an
+        # abandoned upload is left to the bucket's abort-incomplete rule
+        pass
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to a closed S3MultipartWriter")
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self._part_size:
+            part = bytes(self._buffer[:self._part_size])
+            del self._buffer[:self._part_size]
+            self._submit(part)
+        return len(data)
+
+    def _submit(self, part: bytes):
+        if self._upload_id is None:
+            self._upload_id = self._s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self._extra
+            )["UploadId"]
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="s3-part")
+        if len(self._pending) >= self._max_workers:
+            self._parts.append(self._pending.popleft().result())
+        number = len(self._parts) + len(self._pending) + 1
+        self._pending.append(self._pool.submit(self._upload_part, number, part))
+
+    def _upload_part(self, number: int, part: bytes) -> dict:
+        response = self._s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                        PartNumber=number, Body=part)
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self._s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self._extra)
+            else:
+                if self._buffer:
+                    self._submit(bytes(self._buffer))
+                while self._pending:
+                    self._parts.append(self._pending.popleft().result())
+                self._s3.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts},
+                )
+                self._pool.shutdown()
+            logger.info(f"Wrote {self.bytes_written} bytes to s3://{self.bucket}/{self.key} "
+                        f"in {max(len(self._parts), 1)} part(s)")
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+            super().close()
+
+    def abort(self):
+        """Drop everything written so far (aborts the multipart upload, if any)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._upload_id is not None:
+            try:
+                self._s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            except ClientError as e:
+                logger.warning(f"Could not abort multipart upload of {self.key}: {e}")
+            self._upload_id = None
+        self._buffer = bytearray()
+        super().close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def _records(batch, columns: list = None):
+    rows = batch.to_pylist()
+    if columns:
+        rows = [{column: row.get(column) for column in columns} for row in rows]
+    return rows
+
+
+def write_json(batches, sink, columns: list = None, ndjson: bool = False) -> int:
+    """
+    Serialize record batches to `sink` (any binary writer, e.g. an
+    S3MultipartWriter) as they arrive: a compact JSON array, or one object
+    per line with ndjson=True. Only one batch is held in memory at a time.
+
+    Args:
+        batches: Iterable of pyarrow.RecordBatch (e.g. ResultReader.iter_batches).
+        sink: Binary file-like object.
+        columns (list): Keys and key order of every record (None keeps the batch's).
+        ndjson (bool): Newline-delimited JSON instead of an array.
+
+    Returns:
+        int: Number of records written.
+    """
+    rows = 0
+    if not ndjson:
+        sink.write(b"[")
+    for batch in batches:
+        records = _records(batch, columns)
+        if not records:
+            continue
+        if ndjson:
+            encoded = "\n".join(map(_ENCODER.encode, records)) + "\n"
+        else:
+            # one dumps() per batch, without its brackets
+            encoded = ("," if rows else "") + _ENCODER.encode(records)[1:-1]
+        sink.write(encoded.encode("utf-8"))
+        rows += len(records)
+    if not ndjson:
+        sink.write(b"]")
+    return rows
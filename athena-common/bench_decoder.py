@@ -0,0 +1,116 @@
+"""
+Decoding get_query_results pages: the previous readers (AthenaUtils'
+all-string DataFrame and lambda-with-athena-3's list of dicts with "" for
+NULL, reproduced here without their logging) vs ResultSetDecoder's typed
+record batches, and the dict/DataFrame views built from them.
+
+The same 1000-row page is handed out repeatedly, so only decoding is
+measured, not building the API responses. Peak memory is reported for
+Python objects (tracemalloc) and, separately, for the Arrow buffers the
+result holds.
+
+    python bench_decoder.py --rows 10000 100000 1000000
+"""
+import time
+import argparse
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+from athena_common import decode_rows, iter_records, result_schema
+
+COLUMN_INFO = [
+    {"Name": "cnpj_base_participante", "Type": "varchar"},
+    {"Name": "agencia", "Type": "varchar"},
+    {"Name": "conta", "Type": "bigint"},
+    {"Name": "saldo", "Type": "decimal", "Precision": 15, "Scale": 2},
+    {"Name": "data_vinculo", "Type": "date"},
+    {"Name": "atualizado_em", "Type": "timestamp"},
+]
+
+
+def make_page(page_rows=1000):
+    rows = []
+    for i in range(page_rows):
+        values = [f"{i % 10**8:08d}", f"{i % 10**4:04d}", str(i), f"{i}.{i % 100:02d}",
+                  "2023-01-01", "2023-01-01 12:00:00.000"]
+        rows.append({"Data": [{"VarCharValue": v} if i % 50 or n != 3 else {} for n, v in enumerate(values)]})
+    return {"ResultSet": {"Rows": rows, "ResultSetMetadata": {"ColumnInfo": COLUMN_INFO}}}
+
+
+def pages(total, page):
+    header = {"Data": [{"VarCharValue": c["Name"]} for c in COLUMN_INFO]}
+    size = len(page["ResultSet"]["Rows"])
+    for start in range(0, total, size):
+        rows = page["ResultSet"]["Rows"][:min(size, total - start)]
+        yield {"ResultSet": {"Rows": [header] + rows if start == 0 else rows,
+                             "ResultSetMetadata": page["ResultSet"]["ResultSetMetadata"]}}
+
+
+def legacy_dataframe(source):
+    rows = []
+    for page in source:
+        rows.extend(page["ResultSet"]["Rows"])
+    headers = [col.get("VarCharValue", None) for col in rows[0]["Data"]]
+    data = [[col.get("VarCharValue", None) for col in row["Data"]] for row in rows[1:]]
+    return pd.DataFrame(data, columns=headers)
+
+
+def legacy_dicts(source):
+    rows = []
+    for page in source:
+        rows.extend(page["ResultSet"]["Rows"])
+    headers = [col["VarCharValue"] for col in rows[0]["Data"]]
+    return [
+        {headers[i]: value.get("VarCharValue", "") for i, value in enumerate(row["Data"])}
+        for row in rows[1:]
+    ]
+
+
+def typed_batches(source):
+    schema = None
+    for page in source:
+        rows = page["ResultSet"]["Rows"]
+        if schema is None:
+            schema = result_schema(page["ResultSet"]["ResultSetMetadata"]["ColumnInfo"])
+            rows = rows[1:]
+        yield decode_rows(rows, schema)
+
+
+def measure(label, fn):
+    began = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - began
+    # Arrow buffers are outside tracemalloc: count what the result keeps in Arrow's pool
+    arrow = pa.total_allocated_bytes()
+    rows = result if isinstance(result, int) else len(result)
+    del result
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {elapsed:>7.2f}s {peak / 2**20:>9.1f} MiB {arrow / 2**20:>9.1f} MiB {rows:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    page = make_page()
+
+    def table(total):
+        return pa.Table.from_batches(list(typed_batches(pages(total, page))))
+
+    for total in args.rows:
+        print(f"\n{total} linhas")
+        print(f"{'':<32} {'tempo':>8} {'pico Python':>13} {'Arrow':>13} {'linhas':>10}")
+        measure("AthenaUtils DataFrame (strings)", lambda: legacy_dataframe(pages(total, page)))
+        measure("fetch_query_results (dicts)", lambda: legacy_dicts(pages(total, page)))
+        measure("decode_rows -> Table", lambda: table(total))
+        measure("decode_rows -> iter_records", lambda: sum(1 for _ in iter_records(typed_batches(pages(total, page)))))
+        measure("decode_rows -> to_pandas", lambda: table(total).to_pandas())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Size, write time and downstream parse time of each output format for the
+same query result (the record batches ResultReader yields).
+
+    python bench_formats.py --rows 200000
+"""
+import io
+import csv
+import gzip
+import json
+import time
+import argparse
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from athena_common import FORMATS
+from bench_writers import result_batches
+
+
+def parse(name, body):
+    if name == "json":
+        return len(json.loads(body))
+    if name == "ndjson":
+        return sum(1 for line in gzip.decompress(body).splitlines() if json.loads(line))
+    if name == "csv":
+        return sum(1 for _ in csv.DictReader(io.StringIO(body.decode("utf-8"))))
+    return pq.read_table(io.BytesIO(body)).num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    batches = list(result_batches(args.rows))
+    legacy = pa.Table.from_batches(batches).to_pandas().to_json(orient="records", indent=4, force_ascii=False)
+    legacy_size = len(legacy.encode("utf-8"))
+    print(f"{'formato':<10} {'tamanho':>10} {'vs indent=4':>12} {'escrita':>9} {'leitura':>9}")
+    print(f"{'legado':<10} {legacy_size / 2**20:>9.1f}M {1:>11.1f}x")
+    for name, fmt in FORMATS.items():
+        sink = pa.BufferOutputStream()
+        began = time.perf_counter()
+        fmt.write(iter(batches), sink)
+        written = time.perf_counter() - began
+        body = sink.getvalue().to_pybytes()
+        began = time.perf_counter()
+        assert parse(name, body) == args.rows
+        parsed = time.perf_counter() - began
+        print(f"{name:<10} {len(body) / 2**20:>9.1f}M {legacy_size / len(body):>11.1f}x "
+              f"{written:>8.2f}s {parsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Simulated comparison of polling strategies for AthenaExecutor.wait().
+
+Queries get a queue time and an execution time drawn from log-normal
+distributions; a fake Athena client answers get_query_execution from a
+virtual clock, and every API call costs a fixed round trip. For each
+strategy we report the detection overhead (time between the query really
+finishing and wait() returning) and the number of get_query_execution
+calls per query.
+
+    python bench_polling.py --queries 5000
+"""
+import random
+import argparse
+import statistics
+
+from athena_common import AthenaExecutor, BackoffPolicy
+from athena_common import executor as executor_module
+
+# one INFO line per simulated query would drown the table
+executor_module.logger.setLevel("WARNING")
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def __call__(self):
+        return self.now
+
+
+class SimulatedAthena:
+    """Answers get_query_execution for one query from the virtual clock."""
+
+    def __init__(self, clock, queue_s, run_s, rtt_s):
+        self.clock = clock
+        self.queue_s = queue_s
+        self.done_at = queue_s + run_s
+        self.rtt_s = rtt_s
+        self.calls = 0
+
+    def get_query_execution(self, QueryExecutionId):
+        self.calls += 1
+        self.clock.sleep(self.rtt_s)
+        now = self.clock.now
+        if now >= self.done_at:
+            state = "SUCCEEDED"
+        elif now >= self.queue_s:
+            state = "RUNNING"
+        else:
+            state = "QUEUED"
+        stats = {"QueryQueueTimeInMillis": int(min(now, self.queue_s) * 1000)}
+        return {"QueryExecution": {"QueryExecutionId": QueryExecutionId,
+                                   "Status": {"State": state}, "Statistics": stats}}
+
+
+class UnseededBackoff(BackoffPolicy):
+    """Same growth, but the clock keeps counting the time spent in the queue."""
+
+    def delay(self, elapsed, state="RUNNING", statistics=None):
+        return super().delay(elapsed, "QUEUED", statistics)
+
+
+STRATEGIES = {
+    # lambda-with-athena: loop without sleep
+    "tight-loop": lambda rng: BackoffPolicy.fixed(0.0),
+    # lambda-with-athena-2: fixed 2s sleep
+    "fixed-2s": lambda rng: BackoffPolicy.fixed(2.0),
+    "backoff-unseeded": lambda rng: UnseededBackoff(rng=rng),
+    "backoff": lambda rng: BackoffPolicy(rng=rng),
+}
+
+SCENARIOS = {
+    # (median queue s, median execution s)
+    "interactive": (0.3, 1.5),
+    "busy-workgroup": (6.0, 1.5),
+}
+
+
+def simulate(make_policy, durations, rtt_s):
+    overheads, calls = [], []
+    rng = random.Random(11)
+    for queue_s, run_s in durations:
+        clock = VirtualClock()
+        athena = SimulatedAthena(clock, queue_s, run_s, rtt_s)
+        executor = AthenaExecutor(athena, backoff=make_policy(rng), sleep=clock.sleep, clock=clock)
+        executor.wait("qid")
+        overheads.append(clock.now - athena.done_at)
+        calls.append(athena.calls)
+    return overheads, calls
+
+
+def percentile(values, q):
+    return sorted(values)[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=5000)
+    ap.add_argument("--rtt", type=float, default=0.04, help="get_query_execution round trip (s)")
+    args = ap.parse_args()
+
+    for scenario, (median_queue, median_run) in SCENARIOS.items():
+        rng = random.Random(7)
+        durations = [
+            (rng.lognormvariate(0, 1.0) * median_queue, rng.lognormvariate(0, 1.0) * median_run)
+            for _ in range(args.queries)
+        ]
+        print(f"\n{scenario}: {args.queries} queries, median queue {median_queue}s, "
+              f"median execution {median_run}s, rtt {args.rtt * 1000:.0f}ms")
+        print(f"{'strategy':<20}{'overhead mean':>14}{'p50':>8}{'p95':>8}{'calls/query':>13}")
+        for name, make_policy in STRATEGIES.items():
+            overheads, calls = simulate(make_policy, durations, args.rtt)
+            print(f"{name:<20}{statistics.mean(overheads):>13.3f}s{percentile(overheads, .5):>7.3f}s"
+                  f"{percentile(overheads, .95):>7.3f}s{statistics.mean(calls):>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Bytes scanned with and without partition pruning on a local dataset.
+
+Writes a hive-partitioned Parquet copy of a synthetic tb_detalhamento_spec
+(one partition per day, like the ingest in aws-lambda-glue) and, for a few
+lookup windows, sums the size of the files a scan has to open: all of them
+without pruning, only the partitions matched by PartitionLayout.bounds()
+with it. Athena bills on the same quantity, so the ratio carries over.
+
+    python bench_pruning.py --days 365 --rows-per-day 20000
+"""
+import os
+import random
+import datetime
+import argparse
+import tempfile
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from athena_common import PartitionLayout
+
+WINDOWS = [("1 dia", 1), ("1 semana", 7), ("1 mês", 30), ("1 trimestre", 90)]
+
+
+def build_dataset(root, layout, start, days, rows_per_day, seed=0):
+    rng = random.Random(seed)
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        table = pa.table({
+            "cnpj_base_participante": [f"{rng.randrange(10**8):08d}" for _ in range(rows_per_day)],
+            "agencia": [f"{rng.randrange(10**4):04d}" for _ in range(rows_per_day)],
+            "conta": [f"{rng.randrange(10**6):06d}" for _ in range(rows_per_day)],
+            "data_vinculo": [day.isoformat()] * rows_per_day,
+            "valor": [rng.random() * 1000 for _ in range(rows_per_day)],
+        })
+        path = os.path.join(root, *(f"{k.name}={day.strftime(k.fmt)}" for k in layout.keys))
+        os.makedirs(path, exist_ok=True)
+        ds.write_dataset(table, path, format="parquet", basename_template="part-{i}.parquet",
+                         existing_data_behavior="overwrite_or_ignore")
+
+
+def partition_filter(layout, data_inicio, data_fim):
+    """Same bounds the SQL predicate uses, as a pyarrow expression on the string keys."""
+    expression = None
+    for key, low, high in layout.bounds(data_inicio, data_fim):
+        field = ds.field(key.name)
+        clause = (field == low) if high == low else (field >= low) & (field <= high)
+        expression = clause if expression is None else expression & clause
+    return expression
+
+
+def scanned_bytes(dataset, expression=None):
+    return sum(os.path.getsize(f.path) for f in dataset.get_fragments(filter=expression))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--rows-per-day", type=int, default=20000)
+    parser.add_argument("--layout", default="anomesdia")
+    args = parser.parse_args()
+
+    layout = PartitionLayout.parse(args.layout)
+    start = datetime.date(2023, 1, 1)
+    with tempfile.TemporaryDirectory() as root:
+        build_dataset(root, layout, start, args.days, args.rows_per_day)
+        schema = pa.schema([(k.name, pa.string()) for k in layout.keys])
+        dataset = ds.dataset(root, format="parquet", partitioning=ds.partitioning(schema, flavor="hive"))
+        total = scanned_bytes(dataset)
+
+        print(f"layout={args.layout} dias={args.days} total={total / 2**20:.1f} MiB")
+        print(f"{'janela':<12} {'predicado':<60} {'sem poda':>10} {'com poda':>10} {'redução':>8}")
+        for label, length in WINDOWS:
+            data_inicio = start + datetime.timedelta(days=args.days // 2)
+            data_fim = data_inicio + datetime.timedelta(days=length - 1)
+            pruned = scanned_bytes(dataset, partition_filter(layout, data_inicio, data_fim))
+            print(f"{label:<12} {layout.predicate(data_inicio, data_fim):<60} "
+                  f"{total / 2**20:>9.1f}M {pruned / 2**20:>9.2f}M {total / max(pruned, 1):>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
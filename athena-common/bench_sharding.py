@@ -0,0 +1,85 @@
+"""
+Wall-clock time of a multi-year export, one query vs ShardedExport.
+
+A fake Athena client runs every query for `overhead + days * per_day`
+seconds of real time (scaled down: by default one day of data costs 10ms),
+so shards really run side by side in the pool threads. Queue time is the
+same for every query; Athena's own concurrency limit is not modelled, so
+keep --parallelism within the workgroup's DML quota when reading the table.
+
+    python bench_sharding.py --years 3 --parallelism 1 2 4 8
+"""
+import time
+import datetime
+import argparse
+import threading
+
+from athena_common import AthenaExecutor, BackoffPolicy, ShardedExport
+from athena_common import executor as executor_module
+from athena_common import sharding as sharding_module
+
+executor_module.logger.setLevel("WARNING")
+sharding_module.logger.setLevel("WARNING")
+
+
+class TimedAthena:
+    """Queries finish `overhead + days * per_day` seconds after they start."""
+
+    def __init__(self, overhead: float, per_day: float):
+        self.overhead = overhead
+        self.per_day = per_day
+        self.finish = {}
+        self.lock = threading.Lock()
+
+    def start_query_execution(self, QueryString, **kwargs):
+        start, end = (datetime.date.fromisoformat(d) for d in QueryString.split("|"))
+        days = (end - start).days + 1
+        with self.lock:
+            qid = f"q{len(self.finish)}"
+            self.finish[qid] = time.monotonic() + self.overhead + days * self.per_day
+        return {"QueryExecutionId": qid}
+
+    def get_query_execution(self, QueryExecutionId):
+        done = time.monotonic() >= self.finish[QueryExecutionId]
+        return {"QueryExecution": {
+            "QueryExecutionId": QueryExecutionId,
+            "Status": {"State": "SUCCEEDED" if done else "RUNNING"},
+            "ResultConfiguration": {"OutputLocation": f"s3://bench/{QueryExecutionId}.csv"},
+            "Statistics": {},
+        }}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--overhead", type=float, default=0.05, help="fixed seconds per query (planning, queue)")
+    parser.add_argument("--per-day", type=float, default=0.01, help="seconds of scan per day of data")
+    args = parser.parse_args()
+
+    data_inicio = datetime.date(2019, 1, 1)
+    data_fim = datetime.date(2019 + args.years - 1, 12, 31)
+    backoff = BackoffPolicy(initial=0.005, ratio=0.05, max_delay=0.05, jitter=0.0)
+
+    def build_query(start, end):
+        return f"{start}|{end}"
+
+    client = TimedAthena(args.overhead, args.per_day)
+    executor = AthenaExecutor(client, backoff=backoff)
+    began = time.monotonic()
+    executor.run(build_query(data_inicio.isoformat(), data_fim.isoformat()))
+    single = time.monotonic() - began
+    print(f"{data_inicio} .. {data_fim}: query única {single:.2f}s")
+
+    print(f"{'paralelismo':>11} {'shards':>7} {'tempo':>8} {'speedup':>8}")
+    for parallelism in args.parallelism:
+        export = ShardedExport(AthenaExecutor(TimedAthena(args.overhead, args.per_day), backoff=backoff),
+                               parallelism=parallelism)
+        began = time.monotonic()
+        manifest = export.run([(data_inicio, data_fim)], build_query)
+        elapsed = time.monotonic() - began
+        print(f"{parallelism:>11} {len(manifest['shards']):>7} {elapsed:>7.2f}s {single / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Peak memory and time of serializing a query result: the old whole-document
+path (read_table().to_pandas().to_json(indent=4)) vs write_json streaming
+record batches into a sink, as S3MultipartWriter receives them.
+
+Time is measured on a plain run; peak memory (Python objects, tracemalloc)
+on a second one.
+
+    python bench_writers.py --rows 200000
+"""
+import io
+import time
+import argparse
+import tracemalloc
+
+import pyarrow as pa
+
+from athena_common import write_json
+
+
+class CountingSink(io.RawIOBase):
+    """Drops the bytes, like an upload that already left the function."""
+
+    def __init__(self):
+        super().__init__()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+
+def result_batches(rows, batch_rows=5000):
+    for start in range(0, rows, batch_rows):
+        ids = range(start, min(start + batch_rows, rows))
+        yield pa.record_batch({
+            "cnpj_base_participante": [f"{i % 10**8:08d}" for i in ids],
+            "agencia": [f"{i % 10**4:04d}" for i in ids],
+            "conta": [f"{i:06d}" for i in ids],
+            "data_vinculo": ["2023-01-01"] * len(ids),
+            "nome": [f"cliente {i}" for i in ids],
+        })
+
+
+def measure(label, fn):
+    began = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - began
+    # second run only for the peak: tracemalloc slows allocation-heavy code
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {elapsed:>7.2f}s {peak / 2**20:>9.1f} MiB {size / 2**20:>9.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    def whole_document():
+        df = pa.Table.from_batches(list(result_batches(args.rows))).to_pandas()
+        return len(df.to_json(orient="records", indent=4, force_ascii=False).encode("utf-8"))
+
+    def streaming(ndjson):
+        def run():
+            sink = CountingSink()
+            write_json(result_batches(args.rows), sink, ndjson=ndjson)
+            return sink.size
+        return run
+
+    print(f"{'':<32} {'tempo':>8} {'pico':>13} {'saída':>13}")
+    measure("to_json(indent=4) em memória", whole_document)
+    measure("write_json array compacto", streaming(False))
+    measure("write_json NDJSON", streaming(True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import random
+import unittest
+
+from athena_common import AdmissionController, AdmissionRejectedError, AthenaExecutor, QueueClass
+from athena_common.singleflight import MemoryLeaseIndex
+from test_executor import FakeClock, execution
+
+
+class FakeAthena:
+    """batch_get_query_execution answers from `states` (default RUNNING)."""
+
+    def __init__(self):
+        self.states = {}
+        self.started = 0
+
+    def batch_get_query_execution(self, QueryExecutionIds):
+        return {"QueryExecutions": [{"QueryExecutionId": qid, "Status": {"State": self.states.get(qid, "RUNNING")}}
+                                    for qid in QueryExecutionIds]}
+
+    def start_query_execution(self, **params):
+        self.started += 1
+        return {"QueryExecutionId": f"q{self.started}"}
+
+    def get_query_execution(self, QueryExecutionId):
+        return execution(self.states.get(QueryExecutionId, "RUNNING"))
+
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.index = MemoryLeaseIndex()
+        self.athena = FakeAthena()
+        classes = {"interactive": QueueClass(max_waiting=2, max_wait=1.0, poll_interval=0.2),
+                   "batch": QueueClass(max_waiting=1, max_wait=3.0, poll_interval=0.5)}
+        self.admission = AdmissionController(self.index, self.athena, capacity=2, reserved=1, classes=classes,
+                                             sleep=self.clock.sleep, clock=self.clock, rng=random.Random(0))
+
+    def fill(self):
+        for n in range(2):
+            self.admission.attach(self.admission.acquire("interactive"), f"busy{n}")
+
+    def test_no_more_than_capacity(self):
+        self.fill()
+        with self.assertRaises(AdmissionRejectedError):
+            self.admission.acquire("interactive")
+        self.assertGreaterEqual(self.clock.now, 1.0)
+        # the wait queue position is given back
+        self.assertEqual(self.index.get_many(["fila#interactive#0", "fila#interactive#1"], self.clock.now), {})
+
+    def test_slot_of_a_finished_query_is_reclaimed(self):
+        self.fill()
+        self.athena.states["busy1"] = "SUCCEEDED"
+        self.admission.acquire("interactive")
+        self.assertEqual(self.clock.now, 0.0)
+        self.assertNotIn("busy1", [lease["query_execution_id"] for lease in self.index.leases.values()])
+
+    def test_reserved_slot_is_only_for_interactive(self):
+        self.admission.acquire("batch")
+        with self.assertRaises(AdmissionRejectedError):
+            self.admission.acquire("batch")
+        self.assertIsNotNone(self.admission.acquire("interactive"))
+
+    def test_unbound_slot_expires(self):
+        self.admission.acquire("interactive")
+        self.admission.acquire("interactive")
+        self.clock.now = self.admission.start_timeout + 1
+        self.assertIsNotNone(self.admission.acquire("interactive"))
+
+    def test_full_queue_rejects_without_waiting(self):
+        self.fill()
+        self.index.acquire("fila#batch#0", "other", 100, 0)
+        with self.assertRaises(AdmissionRejectedError):
+            self.admission.acquire("batch")
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_queued_waiter_is_served_before_a_newcomer(self):
+        self.fill()
+        waiter = "0.000000-waiter"
+        self.index.acquire("fila#interactive#0", waiter, 100, 0)
+        self.clock.now = 0.5
+        self.athena.states["busy1"] = "SUCCEEDED"
+        with self.assertRaises(AdmissionRejectedError):
+            self.admission.acquire("interactive")
+        self.assertIsNotNone(self.admission._take(waiter, "interactive"))
+
+    def test_batch_waiter_does_not_hold_the_reserved_slot(self):
+        self.fill()
+        self.index.acquire("fila#batch#0", "0.000000-waiter", 100, 0)
+        self.clock.now = 0.5
+        self.athena.states["busy1"] = "SUCCEEDED"
+        self.assertIsNotNone(self.admission.acquire("interactive"))
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_executor_holds_the_slot_until_the_query_finishes(self):
+        executor = AthenaExecutor(self.athena, database="db", admission=self.admission,
+                                  sleep=self.clock.sleep, clock=self.clock)
+        first, _ = executor.start("SELECT 1"), executor.start("SELECT 2")
+        with self.assertRaises(AdmissionRejectedError):
+            executor.start("SELECT 3")
+        self.athena.states[first] = "SUCCEEDED"
+        executor.wait(first)
+        self.assertEqual(executor.start("SELECT 3"), "q3")
+
+    def test_submitted_query_slot_is_given_back_by_query_finished(self):
+        executor = AthenaExecutor(self.athena, database="db", admission=self.admission,
+                                  sleep=self.clock.sleep, clock=self.clock)
+        first = executor.submit("SELECT 1")
+        self.assertEqual(executor._slots, {})
+        self.assertEqual([lease["query_execution_id"] for lease in self.index.leases.values()], [first])
+        self.admission.query_finished("other")
+        self.assertEqual(len(self.index.leases), 1)
+        self.admission.query_finished(first)
+        self.assertEqual(self.index.leases, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import time
+import unittest
+from datetime import date, timedelta
+
+from athena_common.cache import (
+    MemoryCacheIndex,
+    ResultCache,
+    invalidation_handler,
+    normalize_query,
+    query_hash,
+    reaches_today,
+)
+
+QUERY = """
+SELECT *
+FROM tb_detalhamento_spec
+WHERE agencia = '0001';
+"""
+
+
+class TestQueryHash(unittest.TestCase):
+    def test_whitespace_and_semicolon_do_not_matter(self):
+        self.assertEqual(normalize_query(QUERY), "SELECT * FROM tb_detalhamento_spec WHERE agencia = '0001'")
+        self.assertEqual(query_hash(QUERY), query_hash("SELECT * FROM tb_detalhamento_spec WHERE agencia = '0001'"))
+
+    def test_variant_is_part_of_the_key(self):
+        self.assertNotEqual(query_hash(QUERY, "json"), query_hash(QUERY, "csv"))
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResultCache(MemoryCacheIndex(), ttl_seconds=60)
+
+    def test_miss_then_hit(self):
+        entry, generation = self.cache.lookup(QUERY, "tb", "json")
+        self.assertIsNone(entry)
+        self.cache.store(QUERY, "tb", "qid", "out/json_1.json", generation, "json")
+        entry, _ = self.cache.lookup(QUERY, "tb", "json")
+        self.assertEqual(entry["query_execution_id"], "qid")
+        self.assertEqual(entry["output_key"], "out/json_1.json")
+
+    def test_expired_entry_is_a_miss(self):
+        _, generation = self.cache.lookup(QUERY, "tb")
+        self.cache.store(QUERY, "tb", "qid", "out/1.json", generation)
+        self.cache.index.entries[query_hash(QUERY)]["expires_at"] = time.time() - 1
+        self.assertIsNone(self.cache.lookup(QUERY, "tb")[0])
+
+    def test_new_partitions_invalidate(self):
+        _, generation = self.cache.lookup(QUERY, "tb")
+        self.cache.store(QUERY, "tb", "qid", "out/1.json", generation)
+        event = {"detail": {"tableName": "tb", "typeOfChange": "BatchCreatePartition"}}
+        self.assertEqual(invalidation_handler(event, None, cache=self.cache), {"invalidated": "tb"})
+        self.assertIsNone(self.cache.lookup(QUERY, "tb")[0])
+
+    def test_result_started_before_invalidation_is_not_fresh(self):
+        _, generation = self.cache.lookup(QUERY, "tb")
+        self.cache.invalidate("tb")  # partitions land while the query runs
+        self.cache.store(QUERY, "tb", "qid", "out/1.json", generation)
+        self.assertIsNone(self.cache.lookup(QUERY, "tb")[0])
+
+    def test_other_catalog_changes_are_ignored(self):
+        event = {"detail": {"tableName": "tb", "typeOfChange": "UpdateTable"}}
+        self.assertEqual(invalidation_handler(event, None, cache=self.cache), {"invalidated": None})
+
+    def test_lookup_reaching_today_gets_the_short_ttl(self):
+        cache = ResultCache(MemoryCacheIndex(), ttl_seconds=3600, recent_ttl_seconds=30)
+        cache.store(QUERY, "tb", "q1", "out/1.json", 0, recent=True)
+        cache.store(QUERY, "tb", "q2", "out/2.json", 0, variant="csv")
+        entries = cache.index.entries
+        self.assertLessEqual(entries[query_hash(QUERY)]["expires_at"], time.time() + 30)
+        self.assertGreater(entries[query_hash(QUERY, "csv")]["expires_at"], time.time() + 3000)
+
+    def test_reaches_today(self):
+        today = date.today()
+        self.assertTrue(reaches_today(None))
+        self.assertTrue(reaches_today(today + timedelta(days=1)))
+        self.assertTrue(reaches_today((today + timedelta(days=1)).isoformat()))
+        self.assertFalse(reaches_today("2020-01-31"))
+
+
+if __name__ == "__main__":
+    unittest.main()
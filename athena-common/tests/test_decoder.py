@@ -0,0 +1,100 @@
+import datetime
+import decimal
+import unittest
+
+import pyarrow as pa
+
+from athena_common.decoder import ResultSetDecoder, arrow_type, iter_records, result_schema
+from athena_common.results import ResultReader
+from test_results import EXECUTION, FakeS3
+
+COLUMN_INFO = [
+    {"Name": "agencia", "Type": "varchar"},
+    {"Name": "conta", "Type": "bigint"},
+    {"Name": "saldo", "Type": "decimal", "Precision": 12, "Scale": 2},
+    {"Name": "ativo", "Type": "boolean"},
+    {"Name": "data_vinculo", "Type": "date"},
+    {"Name": "atualizado_em", "Type": "timestamp"},
+]
+
+
+def cell(value):
+    return {} if value is None else {"VarCharValue": value}
+
+
+def page(rows, header=False):
+    data = [{"Data": [cell(c["Name"]) for c in COLUMN_INFO]}] if header else []
+    data += [{"Data": [cell(v) for v in row]} for row in rows]
+    return {"ResultSet": {"Rows": data, "ResultSetMetadata": {"ColumnInfo": COLUMN_INFO}}}
+
+
+class FakeAthena:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get_paginator(self, name):
+        assert name == "get_query_results"
+        return self
+
+    def paginate(self, QueryExecutionId, PaginationConfig):
+        return iter(self.pages)
+
+    def get_query_results(self, QueryExecutionId, MaxResults):
+        return self.pages[0]
+
+
+ROW = ("0007", "123456", "10.50", "true", "2023-01-31", "2023-01-31 12:00:00.250")
+
+
+class TestTypes(unittest.TestCase):
+    def test_arrow_types(self):
+        self.assertEqual(arrow_type({"Type": "decimal", "Precision": 12, "Scale": 2}), pa.decimal128(12, 2))
+        self.assertEqual(arrow_type({"Type": "varchar(20)"}), pa.string())
+        self.assertEqual(arrow_type({"Type": "integer"}), pa.int32())
+        self.assertEqual(arrow_type({"Type": "timestamp with time zone"}), pa.string())
+        self.assertEqual(arrow_type({"Type": "array<varchar>"}), pa.string())
+
+
+class TestResultSetDecoder(unittest.TestCase):
+    def setUp(self):
+        self.decoder = ResultSetDecoder(FakeAthena([
+            page([ROW], header=True),
+            page([("0001", None, None, None, None, None), ("", "1", "0", "false", "2023-02-01", None)]),
+        ]))
+
+    def test_typed_values(self):
+        first = self.decoder.read_table("qid").slice(0, 1).to_pylist()[0]
+        self.assertEqual(first, {
+            "agencia": "0007", "conta": 123456, "saldo": decimal.Decimal("10.50"), "ativo": True,
+            "data_vinculo": datetime.date(2023, 1, 31),
+            "atualizado_em": datetime.datetime(2023, 1, 31, 12, 0, 0, 250000),
+        })
+
+    def test_null_and_empty_string_are_distinct(self):
+        records = list(iter_records(self.decoder.iter_batches("qid")))
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[1]["conta"], None)
+        self.assertEqual(records[2]["agencia"], "")
+
+    def test_one_batch_per_page_and_header_skipped(self):
+        batches = list(self.decoder.iter_batches("qid"))
+        self.assertEqual([b.num_rows for b in batches], [1, 2])
+
+    def test_empty_result_keeps_schema(self):
+        decoder = ResultSetDecoder(FakeAthena([page([], header=True)]))
+        table = decoder.read_table("qid")
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(table.schema, result_schema(COLUMN_INFO))
+
+    def test_schema_types_the_output_csv(self):
+        csv = ('"agencia","conta","saldo","ativo","data_vinculo","atualizado_em"\n'
+               + ",".join(f'"{v}"' for v in ROW) + "\n"
+               + '"0001",,,,,\n').encode()
+        reader = ResultReader(FakeS3({("bucket", "athena_results/qid.csv"): csv}))
+        typed = reader.read_table(EXECUTION, schema=self.decoder.schema("qid"))
+        self.assertEqual(typed.schema, result_schema(COLUMN_INFO))
+        self.assertEqual(typed.to_pylist(), self.decoder.read_table("qid").slice(0, 2).to_pylist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from athena_common.delivery import copy_s3_object, deliver_athena_output
+from test_writers import FakeMultipartS3
+
+
+class FakeCopyS3(FakeMultipartS3):
+    """FakeMultipartS3 plus head_object and the server-side copy calls."""
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.objects[Key][0])}
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective, **kwargs):
+        self.objects[Key] = (self.objects[CopySource["Key"]][0], kwargs)
+
+    def upload_part_copy(self, Bucket, Key, UploadId, PartNumber, CopySource, CopySourceRange):
+        start, end = (int(x) for x in CopySourceRange[len("bytes="):].split("-"))
+        self.upload_part(Bucket, Key, UploadId, PartNumber, self.objects[CopySource["Key"]][0][start:end + 1])
+        return {"CopyPartResult": {"ETag": f"etag-{PartNumber}"}}
+
+
+class TestCopy(unittest.TestCase):
+    def setUp(self):
+        self.s3 = FakeCopyS3()
+        self.data = bytes(range(256)) * 50
+        self.s3.objects["athena_results/qid.csv"] = (self.data, {})
+
+    def test_small_object_single_copy_with_new_metadata(self):
+        size = copy_s3_object(self.s3, "b", "athena_results/qid.csv", "b", "out/1.csv",
+                              content_type="text/csv", metadata={"a": "1"})
+        self.assertEqual(size, len(self.data))
+        self.assertEqual(self.s3.objects["out/1.csv"], (self.data, {"ContentType": "text/csv", "Metadata": {"a": "1"}}))
+
+    def test_large_object_multipart_copy(self):
+        copy_s3_object(self.s3, "b", "athena_results/qid.csv", "b", "out/1.csv",
+                       part_size=1000, multipart_threshold=1000, max_workers=3)
+        self.assertEqual(self.s3.objects["out/1.csv"][0], self.data)
+        self.assertEqual(self.s3.uploads, {})
+
+    def test_deliver_athena_output(self):
+        execution = {"QueryExecutionId": "qid",
+                     "ResultConfiguration": {"OutputLocation": "s3://b/athena_results/qid.csv"}}
+        deliver_athena_output(self.s3, execution, "b", "out/1.csv", metadata={"tipo_arquivo": "csv"})
+        body, extra = self.s3.objects["out/1.csv"]
+        self.assertEqual(body, self.data)
+        self.assertEqual(extra["ContentType"], "text/csv")
+        self.assertEqual(extra["Metadata"], {"query-execution-id": "qid", "tipo_arquivo": "csv"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import random
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from athena_common import (
+    AthenaExecutor,
+    AthenaThrottledError,
+    BackoffPolicy,
+    QueryCancelledError,
+    QueryFailedError,
+    QueryTimeoutError,
+)
+
+
+def execution(state, queue_ms=None, **status):
+    status["State"] = state
+    result = {"QueryExecutionId": "qid", "Status": status, "Statistics": {}}
+    if queue_ms is not None:
+        result["Statistics"]["QueryQueueTimeInMillis"] = queue_ms
+    return {"QueryExecution": result}
+
+
+def client_error(code, operation="GetQueryExecution"):
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def __call__(self):
+        return self.now
+
+
+class FakeContext:
+    def __init__(self, clock, remaining_ms):
+        self.clock = clock
+        self.end = remaining_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.end - self.clock.now) * 1000)
+
+
+class TestBackoffPolicy(unittest.TestCase):
+    def test_grows_with_elapsed_time_up_to_the_cap(self):
+        policy = BackoffPolicy(initial=0.1, ratio=0.5, max_delay=1.0, jitter=0.0)
+        delays = [policy.delay(elapsed) for elapsed in (0.0, 0.1, 1.0, 1.5, 10.0)]
+        self.assertEqual(delays, [0.1, 0.1, 0.5, 0.75, 1.0])
+
+    def test_queue_time_restarts_the_clock(self):
+        policy = BackoffPolicy(initial=0.1, ratio=0.5, max_delay=5.0, jitter=0.0)
+        self.assertEqual(policy.delay(8.0, "QUEUED", {"QueryQueueTimeInMillis": 8000}), 4.0)
+        self.assertEqual(policy.delay(8.0, "RUNNING", {"QueryQueueTimeInMillis": 8000}), 0.1)
+        self.assertEqual(policy.delay(10.0, "RUNNING", {"QueryQueueTimeInMillis": 8000}), 1.0)
+
+    def test_jitter_only_shortens(self):
+        policy = BackoffPolicy(initial=1.0, ratio=0.0, jitter=0.5, rng=random.Random(1))
+        for _ in range(100):
+            self.assertTrue(0.5 <= policy.delay(0.0) <= 1.0)
+
+
+class TestAthenaExecutor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.client = MagicMock()
+        self.executor = AthenaExecutor(
+            self.client, database="db", output_location="s3://bucket/out/",
+            backoff=BackoffPolicy(initial=0.1, ratio=1.0, jitter=0.0),
+            sleep=self.clock.sleep, clock=self.clock,
+        )
+
+    def test_start_passes_database_and_output(self):
+        self.client.start_query_execution.return_value = {"QueryExecutionId": "qid"}
+        self.assertEqual(self.executor.start("SELECT 1"), "qid")
+        self.client.start_query_execution.assert_called_once_with(
+            QueryString="SELECT 1",
+            QueryExecutionContext={"Database": "db"},
+            ResultConfiguration={"OutputLocation": "s3://bucket/out/"},
+        )
+
+    def test_start_throttled(self):
+        self.client.start_query_execution.side_effect = client_error("TooManyRequestsException")
+        with self.assertRaises(AthenaThrottledError):
+            self.executor.start("SELECT 1")
+
+    def test_wait_backs_off_until_success(self):
+        self.client.get_query_execution.side_effect = [
+            execution("QUEUED"), execution("RUNNING"), execution("RUNNING"), execution("SUCCEEDED"),
+        ]
+        result = self.executor.wait("qid")
+        self.assertEqual(result["Status"]["State"], "SUCCEEDED")
+        # each sleep equals the time waited so far (ratio=1.0)
+        self.assertEqual(self.clock.sleeps, [0.1, 0.1, 0.2])
+
+    def test_wait_tolerates_polling_throttle(self):
+        self.client.get_query_execution.side_effect = [
+            client_error("ThrottlingException"), execution("SUCCEEDED"),
+        ]
+        self.assertEqual(self.executor.wait("qid")["Status"]["State"], "SUCCEEDED")
+
+    def test_failed_query_raises_typed_error(self):
+        self.client.get_query_execution.return_value = execution(
+            "FAILED", StateChangeReason="SYNTAX_ERROR",
+            AthenaError={"ErrorCategory": 2, "ErrorType": 1000, "Retryable": False},
+        )
+        with self.assertRaises(QueryFailedError) as ctx:
+            self.executor.wait("qid")
+        self.assertEqual(ctx.exception.error_category, 2)
+        self.assertFalse(ctx.exception.retryable)
+        self.assertEqual(ctx.exception.query_execution_id, "qid")
+
+    def test_cancelled_query(self):
+        self.client.get_query_execution.return_value = execution("CANCELLED")
+        with self.assertRaises(QueryCancelledError):
+            self.executor.wait("qid")
+
+    def test_respects_remaining_time_and_cancels(self):
+        self.client.get_query_execution.return_value = execution("RUNNING")
+        context = FakeContext(self.clock, remaining_ms=5000)
+        with self.assertRaises(QueryTimeoutError):
+            self.executor.wait("qid", context=context)
+        # never sleeps past remaining time minus the 3s safety margin
+        self.assertAlmostEqual(self.clock.now, 2.0)
+        self.client.stop_query_execution.assert_called_once_with(QueryExecutionId="qid")
+
+
+if __name__ == "__main__":
+    unittest.main()
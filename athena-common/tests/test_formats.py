@@ -0,0 +1,55 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from athena_common.formats import output_format
+from test_writers import batches
+
+
+def render(tipo_arquivo, source, columns=None):
+    sink = pa.BufferOutputStream()
+    rows = output_format(tipo_arquivo).write(source, sink, columns)
+    return rows, sink.getvalue().to_pybytes()
+
+
+class TestOutputFormats(unittest.TestCase):
+    def test_lookup(self):
+        self.assertEqual(output_format("CSV").file_name("json_20240101"), "json_20240101.csv")
+        self.assertEqual(output_format("xml", default="json").name, "json")
+        with self.assertRaises(ValueError):
+            output_format("xml")
+
+    def test_csv(self):
+        rows, body = render("csv", batches(250), ["conta", "nome"])
+        lines = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows, 250)
+        self.assertEqual(lines[0], ["conta", "nome"])
+        self.assertEqual(lines[1], ["0", ""])
+        self.assertEqual(lines[2], ["1", "ç 1"])
+
+    def test_gzip_ndjson(self):
+        rows, body = render("ndjson", batches(250))
+        lines = gzip.decompress(body).decode().splitlines()
+        self.assertEqual(len(lines), rows)
+        self.assertEqual(json.loads(lines[1]), {"conta": "1", "nome": "ç 1"})
+
+    def test_parquet_groups_small_batches(self):
+        rows, body = render("parquet", batches(1000, size=10), ["nome"])
+        parquet = pq.ParquetFile(io.BytesIO(body))
+        self.assertEqual(parquet.metadata.num_rows, 1000)
+        self.assertEqual(parquet.metadata.num_row_groups, 1)
+        self.assertEqual(parquet.schema_arrow.names, ["nome"])
+
+    def test_empty_results_keep_the_header(self):
+        self.assertEqual(render("csv", iter([]), ["conta"])[1], b'"conta"\n')
+        self.assertEqual(pq.read_table(io.BytesIO(render("parquet", iter([]), ["conta"])[1])).num_rows, 0)
+        self.assertEqual(render("json", iter([]))[1], b"[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
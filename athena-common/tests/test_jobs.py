@@ -0,0 +1,84 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from athena_common.jobs import DELIVERING, FAILED, RUNNING, SUCCEEDED, JobStore, MemoryJobIndex, complete_job
+
+
+def state_change(query_execution_id, state):
+    return {"detail-type": "Athena Query State Change",
+            "detail": {"queryExecutionId": query_execution_id, "currentState": state}}
+
+
+class FakeAthena:
+    def get_query_execution(self, QueryExecutionId):
+        return {"QueryExecution": {"QueryExecutionId": QueryExecutionId,
+                                   "Status": {"State": "FAILED", "StateChangeReason": "SYNTAX_ERROR"}}}
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.store = JobStore(MemoryJobIndex())
+        self.store.create("qid", {"tipo_arquivo": "json"})
+
+    def test_claim_once(self):
+        self.assertEqual(self.store.claim("qid")["estado"], DELIVERING)
+        self.assertIsNone(self.store.claim("qid"))
+        self.assertIsNone(self.store.claim("not-ours"))
+
+    def test_concurrent_change_loses(self):
+        job = self.store.get("qid")
+        self.assertIsNotNone(self.store.claim("qid"))
+        self.assertIsNone(self.store._transition(job, DELIVERING))
+
+    def test_stale_delivery_can_be_claimed_again(self):
+        job = self.store.claim("qid")
+        self.store.index.jobs["qid"]["atualizado_em"] = time.time() - self.store.stale_seconds - 1
+        self.assertEqual(self.store.claim("qid")["versao"], job["versao"] + 1)
+
+
+class TestCompleteJob(unittest.TestCase):
+    def setUp(self):
+        self.store = JobStore(MemoryJobIndex())
+        self.store.create("qid", {"tipo_arquivo": "json"})
+        self.delivered = []
+
+    def deliver(self, job, execution):
+        self.delivered.append(job["job_id"])
+        return {"s3_path": "athena_results/json_1.json"}
+
+    def test_succeeded_query_is_delivered_once(self):
+        athena = FakeAthena()
+        complete_job(state_change("qid", "SUCCEEDED"), self.store, self.deliver, athena)
+        complete_job(state_change("qid", "SUCCEEDED"), self.store, self.deliver, athena)
+        job = self.store.get("qid")
+        self.assertEqual(self.delivered, ["qid"])
+        self.assertEqual((job["estado"], job["resultado"]), (SUCCEEDED, {"s3_path": "athena_results/json_1.json"}))
+
+    def test_terminal_query_gives_its_admission_slot_back(self):
+        admission = MagicMock()
+        complete_job(state_change("qid", "FAILED"), self.store, self.deliver, FakeAthena(), admission)
+        admission.query_finished.assert_called_once_with("qid")
+
+    def test_failed_query_fails_the_job(self):
+        result = complete_job(state_change("qid", "FAILED"), self.store, self.deliver, FakeAthena())
+        self.assertEqual(result["estado"], FAILED)
+        self.assertEqual(self.store.get("qid")["erro"], "SYNTAX_ERROR")
+        self.assertEqual(self.delivered, [])
+
+    def test_ignores_other_states_and_queries(self):
+        self.assertEqual(complete_job(state_change("qid", "RUNNING"), self.store, self.deliver), {"job_id": None})
+        self.assertEqual(complete_job(state_change("other", "SUCCEEDED"), self.store, self.deliver, FakeAthena()),
+                         {"job_id": None})
+        self.assertEqual(self.store.get("qid")["estado"], RUNNING)
+
+    def test_delivery_error_fails_the_job(self):
+        def broken(job, execution):
+            raise IOError("S3 unavailable")
+        with self.assertRaises(IOError):
+            complete_job(state_change("qid", "SUCCEEDED"), self.store, broken, FakeAthena())
+        self.assertEqual(self.store.get("qid")["estado"], FAILED)
+
+
+if __name__ == "__main__":
+    unittest.main()
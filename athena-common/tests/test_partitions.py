@@ -0,0 +1,71 @@
+import os
+import datetime
+import unittest
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+
+from athena_common import catalog
+from athena_common.partitions import PartitionLayout, resolve_layout
+
+
+class TestPartitionLayout(unittest.TestCase):
+    def test_single_date_key(self):
+        layout = PartitionLayout.parse("anomesdia")
+        self.assertEqual(layout.predicate("2023-01-01", "2023-12-31"),
+                         "anomesdia BETWEEN '20230101' AND '20231231'")
+
+    def test_same_day(self):
+        layout = PartitionLayout.parse("dt")
+        self.assertEqual(layout.predicate("2023-03-04", "2023-03-04"), "dt = '2023-03-04'")
+
+    def test_open_range(self):
+        layout = PartitionLayout.parse("anomesdia")
+        self.assertEqual(layout.predicate("2023-01-01"), "anomesdia >= '20230101'")
+
+    def test_hierarchical_keys_narrow_while_coarser_ones_are_fixed(self):
+        layout = PartitionLayout.parse("ano:%Y:int,mes:%m,dia:%d")
+        self.assertEqual(layout.predicate("2021-05-01", "2023-02-01"), "ano BETWEEN 2021 AND 2023")
+        self.assertEqual(layout.predicate("2023-01-10", "2023-03-01"), "ano = 2023 AND mes BETWEEN '01' AND '03'")
+        self.assertEqual(layout.predicate(datetime.date(2023, 1, 10), datetime.date(2023, 1, 12)),
+                         "ano = 2023 AND mes = '01' AND dia BETWEEN '10' AND '12'")
+
+    def test_no_layout_or_no_date(self):
+        self.assertIsNone(PartitionLayout([]).predicate("2023-01-01", "2023-01-02"))
+        self.assertIsNone(PartitionLayout.parse("anomesdia").predicate(None, None))
+
+    def test_from_glue_keeps_leading_date_keys(self):
+        glue = MagicMock()
+        glue.get_table.return_value = {"Table": {"PartitionKeys": [
+            {"Name": "ano", "Type": "int"}, {"Name": "mes", "Type": "string"},
+            {"Name": "origem", "Type": "string"}, {"Name": "dia", "Type": "string"},
+        ]}}
+        layout = PartitionLayout.from_glue(glue, "db", "tb")
+        self.assertEqual([k.name for k in layout.keys], ["ano", "mes"])
+        self.assertTrue(layout.keys[0].numeric)
+
+
+class TestCatalogLayout(unittest.TestCase):
+    def setUp(self):
+        catalog._tables.clear()
+        self.addCleanup(catalog._tables.clear)
+        self.glue = MagicMock()
+        patcher = patch("athena_common.catalog.boto3.client", return_value=self.glue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch.dict(os.environ)
+    def test_failed_read_is_retried_and_success_is_cached(self):
+        os.environ.pop("ATHENA_PARTITION_LAYOUT", None)
+        self.glue.get_table.side_effect = [
+            ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "GetTable"),
+            {"Table": {"PartitionKeys": [{"Name": "anomesdia", "Type": "string"}]}},
+        ]
+        self.assertEqual(resolve_layout("db", "tb").keys, [])
+        for _ in range(2):
+            self.assertEqual([k.name for k in resolve_layout("db", "tb").keys], ["anomesdia"])
+        self.assertEqual(self.glue.get_table.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import MagicMock
+
+from athena_common.catalog import table_columns
+from athena_common.errors import InvalidColumnsError
+from athena_common.projection import ColumnProjection, select_list
+
+SCHEMA = ["cnpj_base_participante", "agencia", "conta", "data_vinculo", "valor", "anomesdia"]
+PROFILES = {
+    "tipo_arquivo": {"csv": ["agencia", "conta", "valor"]},
+    "cliente": {"12345678": ["conta", "valor"]},
+}
+
+
+class TestColumnProjection(unittest.TestCase):
+    def setUp(self):
+        self.projection = ColumnProjection(PROFILES, SCHEMA)
+
+    def test_no_request_reads_every_column(self):
+        self.assertIsNone(self.projection.columns(tipo_arquivo="json"))
+        self.assertEqual(select_list(None), "*")
+
+    def test_precedence_campos_cliente_tipo_arquivo(self):
+        self.assertEqual(self.projection.columns(["Valor", "conta", "valor"], "csv", "12345678"), ["valor", "conta"])
+        self.assertEqual(self.projection.columns(None, "csv", "12345678"), ["conta", "valor"])
+        self.assertEqual(self.projection.columns(None, "csv", "99999999"), ["agencia", "conta", "valor"])
+        self.assertEqual(select_list(["agencia", "conta"]), "agencia, conta")
+
+    def test_unknown_columns_are_rejected(self):
+        with self.assertRaises(InvalidColumnsError) as ctx:
+            self.projection.columns(["conta", "saldo"])
+        self.assertEqual(ctx.exception.columns, ["saldo"])
+        self.assertIsInstance(ctx.exception, ValueError)
+
+    def test_without_schema_only_identifiers_pass(self):
+        projection = ColumnProjection()
+        self.assertEqual(projection.columns(["saldo"]), ["saldo"])
+        with self.assertRaises(InvalidColumnsError):
+            projection.columns(["conta; DROP TABLE x"])
+
+    def test_schema_is_loaded_only_when_needed(self):
+        loader = MagicMock(return_value=SCHEMA)
+        projection = ColumnProjection(PROFILES, loader)
+        projection.columns(tipo_arquivo="json")
+        loader.assert_not_called()
+        projection.columns(["conta"])
+        projection.columns(["valor"])
+        loader.assert_called_once()
+
+    def test_table_columns_include_partition_keys(self):
+        table = {"StorageDescriptor": {"Columns": [{"Name": "Conta"}]}, "PartitionKeys": [{"Name": "anomesdia"}]}
+        self.assertEqual(table_columns(table), ["conta", "anomesdia"])
+
+
+if __name__ == "__main__":
+    unittest.main()
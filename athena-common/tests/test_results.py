@@ -0,0 +1,81 @@
+import io
+import unittest
+
+from athena_common.results import ResultReader, S3RangeStream, split_s3_uri
+
+
+class FakeS3:
+    """head_object/get_object(Range=...) over in-memory objects."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.ranges = []
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = (int(x) for x in Range[len("bytes="):].split("-"))
+        self.ranges.append((start, end))
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)][start:end + 1])}
+
+
+def athena_csv(rows):
+    lines = ['"agencia","conta","nome"']
+    for agencia, conta, nome in rows:
+        fields = [f'"{v}"' if v is not None else "" for v in (agencia, conta, nome)]
+        lines.append(",".join(fields))
+    return ("\n".join(lines) + "\n").encode()
+
+
+EXECUTION = {"ResultConfiguration": {"OutputLocation": "s3://bucket/athena_results/qid.csv"}}
+
+
+class TestS3RangeStream(unittest.TestCase):
+    def test_reads_whole_object_in_order(self):
+        data = bytes(range(256)) * 40
+        s3 = FakeS3({("bucket", "key"): data})
+        stream = S3RangeStream(s3, "bucket", "key", part_size=1000, max_workers=3)
+        self.assertEqual(stream.read(), data)
+        self.assertEqual(stream.requests, 11)
+        self.assertEqual(sorted(s3.ranges)[-1], (10000, 10239))
+        stream.close()
+
+
+class TestResultReader(unittest.TestCase):
+    def setUp(self):
+        rows = [(f"{i:04d}", str(i), f"cliente {i}") for i in range(5000)]
+        rows.append(("0001", None, ""))
+        self.s3 = FakeS3({("bucket", "athena_results/qid.csv"): athena_csv(rows)})
+        self.reader = ResultReader(self.s3, part_size=16 * 1024, max_workers=4, block_size=8 * 1024)
+
+    def test_split_s3_uri(self):
+        self.assertEqual(split_s3_uri("s3://b/a/c.csv"), ("b", "a/c.csv"))
+
+    def test_streams_every_row_as_strings(self):
+        batches = list(self.reader.iter_batches(EXECUTION))
+        self.assertGreater(len(batches), 1)
+        table = self.reader.read_table(EXECUTION)
+        self.assertEqual(table.num_rows, 5001)
+        self.assertEqual(table.column("agencia")[7].as_py(), "0007")
+
+    def test_null_and_empty_string_are_distinct(self):
+        last = self.reader.read_table(EXECUTION).slice(5000).to_pylist()[0]
+        self.assertEqual(last, {"agencia": "0001", "conta": None, "nome": ""})
+
+    def test_nulls_as_empty_strings(self):
+        last = self.reader.read_table(EXECUTION, nulls=False).slice(5000).to_pylist()[0]
+        self.assertEqual(last["conta"], "")
+
+    def test_quoted_values_with_newlines(self):
+        rows = [(f"{i:04d}", str(i), f"linha 1 de {i}\nlinha 2, \"aspas\"") for i in range(2000)]
+        body = athena_csv([(a, c, n.replace('"', '""')) for a, c, n in rows])
+        reader = ResultReader(FakeS3({("bucket", "athena_results/qid.csv"): body}),
+                              part_size=16 * 1024, block_size=8 * 1024)
+        table = reader.read_table(EXECUTION)
+        self.assertEqual(table.num_rows, 2000)
+        self.assertEqual(table.column("nome").to_pylist(), [n for _, _, n in rows])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from athena_common.errors import QueryFailedError
+from athena_common.results import ResultReader
+from athena_common.sharding import ShardedExport, iter_manifest_batches, merge_intervals, split_range
+from test_results import FakeS3, athena_csv
+
+
+class FakeExecutor:
+    """start/wait answering from a map of data_inicio -> outcome."""
+
+    def __init__(self, fail_on=None, release=None):
+        self.client = MagicMock()
+        self.fail_on = fail_on
+        self.release = release
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def start(self, query, priority=None):
+        with self.lock:
+            self.queries.append(query)
+            return f"qid-{query}"
+
+    def wait(self, query_execution_id, context=None):
+        if self.fail_on and self.fail_on in query_execution_id:
+            raise QueryFailedError("boom", query_execution_id)
+        if self.release:
+            self.release.wait()
+        return {
+            "QueryExecutionId": query_execution_id,
+            "ResultConfiguration": {"OutputLocation": f"s3://bucket/{query_execution_id}.csv"},
+            "Statistics": {"DataScannedInBytes": 10},
+        }
+
+
+class TestRanges(unittest.TestCase):
+    def test_merge_intervals_like_utils(self):
+        intervals = [("2001-02-17", "2003-10-07"), ("1995-10-01", "2007-06-06"),
+                     ("2001-02-17", "2009-10-07"), ("2009-10-08", "2010-01-01"), ("2012-01-01", "2012-02-01")]
+        merged = merge_intervals(intervals)
+        self.assertEqual([(s.isoformat(), e.isoformat()) for s, e in merged],
+                         [("1995-10-01", "2010-01-01"), ("2012-01-01", "2012-02-01")])
+        self.assertEqual(intervals[0], ("2001-02-17", "2003-10-07"))
+
+    def test_split_range_on_month_boundaries(self):
+        shards = split_range("2023-01-15", "2023-04-02")
+        self.assertEqual([(s.isoformat(), e.isoformat()) for s, e in shards], [
+            ("2023-01-15", "2023-01-31"), ("2023-02-01", "2023-02-28"),
+            ("2023-03-01", "2023-03-31"), ("2023-04-01", "2023-04-02"),
+        ])
+
+    def test_split_range_by_years_and_quarters(self):
+        self.assertEqual(len(split_range("2021-05-01", "2023-02-01", "year")), 3)
+        self.assertEqual(split_range("2023-01-15", "2023-07-02", "month", 3)[1][1].isoformat(), "2023-06-30")
+        with self.assertRaises(ValueError):
+            split_range("2023-01-01", "2023-02-01", "week")
+
+
+class TestShardedExport(unittest.TestCase):
+    def test_manifest_keeps_date_order(self):
+        export = ShardedExport(FakeExecutor(), parallelism=3)
+        manifest = export.run([("2023-01-15", "2023-04-02"), ("2023-02-10", "2023-03-01")],
+                              lambda start, end: f"{start}|{end}")
+        self.assertEqual([s["data_inicio"] for s in manifest["shards"]],
+                         ["2023-01-15", "2023-02-01", "2023-03-01", "2023-04-01"])
+        self.assertEqual(manifest["shards"][1]["output_location"], "s3://bucket/qid-2023-02-01|2023-02-28.csv")
+        self.assertFalse(manifest["disjunto"])
+
+    def test_failure_cancels_the_other_shards(self):
+        release = threading.Event()
+        executor = FakeExecutor(fail_on="2023-02-01", release=release)
+        with self.assertRaises(QueryFailedError):
+            ShardedExport(executor, parallelism=3).run([("2023-01-01", "2023-12-31")], lambda s, e: f"{s}|{e}")
+        release.set()
+        stop = executor.client.stop_query_execution
+        for _ in range(100):
+            if stop.call_count >= len(executor.queries) - 1:
+                break
+            threading.Event().wait(0.01)
+        stopped = {c.kwargs["QueryExecutionId"] for c in stop.call_args_list}
+        self.assertEqual(stopped, {f"qid-{q}" for q in executor.queries} - {"qid-2023-02-01|2023-02-28"})
+        self.assertLess(len(executor.queries), 12)
+
+
+class TestManifestReader(unittest.TestCase):
+    def test_rows_repeated_across_shards_come_out_once(self):
+        s3 = FakeS3({
+            ("bucket", "a.csv"): athena_csv([("0001", "1", "x"), ("0001", "1", "x"), ("0001", "2", "y")]),
+            ("bucket", "b.csv"): athena_csv([("0001", "2", "y"), ("0001", "3", "z")]),
+        })
+        manifest = {"shards": [
+            {"ordem": 1, "output_location": "s3://bucket/b.csv"},
+            {"ordem": 0, "output_location": "s3://bucket/a.csv"},
+        ]}
+        reader = ResultReader(s3)
+        rows = [r for b in iter_manifest_batches(reader, manifest, ["agencia", "conta", "nome"]) for r in b.to_pylist()]
+        self.assertEqual([r["conta"] for r in rows], ["1", "1", "2", "3"])
+        with self.assertRaises(ValueError):
+            next(iter_manifest_batches(reader, manifest, None))
+
+    def test_disjoint_shards_are_not_deduplicated(self):
+        s3 = FakeS3({
+            ("bucket", "a.csv"): athena_csv([("0001", "1", "x")]),
+            ("bucket", "b.csv"): athena_csv([("0001", "1", "x")]),
+        })
+        manifest = {"disjunto": True, "shards": [{"ordem": 0, "output_location": "s3://bucket/a.csv"},
+                                                 {"ordem": 1, "output_location": "s3://bucket/b.csv"}]}
+        batches = list(iter_manifest_batches(ResultReader(s3), manifest, None))
+        self.assertEqual(sum(b.num_rows for b in batches), 2)
+
+    def test_key_columns(self):
+        s3 = FakeS3({
+            ("bucket", "a.csv"): athena_csv([("0001", "1", "x")]),
+            ("bucket", "b.csv"): athena_csv([("0001", "1", "outro nome")]),
+        })
+        manifest = {"shards": [{"ordem": 0, "output_location": "s3://bucket/a.csv"},
+                               {"ordem": 1, "output_location": "s3://bucket/b.csv"}]}
+        batches = list(iter_manifest_batches(ResultReader(s3), manifest, key_columns=["agencia", "conta"]))
+        self.assertEqual(sum(b.num_rows for b in batches), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from athena_common import AthenaExecutor, BackoffPolicy, QueryTimeoutError, query_hash
+from athena_common.singleflight import DynamoLeaseIndex, MemoryLeaseIndex, SingleFlight
+from test_executor import FakeClock, FakeContext, execution
+
+QUERY = "SELECT conta FROM tb WHERE agencia = '0001';"
+
+
+class CountingAthena:
+    """start_query_execution hands out q1, q2, ...; slow enough for callers to overlap."""
+
+    def __init__(self, states=None):
+        self.started = []
+        self.states = states or {}
+        self._lock = threading.Lock()
+
+    def start_query_execution(self, **params):
+        threading.Event().wait(0.05)
+        with self._lock:
+            self.started.append(params["QueryString"])
+            return {"QueryExecutionId": f"q{len(self.started)}"}
+
+    def get_query_execution(self, QueryExecutionId):
+        state = self.states.get(QueryExecutionId, "RUNNING")
+        return {"QueryExecution": {"QueryExecutionId": QueryExecutionId, "Status": {"State": state}}}
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.index = MemoryLeaseIndex()
+        self.athena = CountingAthena()
+        self.executor = AthenaExecutor(self.athena, database="db",
+                                       single_flight=SingleFlight(self.index, poll_interval=0.01))
+
+    def test_concurrent_identical_queries_start_once(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = list(pool.map(lambda _: self.executor.start(QUERY), range(8)))
+        self.assertEqual(set(ids), {"q1"})
+        self.assertEqual(len(self.athena.started), 1)
+
+    def test_distinct_queries_and_variants_are_not_joined(self):
+        first = self.executor.start(QUERY)
+        self.assertEqual(self.executor.start("SELECT 1"), "q2")
+        self.assertEqual(self.executor.start(QUERY, variant="csv"), "q3")
+        # whitespace and the trailing ';' do not split the key
+        self.assertEqual(self.executor.start(QUERY.rstrip(";") + "  "), first)
+
+    def test_failed_execution_is_taken_over(self):
+        self.assertEqual(self.executor.start(QUERY), "q1")
+        self.athena.states["q1"] = "FAILED"
+        self.assertEqual(self.executor.start(QUERY), "q2")
+        self.assertEqual(self.executor.start(QUERY), "q2")
+
+    def test_failed_submission_releases_the_lease(self):
+        broken = MagicMock(side_effect=RuntimeError("boom"))
+        flight = SingleFlight(self.index)
+        with self.assertRaises(RuntimeError):
+            flight.start(QUERY, broken)
+        self.assertEqual(flight.start(QUERY, lambda: "q9"), "q9")
+
+    def test_holder_that_never_publishes_is_not_waited_forever(self):
+        clock = FakeClock()
+        flight = SingleFlight(self.index, attach_timeout=1.0, sleep=clock.sleep, clock=clock)
+        self.index.acquire(query_hash(QUERY, ""), "other", 100, 0)
+        self.assertEqual(flight.start(QUERY, lambda: "mine"), "mine")
+        self.assertGreaterEqual(clock.now, 1.0)
+
+    def test_joined_execution_is_not_cancelled_on_timeout(self):
+        self.executor.start(QUERY)
+        clock = FakeClock()
+        follower = AthenaExecutor(MagicMock(), database="db", backoff=BackoffPolicy.fixed(1.0),
+                                  single_flight=self.executor.single_flight, sleep=clock.sleep, clock=clock)
+        follower.client.get_query_execution.return_value = execution("RUNNING")
+        self.assertEqual(follower.start(QUERY), "q1")
+        with self.assertRaises(QueryTimeoutError):
+            follower.wait("q1", context=FakeContext(clock, remaining_ms=5000))
+        follower.client.stop_query_execution.assert_not_called()
+
+    def test_joined_ids_are_not_kept_after_submit_or_wait(self):
+        self.executor.start(QUERY)
+        follower = AthenaExecutor(MagicMock(), database="db", single_flight=self.executor.single_flight)
+        follower.client.get_query_execution.return_value = execution("SUCCEEDED")
+        self.assertEqual(follower.submit(QUERY), "q1")
+        self.assertEqual(follower._joined, set())
+        follower.wait(follower.start(QUERY))
+        self.assertEqual(follower._joined, set())
+
+
+class ThrottledDynamo:
+    """batch_get_item answers at most `per_call` keys and returns the rest as UnprocessedKeys."""
+
+    def __init__(self, items, per_call):
+        self.items = items
+        self.per_call = per_call
+        self.requests = []
+
+    def batch_get_item(self, RequestItems):
+        (table, request), = RequestItems.items()
+        keys = request["Keys"]
+        self.requests.append(len(keys))
+        served, rest = keys[:self.per_call], keys[self.per_call:]
+        found = [self.items[k["chave"]["S"]] for k in served if k["chave"]["S"] in self.items]
+        response = {"Responses": {table: found}}
+        if rest:
+            response["UnprocessedKeys"] = {table: {**request, "Keys": rest}}
+        return response
+
+
+class TestDynamoLeaseIndex(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.items = {f"a#{n}": {"chave": {"S": f"a#{n}"}, "dono": {"S": "o"}, "expira_em": {"N": "100"}}
+                      for n in range(0, 250, 2)}
+
+    def index(self, per_call, max_attempts=5):
+        self.dynamo = ThrottledDynamo(self.items, per_call)
+        return DynamoLeaseIndex(self.dynamo, "tb", prefix="a#", max_attempts=max_attempts, sleep=self.clock.sleep)
+
+    def test_keys_are_chunked_and_unprocessed_keys_retried(self):
+        leases = self.index(per_call=40).get_many([str(n) for n in range(250)], 0)
+        self.assertEqual(sorted(leases, key=int), [str(n) for n in range(0, 250, 2)])
+        self.assertEqual(self.dynamo.requests, [100, 60, 20, 100, 60, 20, 50, 10])
+        self.assertEqual(self.clock.sleeps, [0.05, 0.1, 0.05, 0.1, 0.05])
+
+    def test_keys_left_unprocessed_raise(self):
+        with self.assertRaises(ClientError):
+            self.index(per_call=10, max_attempts=3).get_many([str(n) for n in range(50)], 0)
+        self.assertEqual(self.dynamo.requests, [50, 40, 30])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from athena_common.unload import UnloadExport, count_query, unload_query
+
+QUERY = "SELECT agencia, conta FROM tb WHERE conta = '1';\n"
+
+
+class FakeExecutor:
+    """run() records the SQL; the COUNT(*) result comes from get_query_results."""
+
+    def __init__(self, count):
+        self.count = count
+        self.queries = []
+        self.client = self
+
+    def run(self, query, context=None, priority=None):
+        self.queries.append(query)
+        return {"QueryExecutionId": f"q{len(self.queries)}", "Statistics": {"DataScannedInBytes": 10}}
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, **kwargs):
+        if "Bucket" in kwargs:
+            return iter([{"Contents": [{"Key": "out/exp/b.gz", "Size": 20}, {"Key": "out/exp/a.gz", "Size": 10}]}])
+        column_info = [{"Name": "linhas", "Type": "bigint"}]
+        rows = [{"Data": [{"VarCharValue": "linhas"}]}, {"Data": [{"VarCharValue": str(self.count)}]}]
+        return iter([{"ResultSet": {"Rows": rows, "ResultSetMetadata": {"ColumnInfo": column_info}}}])
+
+
+class TestUnloadQuery(unittest.TestCase):
+    def test_wraps_the_select(self):
+        sql = unload_query(QUERY, "s3://bucket/out/exp", "parquet")
+        self.assertTrue(sql.startswith("UNLOAD (SELECT agencia, conta FROM tb WHERE conta = '1')\n"))
+        self.assertIn("TO 's3://bucket/out/exp/'", sql)
+        self.assertIn("format = 'PARQUET'", sql)
+        self.assertIn("field_delimiter = ','", unload_query(QUERY, "s3://bucket/out/", "CSV"))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            unload_query(QUERY, "s3://bucket/out/", "xml")
+
+    def test_count_query(self):
+        self.assertEqual(count_query(QUERY),
+                         "SELECT COUNT(*) AS linhas FROM (SELECT agencia, conta FROM tb WHERE conta = '1') resultado")
+
+
+class TestUnloadExport(unittest.TestCase):
+    def test_disabled_runs_no_preflight(self):
+        executor = FakeExecutor(10**9)
+        self.assertFalse(UnloadExport(executor, s3_client=executor).should_unload(QUERY))
+        self.assertEqual(executor.queries, [])
+
+    def test_threshold_on_preflight_count(self):
+        executor = FakeExecutor(5000)
+        self.assertTrue(UnloadExport(executor, executor, min_rows=5000).should_unload(QUERY))
+        self.assertFalse(UnloadExport(executor, executor, min_rows=5001).should_unload(QUERY))
+        self.assertTrue(executor.queries[0].startswith("SELECT COUNT(*)"))
+
+    def test_manifest_lists_the_written_files(self):
+        executor = FakeExecutor(0)
+        manifest = UnloadExport(executor, executor).run(QUERY, "s3://bucket/out/exp", "json")
+        self.assertTrue(executor.queries[0].startswith("UNLOAD"))
+        self.assertEqual(manifest["query_execution_id"], "q1")
+        self.assertEqual(manifest["destino"], "s3://bucket/out/exp/")
+        self.assertEqual(manifest["arquivos"], [{"s3_uri": "s3://bucket/out/exp/a.gz", "bytes": 10},
+                                                {"s3_uri": "s3://bucket/out/exp/b.gz", "bytes": 20}])
+
+
+if __name__ == "__main__":
+    unittest.main()
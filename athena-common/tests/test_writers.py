@@ -0,0 +1,115 @@
+import json
+import datetime
+import decimal
+import threading
+import unittest
+
+import pyarrow as pa
+
+from athena_common.writers import S3MultipartWriter, write_json
+
+
+class FakeMultipartS3:
+    """put_object and the multipart calls over an in-memory bucket."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = (bytes(Body), kwargs)
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = f"up-{len(self.uploads)}"
+        self.uploads[upload_id] = ({}, kwargs)
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self.lock:
+            self.uploads[UploadId][0][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts, kwargs = self.uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts), numbers
+        self.objects[Key] = (b"".join(parts[n] for n in numbers), kwargs)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(UploadId)
+
+
+def batches(n, size=100):
+    for start in range(0, n, size):
+        ids = range(start, min(start + size, n))
+        yield pa.record_batch({"conta": [str(i) for i in ids], "nome": [f"ç {i}" if i % 7 else None for i in ids]})
+
+
+class TestS3MultipartWriter(unittest.TestCase):
+    def test_small_object_is_a_single_put(self):
+        s3 = FakeMultipartS3()
+        with S3MultipartWriter(s3, "b", "k", part_size=1024, content_type="application/json") as writer:
+            writer.write(b"[]")
+        self.assertEqual(s3.objects["k"], (b"[]", {"ContentType": "application/json"}))
+        self.assertEqual(s3.uploads, {})
+
+    def test_large_object_goes_up_in_ordered_parts(self):
+        s3 = FakeMultipartS3()
+        data = bytes(range(256)) * 100
+        with S3MultipartWriter(s3, "b", "k", part_size=1000, max_workers=3) as writer:
+            for i in range(0, len(data), 333):
+                writer.write(data[i:i + 333])
+        self.assertEqual(s3.objects["k"][0], data)
+
+    def test_error_aborts_the_upload(self):
+        s3 = FakeMultipartS3()
+        with self.assertRaises(RuntimeError):
+            with S3MultipartWriter(s3, "b", "k", part_size=10) as writer:
+                writer.write(b"x" * 50)
+                raise RuntimeError("serialization failed")
+        self.assertEqual(s3.aborted, ["up-0"])
+        self.assertNotIn("k", s3.objects)
+
+
+class TestWriteJson(unittest.TestCase):
+    def test_compact_array(self):
+        s3 = FakeMultipartS3()
+        with S3MultipartWriter(s3, "b", "k", part_size=4096) as writer:
+            rows = write_json(batches(1000), writer)
+        body = s3.objects["k"][0]
+        self.assertEqual(rows, 1000)
+        self.assertNotIn(b"\n", body)
+        records = json.loads(body)
+        self.assertEqual(records[8], {"conta": "8", "nome": "ç 8"})
+        self.assertIsNone(records[7]["nome"])
+
+    def test_ndjson_with_columns(self):
+        sink = pa.BufferOutputStream()
+        write_json(batches(10), sink, columns=["nome", "conta"], ndjson=True)
+        lines = sink.getvalue().to_pybytes().decode().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(list(json.loads(lines[1])), ["nome", "conta"])
+
+    def test_typed_columns(self):
+        batch = pa.RecordBatch.from_pydict({
+            "qtd": pa.array([3], pa.int32()),
+            "dia": pa.array([datetime.date(2023, 1, 31)], pa.date32()),
+            "ts": pa.array([datetime.datetime(2023, 1, 31, 10, 5)], pa.timestamp("us")),
+            "valor": pa.array([decimal.Decimal("10.50")], pa.decimal128(10, 2)),
+        })
+        sink = pa.BufferOutputStream()
+        write_json(iter([batch]), sink)
+        self.assertEqual(json.loads(sink.getvalue().to_pybytes()),
+                         [{"qtd": 3, "dia": "2023-01-31", "ts": "2023-01-31 10:05:00", "valor": "10.50"}])
+
+    def test_empty_result_is_an_empty_array(self):
+        sink = pa.BufferOutputStream()
+        self.assertEqual(write_json(iter([]), sink), 0)
+        self.assertEqual(sink.getvalue().to_pybytes(), b"[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
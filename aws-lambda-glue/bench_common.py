@@ -0,0 +1,104 @@
+# bench_common.py
+#
+# Utilitários compartilhados pelos benchmarks locais (bench_*.py).
+# Não faz parte do pacote da Lambda.
+
+import os
+import sys
+import json
+import uuid
+import random
+import resource
+import datetime
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# schema sintético com as mesmas colunas do FIELD_MAP (o glue_schema.json
+# real vem do catálogo no build e não fica no repositório)
+os.environ.setdefault("GLUE_SCHEMA_PATH", os.path.join(HERE, "bench_schema.json"))
+os.environ.setdefault("BUCKET_DADOS", "bench-bucket")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from schema import FIELD_MAP  # noqa: E402
+
+
+# ——————————————————————————————————————————————————————————————
+# Payloads sintéticos no formato do risco BACEN
+# ——————————————————————————————————————————————————————————————
+def make_payload(rng: random.Random, ts: datetime.datetime) -> dict:
+    p = {}
+    for json_key, col in FIELD_MAP.items():
+        if col is None or col.startswith("cod_") or col.startswith("txt_"):
+            p[json_key] = str(rng.randint(1, 99))
+        elif col.startswith("vlr_"):
+            # parte dos produtores manda valor como string
+            v = round(rng.uniform(0, 1_000_000), 2)
+            p[json_key] = v if rng.random() < 0.8 else f"{v:.2f}"
+        elif col.startswith("pct_"):
+            p[json_key] = round(rng.random() * 100, 4)
+        elif col.startswith("qtd_"):
+            p[json_key] = rng.randint(0, 500)
+        elif col.startswith("dat_"):
+            p[json_key] = (ts - datetime.timedelta(days=rng.randint(0, 3650))).strftime("%Y-%m-%dT%H:%M:%S")
+        else:
+            p[json_key] = rng.choice(["SISBACEN", "SCR", "ONLINE", "BATCH"])
+    p["codigo_identificacao_pessoa"] = str(uuid.UUID(int=rng.getrandbits(128)))
+    p["documento_pessoa"] = f"{rng.randint(0, 99_999_999_999):011d}"
+    p["id_evento"] = str(uuid.UUID(int=rng.getrandbits(128)))
+    p["ts_evento"] = ts.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    return p
+
+
+def make_sqs_event(n: int, seed: int = 42, hours: int = 1, raw: bool = False) -> dict:
+    """Evento SQS com n mensagens envelopadas pelo SNS (ou raw delivery)."""
+    rng = random.Random(seed)
+    base = datetime.datetime(2025, 1, 15, 10, 0, 0)
+    records = []
+    for i in range(n):
+        ts = base + datetime.timedelta(seconds=rng.randint(0, hours * 3600 - 1))
+        if raw:
+            records.append({"messageId": f"msg-{i}", "body": json.dumps(make_payload(rng, ts))})
+            continue
+        envelope = {
+            "Type": "Notification",
+            "MessageId": str(uuid.UUID(int=rng.getrandbits(128))),
+            "TopicArn": "arn:aws:sns:us-east-1:123456789012:eventos-topic",
+            "Message": json.dumps(make_payload(rng, ts)),
+            "Timestamp": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "SignatureVersion": "1",
+        }
+        records.append({"messageId": f"msg-{i}", "body": json.dumps(envelope)})
+    return {"Records": records}
+
+
+# ——————————————————————————————————————————————————————————————
+# Medição
+# ——————————————————————————————————————————————————————————————
+def peak_rss_mb() -> float:
+    # ru_maxrss vem em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_isolated(script: str, args: list) -> dict:
+    """
+    Roda um modo do benchmark em um processo novo, para que o pico de RSS
+    de um caminho não contamine o outro. O filho imprime uma linha JSON.
+    """
+    out = subprocess.run(
+        [sys.executable, os.path.join(HERE, script)] + [str(a) for a in args],
+        check=True, capture_output=True, text=True, cwd=HERE,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def load_handler():
+    """Carrega lambda.py (no deploy vira app.py; 'lambda' não é importável)."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("app", os.path.join(HERE, "lambda.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
@@ -0,0 +1,74 @@
+# bench_envelope.py
+#
+# Micro-benchmark da decodificação do corpo SQS (parse_sns_envelope) sobre
+# payloads sintéticos de risco BACEN: envelope SNS vs raw message delivery,
+# stdlib json vs orjson. Serve para medir o ganho antes de ligar
+# raw_message_delivery na assinatura SNS → SQS.
+#
+#   python bench_envelope.py --records 10000
+
+import json
+import time
+import argparse
+
+import bench_common
+import jsonlib
+from bench_common import make_sqs_event
+
+
+def legacy_parse_sns_envelope(body: str) -> dict:
+    # versão anterior: stdlib, dois json.loads, except sem tipo
+    o = json.loads(body)
+    if isinstance(o, dict) and o.get("Type") == "Notification" and "Message" in o:
+        try:
+            return json.loads(o["Message"])
+        except:
+            return {"raw": o["Message"]}
+    return o
+
+
+def timeit(fn, bodies: list, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for b in bodies:
+            fn(b)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    app = bench_common.load_handler()
+    envelope = [r["body"] for r in make_sqs_event(args.records)["Records"]]
+    raw      = [r["body"] for r in make_sqs_event(args.records, raw=True)["Records"]]
+    avg_env = sum(map(len, envelope)) / len(envelope)
+    avg_raw = sum(map(len, raw)) / len(raw)
+    print(f"{args.records} mensagens; corpo médio: envelope {avg_env:.0f} B, raw {avg_raw:.0f} B")
+
+    cases = [("envelope", "anterior (json, 2x loads)", envelope, None, legacy_parse_sns_envelope)]
+    for backend in ("json", "orjson"):
+        cases.append(("envelope", f"auto/{backend}", envelope, ("auto", backend), app.parse_sns_envelope))
+    for backend in ("json", "orjson"):
+        cases.append(("raw", f"true/{backend}", raw, ("true", backend), app.parse_sns_envelope))
+
+    base = None
+    print(f"{'entrada':<10}{'decodificador':<28}{'msg/s':>12}{'µs/msg':>10}{'vs anterior':>13}")
+    for kind, label, bodies, cfg, fn in cases:
+        if cfg:
+            app.SNS_RAW_DELIVERY = cfg[0]
+            if jsonlib.use(cfg[1]) != cfg[1]:
+                print(f"{kind:<10}{label:<28}{'(backend indisponível)':>35}")
+                continue
+        best = timeit(fn, bodies, args.repeat)
+        base = base or best
+        print(f"{kind:<10}{label:<28}{len(bodies) / best:>12.0f}{best / len(bodies) * 1e6:>10.1f}{base / best:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
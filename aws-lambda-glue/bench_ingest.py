@@ -0,0 +1,133 @@
+# bench_ingest.py
+#
+# Compara o caminho antigo (dict por registro + pivot em write_parquet) com o
+# conversor colunar, em registros/s e pico de RSS. Cada modo roda em um
+# processo separado.
+#
+#   python bench_ingest.py                # 10k mensagens, 5 repetições
+#   python bench_ingest.py --records 50000
+
+import sys
+import time
+import uuid
+import argparse
+import datetime
+
+import bench_common
+from bench_common import make_sqs_event, peak_rss_mb, run_isolated
+
+
+# ——————————————————————————————————————————————————————————————
+# Caminho antigo (cópia do handler anterior ao conversor colunar).
+# Colunas timestamp são parseadas por valor com fromisoformat: o
+# str(v) original não é aceito pelo pyarrow em colunas timestamp.
+# ——————————————————————————————————————————————————————————————
+def legacy_normalize(payload: dict):
+    payload.setdefault("id_evento", str(uuid.uuid4()))
+    ts = payload.get("ts_evento")
+    try:
+        dt = datetime.datetime.fromisoformat(ts.replace("Z","+00:00"))
+    except:
+        dt = datetime.datetime.utcnow()
+        payload["ts_evento"] = dt.isoformat()
+    payload["anomesdia"] = dt.strftime("%Y%m%d")
+    payload["hh"]        = dt.strftime("%H")
+
+
+def legacy_map_and_convert(raw: dict, pa, field_map, schema) -> dict:
+    out = {}
+    for json_key, col_name in field_map.items():
+        if col_name is None:
+            continue
+        v = raw.get(json_key)
+        if v is None:
+            out[col_name] = None
+            continue
+        dtype = schema.field(col_name).type
+        if pa.types.is_int64(dtype):
+            try:    out[col_name] = int(v)
+            except: out[col_name] = None
+        elif pa.types.is_float64(dtype):
+            try:    out[col_name] = float(v)
+            except: out[col_name] = None
+        elif pa.types.is_timestamp(dtype):
+            try:    out[col_name] = datetime.datetime.fromisoformat(v.replace("Z","+00:00"))
+            except: out[col_name] = None
+        else:
+            out[col_name] = str(v)
+    out["anomesdia"] = raw.get("anomesdia")
+    out["hh"]        = raw.get("hh")
+    return out
+
+
+def legacy_to_table(records: list, pa, schema):
+    data = {f.name: [] for f in schema}
+    for rec in records:
+        for f in schema:
+            data[f.name].append(rec.get(f.name))
+    return pa.Table.from_pydict(data, schema=schema)
+
+
+def run_mode(mode: str, n: int, repeat: int) -> dict:
+    import pyarrow as pa
+    app = bench_common.load_handler()
+    event = make_sqs_event(n)
+    rss_before = peak_rss_mb()
+
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        if mode == "legacy":
+            processed = []
+            for rec in event["Records"]:
+                raw = app.parse_sns_envelope(rec["body"])
+                legacy_normalize(raw)
+                processed.append(legacy_map_and_convert(raw, pa, app.FIELD_MAP, app.PARQUET_SCHEMA))
+            table = legacy_to_table(processed, pa, app.PARQUET_SCHEMA)
+        else:
+            batch = app.CONVERTER.new_batch()
+            for rec in event["Records"]:
+                raw = app.parse_sns_envelope(rec["body"])
+                app.normalize(raw)
+                batch.append(raw)
+            table = batch.to_table()
+        elapsed = time.perf_counter() - t0
+        assert table.num_rows == n
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        "mode": mode,
+        "records": n,
+        "best_s": round(best, 4),
+        "records_per_s": round(n / best),
+        "rss_base_mb": round(rss_before, 1),
+        "rss_peak_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--mode", choices=["legacy", "columnar"])
+    args = ap.parse_args()
+
+    if args.mode:
+        import json
+        print(json.dumps(run_mode(args.mode, args.records, args.repeat)))
+        return
+
+    results = [
+        run_isolated("bench_ingest.py", ["--mode", m, "--records", args.records, "--repeat", args.repeat])
+        for m in ("legacy", "columnar")
+    ]
+    print(f"{'modo':<10}{'registros':>10}{'melhor (s)':>12}{'reg/s':>12}{'RSS base':>10}{'RSS pico':>10}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['records']:>10}{r['best_s']:>12}{r['records_per_s']:>12}"
+              f"{r['rss_base_mb']:>10}{r['rss_peak_mb']:>10}")
+    speedup = results[1]["records_per_s"] / results[0]["records_per_s"]
+    print(f"speedup colunar: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
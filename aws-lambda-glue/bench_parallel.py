@@ -0,0 +1,64 @@
+# bench_parallel.py
+#
+# Escalonamento do modo PARSE_WORKERS: parse + normalize + conversão do lote
+# em 1, 2, 4 e 6 processos, contra o caminho serial no próprio processo.
+# Inclui o custo de mandar os shards pelo pipe e de trazer/concatenar o IPC.
+# Só faz sentido numa máquina (ou Lambda) com vCPUs suficientes.
+#
+#   python bench_parallel.py --records 20000 --workers 1 2 4 6
+
+import os
+import time
+import argparse
+
+import bench_common
+from bench_common import make_sqs_event
+from workers import ShardWorkers
+
+
+def best_of(repeat: int, fn) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=20_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 6])
+    args = ap.parse_args()
+
+    app = bench_common.load_handler()
+    records = make_sqs_event(args.records, hours=3)["Records"]
+
+    def run(convert):
+        failures = []
+        batch = convert(records, failures)
+        batch.to_table()
+        app.DEDUP.rollback()
+        assert len(batch) == args.records and not failures
+
+    # o LRU do Deduplicator guardaria os ids entre repetições; rollback()
+    # descarta as reservas sem passar nada para o LRU
+    serial = best_of(args.repeat, lambda: run(app.convert_records))
+
+    print(f"{args.records} mensagens, {os.cpu_count()} CPUs visíveis")
+    print(f"{'workers':<10}{'melhor (s)':>12}{'reg/s':>12}{'speedup':>10}")
+    print(f"{'serial':<10}{serial:>12.3f}{args.records / serial:>12.0f}{1:>10.2f}")
+    for n in args.workers:
+        pool = ShardWorkers(n, app.convert_shard)
+        try:
+            run(lambda r, f: app.convert_parallel(r, f, workers=pool))  # aquece os processos
+            elapsed = best_of(args.repeat, lambda: run(lambda r, f: app.convert_parallel(r, f, workers=pool)))
+        finally:
+            pool.close()
+        print(f"{n:<10}{elapsed:>12.3f}{args.records / elapsed:>12.0f}{serial / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_write_profiles.py
+#
+# Tamanho do arquivo vs seletividade de leitura para cada perfil de
+# profiles.py. A seletividade é medida como o Athena a enxerga: para uma
+# consulta pontual por cod_idef_pess ou num_cpf_cnpj, quantos row groups
+# (e quantos bytes) não podem ser descartados pelas estatísticas min/max.
+#
+#   python bench_write_profiles.py --records 50000 --lookups 200
+
+import io
+import time
+import random
+import argparse
+
+import pyarrow.parquet as pq
+
+import bench_common
+import profiles
+from bench_common import make_sqs_event
+
+
+def build_table(app, n: int):
+    batch = app.CONVERTER.new_batch()
+    for rec in make_sqs_event(n)["Records"]:
+        raw = app.parse_sns_envelope(rec["body"])
+        app.normalize(raw)
+        batch.append(raw)
+    return batch.to_table()
+
+
+def candidates(meta: pq.FileMetaData, col: int, value) -> tuple:
+    """Row groups cujo [min, max] pode conter o valor, e os bytes deles."""
+    groups, size = 0, 0
+    for i in range(meta.num_row_groups):
+        rg = meta.row_group(i)
+        stats = rg.column(col).statistics
+        if stats is None or not stats.has_min_max or stats.min <= value <= stats.max:
+            groups += 1
+            size += rg.total_byte_size
+    return groups, size
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=50_000)
+    ap.add_argument("--lookups", type=int, default=200)
+    args = ap.parse_args()
+
+    app = bench_common.load_handler()
+    table = build_table(app, args.records)
+    rng = random.Random(7)
+    probes = {
+        col: rng.sample(table.column(col).to_pylist(), args.lookups)
+        for col in ("cod_idef_pess", "num_cpf_cnpj")
+    }
+
+    print(f"{args.records} registros, {args.lookups} consultas pontuais por chave")
+    print(f"{'perfil':<10}{'tamanho (KiB)':>15}{'escrita (ms)':>14}{'row groups':>12}"
+          f"{'RG lidos pess':>15}{'bytes pess':>12}{'RG lidos doc':>14}{'bytes doc':>11}")
+    for name, profile in profiles.WRITE_PROFILES.items():
+        buf = io.BytesIO()
+        t0 = time.perf_counter()
+        profiles.write_table(table, buf, profile)
+        elapsed = time.perf_counter() - t0
+        meta = pq.read_metadata(io.BytesIO(buf.getvalue()))
+        total = sum(meta.row_group(i).total_byte_size for i in range(meta.num_row_groups))
+
+        row = []
+        for col, values in probes.items():
+            idx = table.schema.get_field_index(col)
+            hits = [candidates(meta, idx, v) for v in values]
+            rg = sum(h[0] for h in hits) / len(hits)
+            by = sum(h[1] for h in hits) / len(hits)
+            row += [f"{rg / meta.num_row_groups:.1%}", f"{by / total:.1%}"]
+
+        print(f"{name:<10}{len(buf.getvalue()) / 1024:>15.0f}{elapsed * 1000:>14.0f}{meta.num_row_groups:>12}"
+              f"{row[0]:>15}{row[1]:>12}{row[2]:>14}{row[3]:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# columnar.py
+
+import math
+import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# ——————————————————————————————————————————————————————————————
+# Validação textual usada no cast vetorizado (RE2, via pyarrow.compute).
+# Valores que não casam viram null, como o try/except do caminho antigo.
+# ——————————————————————————————————————————————————————————————
+_INT_PATTERN   = r"^[+-]?\d+$"
+_FLOAT_PATTERN = r"(?i)^[+-]?((\d+\.?\d*|\.\d+)(e[+-]?\d+)?|nan|inf|infinity)$"
+_ISO_PATTERN   = r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}:?\d{2})?$"
+_TZ_PATTERN    = r"(Z|[+-]\d{2}:?\d{2})$"
+
+_TS_UTC = pa.timestamp("ms", tz="UTC")
+
+# colunas de partição: ficam fora do schema Parquet (viram prefixo no S3)
+PARTITION_COLUMNS = ("anomesdia", "hh")
+
+
+def _to_text(values: list) -> pa.Array:
+    """Monta um array de strings; só cai no str() por valor se o lote for misto."""
+    try:
+        return pa.array(values, type=pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def _cast_text(text: pa.Array, dtype: pa.DataType) -> pa.Array:
+    """Cast vetorizado string → número; entradas inválidas viram null."""
+    pattern = _INT_PATTERN if pa.types.is_integer(dtype) else _FLOAT_PATTERN
+    text  = pc.utf8_trim_whitespace(text)
+    valid = pc.match_substring_regex(text, pattern)
+    text  = pc.if_else(valid, text, pa.scalar(None, pa.string()))
+    return pc.cast(text, dtype)
+
+
+def parse_timestamps(values: list) -> pa.Array:
+    """
+    Converte um lote de timestamps ISO-8601 (com ou sem offset, "Z", só a
+    data, frações até ns) em timestamp[ms, UTC] de uma vez. Sem offset vale
+    UTC; valores inválidos viram null.
+    """
+    text = pc.utf8_trim_whitespace(_to_text(values))
+    text = pc.replace_substring_regex(text, r"^(\d{4}-\d{2}-\d{2})$", r"\1T00:00:00")
+    text = pc.replace_substring_regex(text, r"(\.\d{6})\d+", r"\1")
+    valid = pc.match_substring_regex(text, _ISO_PATTERN)
+    naive = pc.invert(pc.match_substring_regex(text, _TZ_PATTERN))
+    text  = pc.if_else(naive, pc.binary_join_element_wise(text, "Z", ""), text)
+    text  = pc.if_else(valid, text, pa.scalar(None, pa.string()))
+    try:
+        ts = pc.cast(text, pa.timestamp("us", tz="UTC"))
+    except pa.ArrowInvalid:
+        # formato ok mas data impossível (ex.: mês 13): resolve um a um só aqui
+        out = []
+        for s in text.to_pylist():
+            try:
+                out.append(pc.cast(pa.array([s]), pa.timestamp("us", tz="UTC"))[0].as_py())
+            except pa.ArrowInvalid:
+                out.append(None)
+        ts = pa.array(out, type=pa.timestamp("us", tz="UTC"))
+    return pc.cast(ts, _TS_UTC, safe=False)
+
+
+def _truncate_numbers(values: list) -> list:
+    """int() do caminho antigo para números JSON não inteiros (1.5 → 1, true → 1)."""
+    return [int(v) if isinstance(v, (float, bool)) and math.isfinite(v) else v for v in values]
+
+
+def cast_column(values: list, dtype: pa.DataType) -> pa.Array:
+    """
+    Converte os valores crus de uma coluna para o tipo do schema.
+
+    Caminho rápido: o lote já veio tipado (ex.: números JSON) e o pyarrow
+    converte direto. Caso contrário, passa tudo para texto e faz o cast
+    vetorizado, com null para valores inválidos. Colunas inteiras truncam
+    números fracionários antes, como o int() por valor fazia.
+    """
+    if pa.types.is_string(dtype):
+        return _to_text(values)
+    if pa.types.is_timestamp(dtype):
+        # schema Glue é timestamp sem fuso: grava o instante em UTC
+        return pc.cast(parse_timestamps(values), dtype)
+    try:
+        return pa.array(values, type=dtype)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        pass
+    if pa.types.is_integer(dtype):
+        values = _truncate_numbers(values)
+        try:
+            return pa.array(values, type=dtype)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            pass
+    return _cast_text(_to_text(values), dtype)
+
+
+class ColumnarConverter:
+    """
+    Plano de conversão JSON → colunas Arrow, compilado uma vez a partir do
+    FIELD_MAP e do PARQUET_SCHEMA (no import do handler).
+    """
+
+    def __init__(self, field_map: dict, schema: pa.Schema):
+        names = set(schema.names)
+        plan = {}
+        for json_key, col_name in field_map.items():
+            if col_name is None:
+                continue
+            if col_name not in names:
+                raise ValueError(f"Coluna {col_name} (campo {json_key}) não existe no schema")
+            plan[col_name] = json_key
+
+        self.schema = schema
+        # ordem das colunas segue o schema; json_keys alinhado com as colunas
+        self.columns   = [f.name for f in schema if f.name in plan]
+        self.json_keys = tuple(plan[c] for c in self.columns)
+
+    def new_batch(self) -> "ColumnarBatch":
+        return ColumnarBatch(self)
+
+
+class ColumnarBatch:
+    """
+    Acumula um lote direto em listas por coluna (sem dict intermediário por
+    registro) e converte tudo de uma vez em to_table().
+
+    ts_evento é parseado uma vez para o lote inteiro; anomesdia/hh saem dele
+    (UTC). Sem ts_evento válido, vale o horário do fechamento do lote.
+    """
+
+    def __init__(self, converter: ColumnarConverter):
+        self._converter = converter
+        self._columns   = [[] for _ in converter.json_keys]
+        self.id_evento  = []
+        self.ts_evento  = []
+        self._meta      = None
+
+    def __len__(self):
+        return len(self.id_evento)
+
+    def append(self, raw: dict):
+        get = raw.get
+        for key, col in zip(self._converter.json_keys, self._columns):
+            col.append(get(key))
+        self.id_evento.append(get("id_evento"))
+        self.ts_evento.append(get("ts_evento"))
+        self._meta = None
+
+    def metadata(self) -> dict:
+        """Colunas derivadas do lote: id_evento, ts_evento, anomesdia, hh."""
+        if self._meta is None:
+            now = pa.scalar(datetime.datetime.now(datetime.timezone.utc), type=_TS_UTC)
+            ts = pc.fill_null(parse_timestamps(self.ts_evento), now)
+            self._meta = {
+                "id_evento": _to_text(self.id_evento),
+                "ts_evento": ts,
+                "anomesdia": pc.strftime(ts, "%Y%m%d"),
+                "hh":        pc.strftime(ts, "%H"),
+            }
+        return self._meta
+
+    def to_table(self) -> pa.Table:
+        conv = self._converter
+        produced = dict(zip(conv.columns, self._columns))
+        meta = self.metadata()
+        n = len(self)
+
+        arrays = []
+        for f in conv.schema:
+            if f.name in produced:
+                arrays.append(cast_column(produced[f.name], f.type))
+            elif f.name in meta:
+                arrays.append(pc.cast(meta[f.name], f.type))
+            else:
+                arrays.append(pa.nulls(n, type=f.type))
+        return pa.Table.from_arrays(arrays, schema=conv.schema)
+
+    def partitions(self) -> list:
+        """Separa o lote por (anomesdia, hh): [((anomesdia, hh), pa.Table), ...]."""
+        meta = self.metadata()
+        return _split_partitions(self.to_table(), meta["anomesdia"], meta["hh"])
+
+    def to_ipc(self) -> bytes:
+        """Tabela + colunas de partição em Arrow IPC, para voltar de um worker."""
+        meta = self.metadata()
+        table = self.to_table()
+        for name in PARTITION_COLUMNS:
+            table = table.append_column(name, meta[name])
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+class ArrowBatch:
+    """
+    Lote já convertido (tabela no schema + anomesdia/hh), montado a partir do
+    IPC devolvido pelos workers. Mesma interface de escrita do ColumnarBatch.
+    """
+
+    def __init__(self, table: pa.Table, anomesdia: pa.ChunkedArray, hh: pa.ChunkedArray):
+        self._table    = table
+        self.anomesdia = anomesdia
+        self.hh        = hh
+
+    @classmethod
+    def from_ipc(cls, payloads: list, schema: pa.Schema) -> "ArrowBatch":
+        tables = [pa.ipc.open_stream(p).read_all() for p in payloads]
+        if not tables:
+            empty = pa.chunked_array([], type=pa.string())
+            return cls(schema.empty_table(), empty, empty)
+        table = pa.concat_tables(tables)
+        parts = [table.column(name) for name in PARTITION_COLUMNS]
+        table = table.select(schema.names)
+        return cls(table, *parts)
+
+    def __len__(self):
+        return self._table.num_rows
+
+    def take(self, indices: list) -> "ArrowBatch":
+        idx = pa.array(indices, type=pa.int64())
+        return ArrowBatch(self._table.take(idx), self.anomesdia.take(idx), self.hh.take(idx))
+
+    def to_table(self) -> pa.Table:
+        return self._table
+
+    def partitions(self) -> list:
+        return _split_partitions(self._table, self.anomesdia, self.hh)
+
+
+def _split_partitions(table: pa.Table, anomesdia, hh) -> list:
+    keys = pc.binary_join_element_wise(anomesdia, hh, "/")
+    uniq = pc.unique(keys).to_pylist()
+    if len(uniq) == 1:
+        return [(tuple(uniq[0].split("/")), table)]
+    return [
+        (tuple(k.split("/")), table.filter(pc.equal(keys, k)))
+        for k in sorted(uniq)
+    ]
@@ -0,0 +1,362 @@
+# compaction.py
+#
+# Compactação dos lote-<uuid>.parquet pequenos de cada partição fechada
+# (S3_PREFIX/anomesdia=/hh=/) em poucos arquivos grandes.
+#
+# Pode rodar como Lambda agendada (handler) ou localmente:
+#   python compaction.py --local ./dados --prefix bronze/eventos
+#   python compaction.py --bucket meu-bucket --prefix bronze/eventos
+
+import os
+import io
+import re
+import json
+import time
+import uuid
+import shutil
+import logging
+import argparse
+import datetime
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import profiles
+from schema import PARQUET_SCHEMA
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TARGET_FILE_MB      = int(os.environ.get("COMPACTION_TARGET_FILE_MB", "128"))
+TARGET_ROW_GROUP_MB = int(os.environ.get("COMPACTION_ROW_GROUP_MB", "64"))
+GRACE_MINUTES       = int(os.environ.get("COMPACTION_GRACE_MINUTES", "15"))
+MIN_FILES           = int(os.environ.get("COMPACTION_MIN_FILES", "2"))
+# opções do writer e ordenação vêm do perfil; o tamanho dos row groups
+# continua vindo de COMPACTION_ROW_GROUP_MB
+PROFILE             = profiles.get_profile(os.environ.get("COMPACTION_PROFILE", "archive"))
+
+# arquivos com "_" no início são ignorados pelo Athena/Hive: o manifesto e as
+# saídas ainda não publicadas (_compactado-*) nunca aparecem nas consultas
+MANIFEST_NAME = "_compactacao.json"
+HIDDEN_PREFIX = "_"
+INPUT_RE      = re.compile(r"(?:^|/)lote-[^/]+\.parquet$")
+PARTITION_RE  = re.compile(r"anomesdia=(\d{8})/hh=(\d{2})/")
+READ_BATCH    = 64_000
+
+
+# ——————————————————————————————————————————————————————————————
+# Armazenamento: diretório local ou S3 (boto3, inclusive moto)
+# ——————————————————————————————————————————————————————————————
+class LocalStorage:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def list(self, prefix: str) -> list:
+        base = self._path(prefix)
+        out = []
+        for dirpath, _, files in os.walk(base):
+            for name in files:
+                full = os.path.join(dirpath, name)
+                key = os.path.relpath(full, self.root).replace(os.sep, "/")
+                out.append((key, os.path.getsize(full)))
+        return sorted(out)
+
+    def open_input(self, key: str):
+        return open(self._path(key), "rb")
+
+    def read_text(self, key: str):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return f.read()
+
+    def write_text(self, key: str, text: str):
+        with open(self._path(key), "w") as f:
+            f.write(text)
+
+    def upload(self, local_path: str, key: str):
+        shutil.copyfile(local_path, self._path(key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def rename(self, src: str, dst: str):
+        os.replace(self._path(src), self._path(dst))
+
+    def delete(self, keys: list):
+        for key in keys:
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+
+
+class S3Storage:
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def list(self, prefix: str) -> list:
+        out = []
+        pages = self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix)
+        for page in pages:
+            for obj in page.get("Contents", []):
+                out.append((obj["Key"], obj["Size"]))
+        return sorted(out)
+
+    def open_input(self, key: str):
+        # arquivos de entrada são pequenos por definição; um de cada vez em memória
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        return io.BytesIO(body)
+
+    def read_text(self, key: str):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read().decode()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def write_text(self, key: str, text: str):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=text.encode(),
+                               ContentType="application/json")
+
+    def upload(self, local_path: str, key: str):
+        # upload_file faz multipart sozinho para arquivos grandes
+        self.client.upload_file(local_path, self.bucket, key)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def rename(self, src: str, dst: str):
+        # S3 não tem rename: cópia no servidor (multipart acima de 8 MB) e delete
+        self.client.copy({"Bucket": self.bucket, "Key": src}, self.bucket, dst)
+        self.delete([src])
+
+    def delete(self, keys: list):
+        for i in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": k} for k in keys[i:i + 1000]], "Quiet": True},
+            )
+
+
+# ——————————————————————————————————————————————————————————————
+# Compactação
+# ——————————————————————————————————————————————————————————————
+def closed_partitions(objects: list, now: datetime.datetime) -> dict:
+    """Agrupa os lotes por partição, só para horas já fechadas (+ carência)."""
+    limit = now - datetime.timedelta(minutes=GRACE_MINUTES)
+    groups = {}
+    for key, size in objects:
+        m = PARTITION_RE.search(key)
+        if not m:
+            continue
+        d, h = m.groups()
+        end = datetime.datetime.strptime(d + h, "%Y%m%d%H") + datetime.timedelta(hours=1)
+        if end > limit:
+            continue
+        groups.setdefault((d, h), []).append((key, size))
+    return groups
+
+
+def _plan_sizes(storage, inputs: list) -> tuple:
+    """Estima linhas por row group e por arquivo a partir do primeiro lote."""
+    key, size = inputs[0]
+    with storage.open_input(key) as f:
+        rows = pq.read_metadata(f).num_rows
+    bytes_per_row = max(1.0, size / max(rows, 1))
+    rows_per_group = max(1, int(TARGET_ROW_GROUP_MB * 1024 * 1024 / bytes_per_row))
+    rows_per_file  = max(rows_per_group, int(TARGET_FILE_MB * 1024 * 1024 / bytes_per_row))
+    return rows_per_group, rows_per_file
+
+
+def _merge(storage, inputs: list, workdir: str) -> list:
+    """
+    Lê os lotes em record batches e regrava em arquivos grandes, um row group
+    por vez: só um lote de entrada e um row group ficam em memória.
+    Retorna os caminhos locais dos arquivos gerados.
+    """
+    rows_per_group, rows_per_file = _plan_sizes(storage, inputs)
+    outputs = []
+    state = {"writer": None, "rows": 0}
+
+    def write_group(table: pa.Table):
+        if state["writer"] is None:
+            path = os.path.join(workdir, f"compactado-{uuid.uuid4()}.parquet")
+            state["writer"] = pq.ParquetWriter(
+                path, PARQUET_SCHEMA, **profiles.writer_options(PROFILE, PARQUET_SCHEMA))
+            outputs.append(path)
+        table = profiles.sort_table(table, PROFILE)
+        state["writer"].write_table(table, row_group_size=table.num_rows)
+        state["rows"] += table.num_rows
+        if state["rows"] >= rows_per_file:
+            state["writer"].close()
+            state["writer"], state["rows"] = None, 0
+
+    buffer, buffered = [], 0
+    for key, _ in inputs:
+        with storage.open_input(key) as f:
+            for rb in pq.ParquetFile(f).iter_batches(batch_size=READ_BATCH, columns=PARQUET_SCHEMA.names):
+                buffer.append(pa.Table.from_batches([rb]).cast(PARQUET_SCHEMA))
+                buffered += rb.num_rows
+                while buffered >= rows_per_group:
+                    table = pa.concat_tables(buffer)
+                    write_group(table.slice(0, rows_per_group))
+                    rest = table.slice(rows_per_group)
+                    buffer, buffered = [rest], rest.num_rows
+    if buffered:
+        write_group(pa.concat_tables(buffer))
+    if state["writer"] is not None:
+        state["writer"].close()
+    return outputs
+
+
+def _hidden(key: str) -> str:
+    head, _, name = key.rpartition("/")
+    return f"{head}/{HIDDEN_PREFIX}{name}"
+
+
+def _write_manifest(storage, manifest_key: str, estado: str, inputs: list, outputs: list):
+    storage.write_text(manifest_key, json.dumps({"estado": estado, "inputs": inputs, "outputs": outputs}))
+
+
+def _publish(storage, manifest: dict):
+    """Depois do commit: publica as saídas ocultas e remove as entradas (idempotente)."""
+    for key in manifest["outputs"]:
+        if storage.exists(_hidden(key)):
+            storage.rename(_hidden(key), key)
+    storage.delete(manifest["inputs"])
+
+
+def _recover(storage, part: str, manifest_key: str) -> bool:
+    """
+    Retoma uma execução interrompida. Com o commit feito, termina a troca;
+    antes dele, as entradas continuam valendo e as saídas ocultas já
+    enviadas são descartadas. Retorna True se havia algo pendente.
+    """
+    pending = storage.read_text(manifest_key)
+    if not pending:
+        return False
+    manifest = json.loads(pending)
+    if manifest.get("estado", "confirmado") == "confirmado":
+        _publish(storage, manifest)
+        logger.info(f"Compactação pendente concluída em {part}")
+    else:
+        storage.delete([_hidden(k) for k in manifest["outputs"]])
+        logger.info(f"Compactação interrompida descartada em {part}")
+    storage.delete([manifest_key])
+    return True
+
+
+def compact_partition(storage, prefix: str, d: str, h: str, objects: list) -> dict:
+    """
+    Troca os lotes da partição por arquivos compactados:
+
+      1. gera as saídas em disco local
+      2. manifesto "planejado" com entradas e chaves finais das saídas
+      3. envia as saídas com nome oculto (_compactado-*), fora das consultas
+      4. commit: manifesto "confirmado"
+      5. renomeia as saídas para o nome final e apaga as entradas
+      6. remove o manifesto
+
+    Uma queda antes do passo 4 deixa só as entradas visíveis (a próxima
+    execução limpa as saídas ocultas e refaz); depois dele, a próxima
+    execução termina os passos 5 e 6. Linhas nunca ficam duplicadas em
+    definitivo.
+    """
+    part = f"{prefix}/anomesdia={d}/hh={h}"
+    manifest_key = f"{part}/{MANIFEST_NAME}"
+
+    if _recover(storage, part, manifest_key):
+        objects = storage.list(part + "/")
+
+    inputs = [(k, s) for k, s in objects if INPUT_RE.search(k)]
+    if len(inputs) < MIN_FILES:
+        return None
+    input_keys = [k for k, _ in inputs]
+
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as workdir:
+        local = _merge(storage, inputs, workdir)
+        outputs = [f"{part}/{os.path.basename(path)}" for path in local]
+        _write_manifest(storage, manifest_key, "planejado", input_keys, outputs)
+        for path, key in zip(local, outputs):
+            storage.upload(path, _hidden(key))
+
+    _write_manifest(storage, manifest_key, "confirmado", input_keys, outputs)
+    _publish(storage, {"inputs": input_keys, "outputs": outputs})
+    storage.delete([manifest_key])
+
+    sizes = dict(storage.list(part + "/"))
+    return {
+        "partition":    f"{d}/{h}",
+        "files_before": len(inputs),
+        "files_after":  len(outputs),
+        "bytes_before": sum(s for _, s in inputs),
+        "bytes_after":  sum(sizes.get(k, 0) for k in outputs),
+        "elapsed_s":    round(time.perf_counter() - t0, 3),
+    }
+
+
+def compact(storage, prefix: str, now: datetime.datetime = None) -> dict:
+    prefix = prefix.rstrip("/")
+    now = now or datetime.datetime.utcnow()
+    t0 = time.perf_counter()
+    groups = closed_partitions(storage.list(prefix + "/"), now)
+
+    partitions = []
+    for (d, h), objects in sorted(groups.items()):
+        report = compact_partition(storage, prefix, d, h, objects)
+        if report:
+            logger.info(report)
+            partitions.append(report)
+
+    return {
+        "partitions":   partitions,
+        "files_before": sum(p["files_before"] for p in partitions),
+        "files_after":  sum(p["files_after"] for p in partitions),
+        "bytes_before": sum(p["bytes_before"] for p in partitions),
+        "bytes_after":  sum(p["bytes_after"] for p in partitions),
+        "elapsed_s":    round(time.perf_counter() - t0, 3),
+    }
+
+
+# ——————————————————————————————————————————————————————————————
+# Entradas: Lambda agendada e linha de comando
+# ——————————————————————————————————————————————————————————————
+def handler(event, context):
+    import boto3
+    storage = S3Storage(boto3.client("s3"), os.environ["BUCKET_DADOS"])
+    prefix = (event or {}).get("prefix") or os.environ.get("S3_PREFIX", "bronze/eventos")
+    result = compact(storage, prefix)
+    logger.info({k: v for k, v in result.items() if k != "partitions"})
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compacta os lotes Parquet de partições fechadas")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--local", help="diretório raiz (equivale ao bucket)")
+    src.add_argument("--bucket", help="bucket S3")
+    ap.add_argument("--prefix", default=os.environ.get("S3_PREFIX", "bronze/eventos"))
+    args = ap.parse_args()
+
+    if args.local:
+        storage = LocalStorage(args.local)
+    else:
+        import boto3
+        storage = S3Storage(boto3.client("s3"), args.bucket)
+    result = compact(storage, args.prefix)
+    print(json.dumps({k: v for k, v in result.items() if k != "partitions"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
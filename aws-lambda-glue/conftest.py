@@ -0,0 +1,11 @@
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# schema sintético dos benchmarks (o glue_schema.json real vem do catálogo no build)
+os.environ.setdefault("GLUE_SCHEMA_PATH", os.path.join(HERE, "bench_schema.json"))
+os.environ.setdefault("BUCKET_DADOS", "test-bucket")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+sys.path.insert(0, HERE)
@@ -0,0 +1,215 @@
+# dedup.py
+#
+# Deduplicação de eventos por id_evento: dentro do lote (set) e entre lotes
+# (store de idempotência com TTL no DynamoDB, com um LRU em memória na frente).
+#
+# Cada id passa por dois estados no store:
+#   pendente: reservado antes de gravar o Parquet; expira rápido, para que
+#             uma invocação que morreu no meio não descarte o reenvio do SQS
+#   gravado:  confirmado depois do PUT; expira no TTL de deduplicação
+
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# limites por chamada do DynamoDB
+TRANSACT_LIMIT    = 100
+BATCH_WRITE_LIMIT = 25
+
+
+class LRUCache:
+    """LRU de ids já confirmados, com o instante de expiração de cada um."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items  = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        exp = self._items.get(key)
+        if exp is None:
+            return False
+        if exp < time.time():
+            del self._items[key]
+            return False
+        self._items.move_to_end(key)
+        return True
+
+    def add(self, key, expires_at: float):
+        self._items[key] = expires_at
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+
+class MemoryIdempotencyStore:
+    """Stand-in local do store (testes, execução fora da AWS)."""
+
+    def __init__(self):
+        self._items = {}
+
+    def claim(self, ids: list, expires_at: int) -> list:
+        now = time.time()
+        claimed = []
+        for i in ids:
+            item = self._items.get(i)
+            if item is None or item[1] < now:
+                self._items[i] = ("pendente", expires_at)
+                claimed.append(i)
+        return claimed
+
+    def confirm(self, ids: list, expires_at: int):
+        for i in ids:
+            self._items[i] = ("gravado", expires_at)
+
+    def release(self, ids: list):
+        for i in ids:
+            self._items.pop(i, None)
+
+
+class DynamoIdempotencyStore:
+    """
+    Tabela DynamoDB com chave id_evento e TTL em expira_em. A reserva usa
+    TransactWriteItems com condição (até 100 por chamada): ids cuja condição
+    falha são duplicados e a transação é refeita só com os demais.
+    """
+
+    def __init__(self, client, table: str):
+        self._client = client
+        self._table  = table
+
+    def _put(self, i: str, status: str, expires_at: int) -> dict:
+        return {
+            "TableName": self._table,
+            "Item": {
+                "id_evento": {"S": i},
+                "status":    {"S": status},
+                "expira_em": {"N": str(expires_at)},
+            },
+        }
+
+    def claim(self, ids: list, expires_at: int) -> list:
+        claimed = []
+        for n in range(0, len(ids), TRANSACT_LIMIT):
+            pending = ids[n:n + TRANSACT_LIMIT]
+            while pending:
+                now = str(int(time.time()))
+                items = []
+                for i in pending:
+                    put = self._put(i, "pendente", expires_at)
+                    put["ConditionExpression"] = "attribute_not_exists(id_evento) OR expira_em < :agora"
+                    put["ExpressionAttributeValues"] = {":agora": {"N": now}}
+                    items.append({"Put": put})
+                try:
+                    self._client.transact_write_items(TransactItems=items)
+                    claimed += pending
+                    break
+                except self._client.exceptions.TransactionCanceledException as e:
+                    reasons = e.response.get("CancellationReasons", [])
+                    codes = [r.get("Code") for r in reasons]
+                    if any(c not in ("None", "ConditionalCheckFailed", None) for c in codes):
+                        raise
+                    pending = [i for i, c in zip(pending, codes) if c != "ConditionalCheckFailed"]
+        return claimed
+
+    def _batch_write(self, requests: list):
+        for n in range(0, len(requests), BATCH_WRITE_LIMIT):
+            items = {self._table: requests[n:n + BATCH_WRITE_LIMIT]}
+            while items:
+                resp = self._client.batch_write_item(RequestItems=items)
+                items = resp.get("UnprocessedItems") or {}
+
+    def confirm(self, ids: list, expires_at: int):
+        self._batch_write([
+            {"PutRequest": {"Item": self._put(i, "gravado", expires_at)["Item"]}} for i in ids
+        ])
+
+    def release(self, ids: list):
+        self._batch_write([
+            {"DeleteRequest": {"Key": {"id_evento": {"S": i}}}} for i in ids
+        ])
+
+
+def event_id(payload):
+    """id_evento do payload como texto, ou None."""
+    i = payload.get("id_evento") if isinstance(payload, dict) else None
+    return None if i is None else str(i)
+
+
+class Deduplicator:
+    """
+    Filtra os payloads de um lote. Sem store, deduplica dentro do lote e
+    contra os ids já gravados por este container (LRU). O lote vale entre
+    chamadas de select_ids (chunks do streaming) até commit()/rollback().
+    Os contadores são zerados a cada lote em reset_stats().
+    """
+
+    def __init__(self, store=None, ttl_seconds: int = 86400, pending_seconds: int = 180,
+                 lru_size: int = 100_000):
+        self._store    = store
+        self._ttl      = ttl_seconds
+        self._pending  = pending_seconds
+        self._lru      = LRUCache(lru_size)
+        self._accepted = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"no_lote": 0, "lru": 0, "entre_lotes": 0}
+        # ids vistos no lote corrente, em todos os chunks
+        self._seen = set()
+
+    def select(self, payloads: list) -> list:
+        """
+        Índices dos payloads que seguem para gravação, na ordem original.
+        Payloads sem id_evento sempre passam.
+        """
+        return self.select_ids([event_id(p) for p in payloads])
+
+    def select_ids(self, ids: list) -> list:
+        """Como select(), a partir dos id_evento já extraídos (None = sem id)."""
+        keep = []
+        for n, i in enumerate(ids):
+            if i is None:
+                keep.append(n)
+                continue
+            if i in self._seen:
+                self.stats["no_lote"] += 1
+                continue
+            self._seen.add(i)
+            if i in self._lru:
+                self.stats["lru"] += 1
+                continue
+            keep.append(n)
+
+        fresh = [ids[n] for n in keep if ids[n] is not None]
+        if self._store is None or not fresh:
+            self._accepted += fresh
+            return keep
+
+        claimed = set(self._store.claim(fresh, int(time.time()) + self._pending))
+        self._accepted += [i for i in fresh if i in claimed]
+        self.stats["entre_lotes"] += len(fresh) - len(claimed)
+        return [n for n in keep if ids[n] is None or ids[n] in claimed]
+
+    def commit(self):
+        """Depois do Parquet gravado: reservas viram definitivas (TTL cheio)."""
+        self._seen = set()
+        if not self._accepted:
+            return
+        expires_at = int(time.time()) + self._ttl
+        if self._store is not None:
+            self._store.confirm(self._accepted, expires_at)
+        for i in self._accepted:
+            self._lru.add(i, expires_at)
+        self._accepted = []
+
+    def rollback(self):
+        """Falha na gravação: libera as reservas para o reenvio do SQS passar."""
+        self._seen = set()
+        if self._accepted and self._store is not None:
+            try:
+                self._store.release(self._accepted)
+            except Exception as e:
+                logger.error(f"Falha ao liberar reservas de deduplicação: {e}")
+        self._accepted = []
@@ -0,0 +1,38 @@
+# jsonlib.py
+#
+# Backend JSON do ingest: orjson quando estiver no pacote, stdlib caso
+# contrário. JSON_BACKEND=json força a stdlib.
+
+import os
+import json
+
+
+def _stdlib():
+    return json.loads, json.JSONDecodeError
+
+
+def _orjson():
+    import orjson
+    return orjson.loads, orjson.JSONDecodeError
+
+
+_BACKENDS = {"json": _stdlib, "orjson": _orjson}
+
+
+def use(name: str) -> str:
+    """Troca o backend em uso; cai para a stdlib se o orjson não estiver instalado."""
+    global loads, JSONDecodeError, BACKEND
+    if name not in _BACKENDS:
+        raise ValueError(f"JSON_BACKEND desconhecido: {name} (aceitos: {', '.join(sorted(_BACKENDS))})")
+    try:
+        loads, JSONDecodeError = _BACKENDS[name]()
+        BACKEND = name
+    except ImportError:
+        loads, JSONDecodeError = _stdlib()
+        BACKEND = "json"
+    return BACKEND
+
+
+# ambos os JSONDecodeError herdam de ValueError
+loads, JSONDecodeError, BACKEND = None, ValueError, None
+use(os.environ.get("JSON_BACKEND", "orjson"))
@@ -1,15 +1,21 @@
 # app.py
 
 import os
-import json
 import io
 import uuid
 import logging
-import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
-import pyarrow as pa
-import pyarrow.parquet as pq
+
+import jsonlib
+import profiles
+from schema import PARQUET_SCHEMA, FIELD_MAP, SCHEMA_DEFS
+from columnar import ColumnarConverter, ColumnarBatch, ArrowBatch
+from partitions import PartitionRegistry
+from s3stream import PartitionedParquetStream
+from dedup import Deduplicator, DynamoIdempotencyStore, event_id
+from workers import ShardWorkers
 
 # ——————————————————————————————————————————————————————————————
 # Configuração de logging
@@ -18,99 +24,9 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ——————————————————————————————————————————————————————————————
-# Carrega o schema do Glue (lista de {"Name":..., "Type":...})
-# ——————————————————————————————————————————————————————————————
-with open("glue_schema.json", "r") as f:
-    SCHEMA_DEFS = json.load(f)
-
-# Map Glue types para PyArrow DataType
-_TYPE_MAP = {
-    "string":    pa.string(),
-    "double":    pa.float64(),
-    "int":       pa.int64(),
-    "timestamp": pa.timestamp("ms"),
-}
-
-# Constrói o pa.Schema
-_fields = []
-for col in SCHEMA_DEFS:
-    dtype = _TYPE_MAP.get(col["Type"])
-    if dtype is None:
-        raise ValueError(f"Tipo desconhecido no schema: {col['Type']}")
-    _fields.append(pa.field(col["Name"], dtype))
-PARQUET_SCHEMA = pa.schema(_fields)
-
-# ——————————————————————————————————————————————————————————————
-# Mapeamento de nomes JSON → nomes do schema Glue
-# (quando diferente; se iguais, bastaria usar identity)
+# Conversor colunar compilado uma vez (FIELD_MAP + glue_schema.json)
 # ——————————————————————————————————————————————————————————————
-FIELD_MAP = {
-    "codigo_identificacao_pessoa":        "cod_idef_pess",
-    "codigo_tipo_pessoa":                 "cod_tipo_pess",
-    "documento_pessoa":                   "num_cpf_cnpj",
-    "ano_mes_referencia":                 "txt_ano_mes_risc_bace",
-    "origem_risco":                       "cod_orig_risc_bace",
-    "modalidade_risco":                   "cod_moda_cred_risc_bace",
-    "codigo_itau":                        None,  # não persiste
-    "data_atualizacao_risco":             None,  # não persiste
-    "hora_consulta_bacen":                "dat_hor_cslt_risc_bace",
-    "codigo_tipo_consulta":               None,
-    "codigo_tipo_envio":                  None,
-    "codigo_tipo_retorno":                None,
-    "codigo_tipo_autorizacao_cliente":    None,
-    "codigo_tipo_publico_pesquisa":       None,
-    "percentual_remessa_instituicao":     "pct_docm_prcs_risc_bace",
-    "data_inicio_relacionamento":         "dat_inio_rlmt_clie_risc_bace",
-    "vinculo_moeda_estrangeira":          "cod_vncl_moed_esgr_risc_bace",
-    "quantidade_instituicao_financeira_risco": "qtd_inst_finn_risc_bace",
-    "quantidade_operacao_financeira_cliente":  "qtd_totl_oper_finn_rspl_risc",
-    "quantidade_operacao_judice_cliente":      "qtd_oper_judc_risc_bace",
-    "valor_operacao_judice":              "vlr_oper_judc_resp_totl_risc",
-    "quantidade_operacao_discordancia":   "qtd_oper_dsco_risc_bace",
-    "valor_operacao_discordancia":        "vlr_resp_totl_dsco_risc_bace",
-    # buckets “vencer”
-    "valor_vencer_30":                    "vlr_cred_vncr_30_dia_risc",
-    "valor_vencer_60":                    "vlr_cred_vncr_60_dia_risc",
-    "valor_vencer_90":                    "vlr_cred_vncr_90_dia_risc",
-    "valor_vencer_180":                   "vlr_cred_vncr_180_dia_risc",
-    "valor_vencer_360":                   "vlr_cred_vncr_360_dia_risc",
-    "valor_vencer_540":                   "vlr_cred_vncr_5400_dia_risc",
-    "valor_vencer_acima_540":             "vlr_cred_vncr_prz_indm_risc",
-    "valor_total_vencer":                 "vlr_totl_cred_vncr_risc",
-    # buckets “vencido”
-    "valor_vencido_14":                   "vlr_cred_vncd_14_dia_risc",
-    "valor_vencido_30":                   "vlr_cred_vncd_30_dia_risc",
-    "valor_vencido_60":                   "vlr_cred_vncd_60_dia_risc",
-    "valor_vencido_90":                   "vlr_cred_vncd_90_dia_risc",
-    "valor_vencido_120":                  "vlr_cred_vncd_120_dia_risc",
-    "valor_vencido_180":                  "vlr_cred_vncd_180_dia_risc",
-    "valor_vencido_240":                  "vlr_cred_vncd_240_dia_risc",
-    "valor_vencido_300":                  "vlr_cred_vncd_300_dia_risc",
-    "valor_vencido_360":                  "vlr_cred_vncd_360_dia_risc",
-    "valor_vencido_540":                  "vlr_cred_vncd_540_dia_risc",
-    "valor_vencido_acima_540":            "vlr_cred_vncd_acim_540_dia",
-    "valor_total_vencido":                "vlr_totl_cred_vncd_risc",
-    # crédito liberado / vencimento
-    "valor_credito_liberar_ate360":       "vlr_cred_lbra_limi_360_dia",
-    "valor_credito_liberar_mais360":      "vlr_cred_lbra_acim_360_dia",
-    "valor_credito_liberar_total":        "vlr_totl_cred_lbra_dia_risc",
-    "valor_credito_vencimento_ate360":    "vlr_cred_vcto_limi_360_dia",
-    "valor_credito_vencimento_mais360":   "vlr_cred_vcto_acim_360_dia",
-    "valor_credito_vencimento_total":     "vlr_totl_limi_cred_dia_risc",
-    # prejuízo
-    "valor_credito_prejuizo_ate12_cliente":"vlr_cred_prej_12_mes_risc",
-    "valor_credito_prejuizo_12_48":       "vlr_cred_prej_48_mes_risc",
-    "valor_credito_prejuizo_mais12_cliente":"vlr_prej_acim_12_mes_risc",
-    "valor_credito_prejuizo_total":       "vlr_totl_cred_prej_risc",
-    # flags/índices
-    "percentual_informacao_bacen":        "pct_volu_prcs_risc_bace",
-    # metadados finais
-    "codigo_operacao":                    "cod_prco_risc_bace",
-    "sistema":                            "sistema",
-    "codigo_retorno":                     "codigo_retorno",
-    "cliente":                            "cliente",
-    "origem_consulta":                    "origem_consulta",
-}
+CONVERTER = ColumnarConverter(FIELD_MAP, PARQUET_SCHEMA)
 
 # ——————————————————————————————————————————————————————————————
 # Clientes AWS e configurações via env
@@ -123,129 +39,205 @@ S3_PREFIX    = os.environ.get("S3_PREFIX", "bronze/eventos").rstrip("/")
 GLUE_DB      = os.environ.get("GLUE_DB")
 GLUE_TABLE   = os.environ.get("GLUE_TABLE")
 REGISTER_PARTITIONS = os.environ.get("REGISTER_PARTITIONS", "true").lower() == "true"
+WRITE_MAX_WORKERS   = int(os.environ.get("WRITE_MAX_WORKERS", "8"))
+# "true": assinatura SNS com raw message delivery (corpo já é o payload)
+# "auto": detecta o envelope SNS mensagem a mensagem (útil na transição)
+SNS_RAW_DELIVERY    = os.environ.get("SNS_RAW_DELIVERY", "auto").lower()
+# > 0 liga o modo streaming: converte em pedaços desse tamanho, cada um vira
+# row group, e os bytes vão para o S3 em multipart (partes de S3_PART_SIZE_MB)
+STREAM_CHUNK_RECORDS = int(os.environ.get("STREAM_CHUNK_RECORDS", "0"))
+S3_PART_SIZE_MB      = int(os.environ.get("S3_PART_SIZE_MB", "8"))
+# deduplicação por id_evento; sem DEDUP_TABLE vale só no lote + LRU do container
+DEDUP_TABLE           = os.environ.get("DEDUP_TABLE")
+DEDUP_TTL_HOURS       = int(os.environ.get("DEDUP_TTL_HOURS", "24"))
+DEDUP_PENDING_SECONDS = int(os.environ.get("DEDUP_PENDING_SECONDS", "180"))
+DEDUP_LRU_SIZE        = int(os.environ.get("DEDUP_LRU_SIZE", "100000"))
+# > 1: parse/normalize/conversão em processos (um shard do lote por worker);
+# só compensa com mais de um vCPU (memória >= ~3.5 GB)
+PARSE_WORKERS         = int(os.environ.get("PARSE_WORKERS", "0"))
+
+DEDUP = Deduplicator(
+    store=DynamoIdempotencyStore(boto3.client("dynamodb"), DEDUP_TABLE) if DEDUP_TABLE else None,
+    ttl_seconds=DEDUP_TTL_HOURS * 3600,
+    pending_seconds=DEDUP_PENDING_SECONDS,
+    lru_size=DEDUP_LRU_SIZE,
+)
+
+# perfil de escrita Parquet (PARQUET_PROFILE), validado no cold start
+WRITE_PROFILE = profiles.get_profile()
+
+# pool limitado para os PUTs por partição; fica quente entre invocações
+_write_pool = ThreadPoolExecutor(max_workers=WRITE_MAX_WORKERS, thread_name_prefix="write")
+
+# partições já conhecidas no Glue (cache do container)
+PARTITIONS = PartitionRegistry(glue, GLUE_DB, GLUE_TABLE, f"s3://{BUCKET}/{S3_PREFIX}", SCHEMA_DEFS)
 
 # ——————————————————————————————————————————————————————————————
 # Funções auxiliares
 # ——————————————————————————————————————————————————————————————
 def parse_sns_envelope(body: str) -> dict:
-    o = json.loads(body)
+    """
+    Decodifica o corpo SQS. Com raw delivery o corpo já é o payload e é lido
+    uma vez só; com envelope SNS, o payload vem como string em "Message".
+    """
+    o = jsonlib.loads(body)
+    if SNS_RAW_DELIVERY == "true":
+        return o
     if isinstance(o, dict) and o.get("Type") == "Notification" and "Message" in o:
         try:
-            return json.loads(o["Message"])
-        except:
+            return jsonlib.loads(o["Message"])
+        except jsonlib.JSONDecodeError:
             return {"raw": o["Message"]}
     return o
 
 def normalize(payload: dict):
-    # id_evento
+    # id_evento; ts_evento e a partição (anomesdia/hh) são resolvidos por
+    # lote, de forma vetorizada, em ColumnarBatch.metadata()
     payload.setdefault("id_evento", str(uuid.uuid4()))
-    # ts_evento
-    ts = payload.get("ts_evento")
-    try:
-        dt = datetime.datetime.fromisoformat(ts.replace("Z","+00:00"))
-    except:
-        dt = datetime.datetime.utcnow()
-        payload["ts_evento"] = dt.isoformat()
-    # particionamento
-    payload["anomesdia"] = dt.strftime("%Y%m%d")
-    payload["hh"]        = dt.strftime("%H")
-
-def map_and_convert(raw: dict) -> dict:
-    out = {}
-    for json_key, col_name in FIELD_MAP.items():
-        if col_name is None:
-            continue
-        v = raw.get(json_key)
-        if v is None:
-            out[col_name] = None
-            continue
-        dtype = PARQUET_SCHEMA.field(col_name).type
-        # converte
-        if pa.types.is_int64(dtype):
-            try:    out[col_name] = int(v)
-            except: out[col_name] = None
-        elif pa.types.is_float64(dtype):
-            try:    out[col_name] = float(v)
-            except: out[col_name] = None
-        else:
-            out[col_name] = str(v)
-    # adiciona cols de partição (já em string)
-    out["anomesdia"] = raw.get("anomesdia")
-    out["hh"]        = raw.get("hh")
-    return out
-
-def write_parquet(records: list[dict]):
-    if not records:
-        return None
-    # monta colunas
-    data = {f.name: [] for f in PARQUET_SCHEMA}
-    for rec in records:
-        for f in PARQUET_SCHEMA:
-            data[f.name].append(rec.get(f.name))
-    table = pa.Table.from_pydict(data, schema=PARQUET_SCHEMA)
+
+def write_partition(d: str, h: str, table) -> str:
     buf = io.BytesIO()
-    pq.write_table(table, buf, compression="snappy")
-    buf.seek(0)
-    d = records[0]["anomesdia"]
-    h = records[0]["hh"]
+    profiles.write_table(table, buf, WRITE_PROFILE)
     key = f"{S3_PREFIX}/anomesdia={d}/hh={h}/lote-{uuid.uuid4()}.parquet"
     s3.put_object(Bucket=BUCKET, Key=key, Body=buf.getvalue())
-    return key, d, h
-
-def register_partition(d: str, h: str):
-    loc = f"s3://{BUCKET}/{S3_PREFIX}/anomesdia={d}/hh={h}/"
-    try:
-        glue.batch_create_partition(
-            DatabaseName=GLUE_DB,
-            TableName=GLUE_TABLE,
-            PartitionInputList=[{
-                "Values": [d, h],
-                "StorageDescriptor": {
-                  "Columns": [
-                    {"Name": f.name, "Type": str(f.type)} for f in PARQUET_SCHEMA
-                  ],
-                  "Location": loc,
-                  "InputFormat":  "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
-                  "OutputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
-                  "SerdeInfo": {
-                    "SerializationLibrary":"org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
-                  }
-                }
-            }]
-        )
-    except glue.exceptions.AlreadyExistsException:
-        pass
-    except Exception as e:
-        logger.error(f"Erro ao registrar partição {d}/{h}: {e}")
+    return key
+
+def write_parquet(batch: ColumnarBatch) -> list:
+    """
+    Grava um objeto Parquet por (anomesdia, hh) presente no lote.
+    Retorna [(key, anomesdia, hh), ...].
+    """
+    if not len(batch):
+        return []
+    groups = batch.partitions()
+    if len(groups) == 1:
+        (d, h), table = groups[0]
+        return [(write_partition(d, h, table), d, h)]
+    futures = [
+        (_write_pool.submit(write_partition, d, h, table), d, h)
+        for (d, h), table in groups
+    ]
+    return [(f.result(), d, h) for f, d, h in futures]
 
 # ——————————————————————————————————————————————————————————————
 # Handler
 # ——————————————————————————————————————————————————————————————
-def handler(event, context):
-    processed = []
-    failures  = []
-
-    for rec in event.get("Records", []):
+def convert_records(records: list, failures: list) -> ColumnarBatch:
+    rows, ids = [], []
+    for rec in records:
         mid = rec["messageId"]
         try:
             raw = parse_sns_envelope(rec["body"])
+            # id original: o normalize gera id_evento para quem não tem
+            i = event_id(raw)
             normalize(raw)
-            mapped = map_and_convert(raw)
-            processed.append(mapped)
+            rows.append(raw)
+            ids.append(i)
         except Exception as e:
             logger.warning(f"Falha ao processar mensagem {mid}: {e}")
             failures.append({ "itemIdentifier": mid })
 
-    result = write_parquet(processed)
-    if result and REGISTER_PARTITIONS:
-        _, d, h = result
-        register_partition(d, h)
+    # a deduplicação reserva os id_evento; só depois do parse/normalize, para
+    # que uma mensagem devolvida em batchItemFailures não fique reservada e
+    # seja descartada como duplicada no reenvio do SQS
+    batch = CONVERTER.new_batch()
+    for n in DEDUP.select_ids(ids):
+        batch.append(rows[n])
+    return batch
+
+def convert_shard(records: list) -> tuple:
+    """
+    Roda em um worker: parse + normalize + conversão de um shard.
+    Retorna (tabela em IPC, id_evento original por linha, messageIds com falha).
+    """
+    batch  = CONVERTER.new_batch()
+    ids    = []
+    failed = []
+    for rec in records:
+        mid = rec["messageId"]
+        try:
+            raw = parse_sns_envelope(rec["body"])
+            i = event_id(raw)
+            normalize(raw)
+            batch.append(raw)
+            ids.append(i)
+        except Exception as e:
+            logger.warning(f"Falha ao processar mensagem {mid}: {e}")
+            failed.append(mid)
+    return batch.to_ipc(), ids, failed
+
+# processos criados no cold start (fork), antes de qualquer thread do handler
+_parse_workers = ShardWorkers(PARSE_WORKERS, convert_shard) if PARSE_WORKERS > 1 else None
+
+def convert_parallel(records: list, failures: list, workers: ShardWorkers = None) -> ArrowBatch:
+    """
+    Divide as mensagens em um shard contíguo por worker e concatena as tabelas.
+    A deduplicação roda depois, sobre os id_evento originais de cada linha.
+    """
+    workers = workers or _parse_workers
+    size = -(-len(records) // len(workers))
+    shards = [records[i:i + size] for i in range(0, len(records), size)]
+
+    payloads, ids = [], []
+    for ipc, shard_ids, failed in workers.map(shards):
+        payloads.append(ipc)
+        ids += shard_ids
+        failures += [{ "itemIdentifier": mid } for mid in failed]
+
+    batch = ArrowBatch.from_ipc(payloads, PARQUET_SCHEMA)
+    keep = DEDUP.select_ids(ids)
+    if len(keep) < len(batch):
+        batch = batch.take(keep)
+    return batch
+
+def convert(records: list, failures: list):
+    if _parse_workers is not None and len(records) > 1:
+        return convert_parallel(records, failures)
+    return convert_records(records, failures)
+
+def stream_parquet(records: list, failures: list):
+    """
+    Modo streaming: só um pedaço de STREAM_CHUNK_RECORDS mensagens fica
+    convertido em memória por vez. Retorna (processadas, [(key, d, h), ...]).
+    """
+    stream = PartitionedParquetStream(
+        s3, BUCKET, S3_PREFIX, PARQUET_SCHEMA, WRITE_PROFILE,
+        part_size=S3_PART_SIZE_MB * 1024 * 1024,
+    )
+    try:
+        for i in range(0, len(records), STREAM_CHUNK_RECORDS):
+            stream.write(convert(records[i:i + STREAM_CHUNK_RECORDS], failures))
+        return stream.rows, stream.close()
+    except Exception:
+        stream.abort()
+        raise
+
+def handler(event, context):
+    records  = event.get("Records", [])
+    failures = []
+    DEDUP.reset_stats()
+
+    try:
+        if STREAM_CHUNK_RECORDS > 0:
+            processed, written = stream_parquet(records, failures)
+        else:
+            batch = convert(records, failures)
+            processed, written = len(batch), write_parquet(batch)
+    except Exception:
+        DEDUP.rollback()
+        raise
+    DEDUP.commit()
+
+    if written and REGISTER_PARTITIONS:
+        PARTITIONS.ensure((d, h) for _, d, h in written)
 
     logger.info({
-        "batch_received": len(event.get("Records", [])),
-        "processed":      len(processed),
+        "batch_received": len(records),
+        "processed":      processed,
+        "duplicates":     DEDUP.stats,
         "failures":       [f["itemIdentifier"] for f in failures],
-        "parquet":        result[0] if result else None
+        "parquet":        [key for key, _, _ in written],
+        "partitions":     PARTITIONS.stats(),
     })
 
     return { "batchItemFailures": failures }
@@ -27,6 +27,7 @@ locals {
   sqs_visibility_timeout       = 180       # ~2x timeout lambda
   batch_size                   = 300
   batching_window_seconds      = 300       # 5 min
+  sns_raw_message_delivery     = false     # ver bench_envelope.py
 }
 
 ############################
@@ -113,10 +114,30 @@ resource "aws_sns_topic_subscription" "sns_to_sqs" {
   topic_arn = aws_sns_topic.eventos.arn
   protocol  = "sqs"
   endpoint  = aws_sqs_queue.main.arn
+  raw_message_delivery = local.sns_raw_message_delivery
   # (Opcional) filter_policy se quiser filtrar tipos.
   # filter_policy = jsonencode({ eventType = ["pedido_criado"] })
 }
 
+############################
+# Deduplicação entre lotes (id_evento com TTL)
+############################
+resource "aws_dynamodb_table" "dedup" {
+  name         = "${local.name_prefix}-dedup"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "id_evento"
+
+  attribute {
+    name = "id_evento"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expira_em"
+    enabled        = true
+  }
+}
+
 ############################
 # Glue Database & Table
 ############################
@@ -201,6 +222,8 @@ data "aws_iam_policy_document" "lambda_policy" {
     actions = [
       "s3:PutObject",
       "s3:GetObject",
+      "s3:DeleteObject",   # compactação remove os lotes pequenos
+      "s3:AbortMultipartUpload",
       "s3:ListBucket"
     ]
     resources = [
@@ -209,9 +232,19 @@ data "aws_iam_policy_document" "lambda_policy" {
     ]
   }
 
+  statement {
+    actions = [
+      "dynamodb:PutItem",
+      "dynamodb:DeleteItem",
+      "dynamodb:BatchWriteItem"
+    ]
+    resources = [aws_dynamodb_table.dedup.arn]
+  }
+
   statement {
     actions = [
       "glue:GetTable",
+      "glue:GetPartitions",
       "glue:BatchCreatePartition"
     ]
     resources = ["*"]
@@ -262,6 +295,21 @@ resource "aws_lambda_function" "consumer" {
       GLUE_TABLE   = aws_glue_catalog_table.table.name
       S3_PREFIX    = local.s3_prefix
       REGISTER_PARTITIONS = "true"
+      WRITE_MAX_WORKERS   = "8"    # PUTs concorrentes por partição
+      PARQUET_PROFILE     = "lookup"  # ver profiles.py / bench_write_profiles.py
+      # > 0: converte/grava em pedaços (row groups) com multipart upload,
+      # memória limitada independente do batch_size
+      STREAM_CHUNK_RECORDS = "0"
+      S3_PART_SIZE_MB      = "8"
+      # processos de conversão (> 1 liga); com memory_size 512 só há 1 vCPU.
+      # ver bench_parallel.py antes de subir memória + workers
+      PARSE_WORKERS        = "0"
+      # "auto" continua aceitando mensagens com envelope durante a troca
+      SNS_RAW_DELIVERY    = local.sns_raw_message_delivery ? "true" : "auto"
+      # redeliveries do SQS / republicações no SNS
+      DEDUP_TABLE           = aws_dynamodb_table.dedup.name
+      DEDUP_TTL_HOURS       = "24"
+      DEDUP_PENDING_SECONDS = "180"  # >= timeout da Lambda
       # Para tuning:
       LOG_LEVEL    = "INFO"
     }
@@ -270,6 +318,49 @@ resource "aws_lambda_function" "consumer" {
   # layers = [aws_lambda_layer_version.pyarrow_layer.arn] # se usar layer
 }
 
+############################
+# Compactação horária dos lotes pequenos
+############################
+resource "aws_lambda_function" "compaction" {
+  function_name = "${local.name_prefix}-compaction"
+  runtime       = "python3.12"
+  handler       = "compaction.handler"
+  role          = aws_iam_role.lambda_role.arn
+  filename      = local.lambda_zip_path
+  source_code_hash = filebase64sha256(local.lambda_zip_path)
+  timeout       = 900
+  memory_size   = 1024
+
+  environment {
+    variables = {
+      BUCKET_DADOS = aws_s3_bucket.dados.bucket
+      S3_PREFIX    = local.s3_prefix
+      COMPACTION_TARGET_FILE_MB = "128"
+      COMPACTION_ROW_GROUP_MB   = "64"
+      COMPACTION_GRACE_MINUTES  = "15"
+      COMPACTION_PROFILE        = "archive"
+    }
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "compaction" {
+  name                = "${local.name_prefix}-compaction"
+  schedule_expression = "cron(20 * * * ? *)"   # após a hora fechar + carência
+}
+
+resource "aws_cloudwatch_event_target" "compaction" {
+  rule = aws_cloudwatch_event_rule.compaction.name
+  arn  = aws_lambda_function.compaction.arn
+}
+
+resource "aws_lambda_permission" "compaction_events" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.compaction.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.compaction.arn
+}
+
 ############################
 # Event Source Mapping SQS -> Lambda
 ############################
@@ -0,0 +1,107 @@
+# partitions.py
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# limite do glue.batch_create_partition por chamada
+GLUE_BATCH_LIMIT = 100
+
+PARQUET_STORAGE = {
+    "InputFormat":  "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+    "OutputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+    "SerdeInfo": {
+        "SerializationLibrary": "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+    },
+}
+
+
+class PartitionRegistry:
+    """
+    Cache, por processo, das partições (anomesdia, hh) que já existem no
+    Glue. Sobrevive entre invocações no container quente, então só a
+    primeira vez que um lote encosta em uma hora nova custa chamada ao Glue.
+
+    Cada dia é semeado preguiçosamente com um get_partitions na primeira
+    vez que aparece; partições novas vão em um único batch_create_partition
+    (em blocos de até 100).
+    """
+
+    def __init__(self, glue, database: str, table: str, location: str, schema_defs: list):
+        self._glue     = glue
+        self._database = database
+        self._table    = table
+        self._location = location.rstrip("/")
+        # colunas montadas uma vez, com os tipos Glue do próprio schema
+        self._columns  = [{"Name": c["Name"], "Type": c["Type"]} for c in schema_defs]
+        self._known    = set()
+        self._seeded   = set()
+        self.hits      = 0
+        self.misses    = 0
+
+    def _seed(self, d: str):
+        try:
+            pages = self._glue.get_paginator("get_partitions").paginate(
+                DatabaseName=self._database,
+                TableName=self._table,
+                Expression=f"anomesdia = '{d}'",
+            )
+            found = [tuple(p["Values"]) for page in pages for p in page.get("Partitions", [])]
+        except Exception as e:
+            # sem seed, a partição só cai como miss e vai para o batch_create;
+            # o dia continua não semeado e é tentado de novo no próximo lote
+            logger.warning(f"Falha ao carregar partições de {d} do Glue: {e}")
+            return
+        self._known.update(found)
+        self._seeded.add(d)
+
+    def _partition_input(self, d: str, h: str) -> dict:
+        return {
+            "Values": [d, h],
+            "StorageDescriptor": {
+                "Columns":  self._columns,
+                "Location": f"{self._location}/anomesdia={d}/hh={h}/",
+                **PARQUET_STORAGE,
+            },
+        }
+
+    def ensure(self, partitions) -> list:
+        """
+        Garante que as partições existem no Glue.
+        Retorna as partições que precisaram ser criadas.
+        """
+        pending = []
+        for d, h in sorted(set(partitions)):
+            if d not in self._seeded:
+                self._seed(d)
+            if (d, h) in self._known:
+                self.hits += 1
+            else:
+                self.misses += 1
+                pending.append((d, h))
+
+        for i in range(0, len(pending), GLUE_BATCH_LIMIT):
+            chunk = pending[i:i + GLUE_BATCH_LIMIT]
+            try:
+                resp = self._glue.batch_create_partition(
+                    DatabaseName=self._database,
+                    TableName=self._table,
+                    PartitionInputList=[self._partition_input(d, h) for d, h in chunk],
+                )
+            except Exception as e:
+                logger.error(f"Erro ao registrar partições {chunk}: {e}")
+                continue
+
+            failed = set()
+            for err in resp.get("Errors", []):
+                values = tuple(err.get("PartitionValues", []))
+                code = err.get("ErrorDetail", {}).get("ErrorCode")
+                if code != "AlreadyExistsException":
+                    failed.add(values)
+                    logger.error(f"Erro ao registrar partição {'/'.join(values)}: {err.get('ErrorDetail')}")
+            self._known.update(p for p in chunk if p not in failed)
+
+        return pending
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "known": len(self._known)}
@@ -0,0 +1,94 @@
+# profiles.py
+#
+# Perfis de escrita Parquet, escolhidos por PARQUET_PROFILE.
+# Colunas que não existem no schema são ignoradas.
+
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# colunas de código com poucos valores distintos: dicionário compensa
+_CODE_COLUMNS = [
+    "cod_tipo_pess", "txt_ano_mes_risc_bace", "cod_orig_risc_bace",
+    "cod_moda_cred_risc_bace", "cod_vncl_moed_esgr_risc_bace", "cod_prco_risc_bace",
+    "sistema", "codigo_retorno", "cliente", "origem_consulta",
+]
+
+WRITE_PROFILES = {
+    # comportamento anterior: snappy com os defaults do pyarrow
+    "legacy": {
+        "compression": "snappy",
+    },
+    # consultas pontuais por pessoa/documento: lote ordenado pelas chaves,
+    # row groups pequenos com estatísticas e page index para o Athena pular
+    "lookup": {
+        "sort_by":           ["cod_idef_pess", "num_cpf_cnpj"],
+        "dictionary":        _CODE_COLUMNS,
+        "compression":       "zstd",
+        "compression_level": 3,
+        "row_group_rows":    8_192,
+        "data_page_size":    256 * 1024,
+        "statistics":        True,
+        "page_index":        True,
+    },
+    # compactação/arquivo: mesmo layout, zstd mais forte e row groups maiores
+    "archive": {
+        "sort_by":           ["cod_idef_pess", "num_cpf_cnpj"],
+        "dictionary":        _CODE_COLUMNS,
+        "compression":       "zstd",
+        "compression_level": 9,
+        "row_group_rows":    131_072,
+        "data_page_size":    1024 * 1024,
+        "statistics":        True,
+        "page_index":        True,
+    },
+}
+
+PARQUET_PROFILE = os.environ.get("PARQUET_PROFILE", "legacy")
+
+
+def get_profile(name: str = None) -> dict:
+    name = name or PARQUET_PROFILE
+    if name not in WRITE_PROFILES:
+        raise ValueError(f"Perfil Parquet desconhecido: {name}")
+    return WRITE_PROFILES[name]
+
+
+def _present(columns: list, schema: pa.Schema) -> list:
+    return [c for c in columns if c in schema.names]
+
+
+def writer_options(profile: dict, schema: pa.Schema) -> dict:
+    """Argumentos comuns a pq.write_table e pq.ParquetWriter."""
+    opts = {"compression": profile.get("compression", "snappy")}
+    if "compression_level" in profile:
+        opts["compression_level"] = profile["compression_level"]
+    if "dictionary" in profile:
+        opts["use_dictionary"] = _present(profile["dictionary"], schema)
+    if "data_page_size" in profile:
+        opts["data_page_size"] = profile["data_page_size"]
+    if "statistics" in profile:
+        opts["write_statistics"] = profile["statistics"]
+    if profile.get("page_index"):
+        opts["write_page_index"] = True
+    sort_by = _present(profile.get("sort_by", []), schema)
+    if sort_by:
+        opts["sorting_columns"] = [pq.SortingColumn(schema.get_field_index(c)) for c in sort_by]
+    return opts
+
+
+def sort_table(table: pa.Table, profile: dict) -> pa.Table:
+    sort_by = _present(profile.get("sort_by", []), table.schema)
+    if not sort_by:
+        return table
+    return table.sort_by([(c, "ascending") for c in sort_by])
+
+
+def write_table(table: pa.Table, where, profile: dict):
+    """Grava a tabela inteira segundo o perfil (ordenação + opções do writer)."""
+    pq.write_table(
+        sort_table(table, profile), where,
+        row_group_size=profile.get("row_group_rows"),
+        **writer_options(profile, table.schema),
+    )
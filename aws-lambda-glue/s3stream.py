@@ -0,0 +1,141 @@
+# s3stream.py
+#
+# Escrita Parquet em streaming para o S3: cada pedaço do lote vira um row
+# group em um pq.ParquetWriter por partição, e os bytes saem em partes de
+# multipart upload assim que enchem. O pico de memória fica em ~uma parte
+# por partição aberta, independente do tamanho do lote.
+
+import io
+import uuid
+import logging
+
+import pyarrow.parquet as pq
+
+import profiles
+
+logger = logging.getLogger(__name__)
+
+# mínimo do S3 para partes que não são a última
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Arquivo só-escrita que envia o conteúdo como multipart upload.
+    O upload só é criado quando a primeira parte enche; objetos menores
+    que uma parte saem em um put_object simples no close().
+    """
+
+    def __init__(self, s3, bucket: str, key: str, part_size: int = MIN_PART_SIZE):
+        super().__init__()
+        self._s3        = s3
+        self._bucket    = bucket
+        self.key        = key
+        self._part_size = max(part_size, MIN_PART_SIZE)
+        self._buf       = bytearray()
+        self._parts     = []
+        self._upload_id = None
+        self._written   = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._written
+
+    def write(self, data) -> int:
+        self._buf += data
+        self._written += len(data)
+        while len(self._buf) >= self._part_size:
+            chunk = bytes(self._buf[:self._part_size])
+            del self._buf[:self._part_size]
+            self._upload_part(chunk)
+        return len(data)
+
+    def _upload_part(self, chunk: bytes):
+        if self._upload_id is None:
+            resp = self._s3.create_multipart_upload(Bucket=self._bucket, Key=self.key)
+            self._upload_id = resp["UploadId"]
+        number = len(self._parts) + 1
+        resp = self._s3.upload_part(
+            Bucket=self._bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=number, Body=chunk,
+        )
+        self._parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+
+    def close(self):
+        if self.closed:
+            return
+        if self._upload_id is None:
+            self._s3.put_object(Bucket=self._bucket, Key=self.key, Body=bytes(self._buf))
+        else:
+            if self._buf:
+                self._upload_part(bytes(self._buf))
+            self._s3.complete_multipart_upload(
+                Bucket=self._bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        self._buf = bytearray()
+        super().close()
+
+    def abort(self):
+        if self._upload_id is not None:
+            try:
+                self._s3.abort_multipart_upload(Bucket=self._bucket, Key=self.key, UploadId=self._upload_id)
+            except Exception as e:
+                logger.error(f"Falha ao abortar multipart de {self.key}: {e}")
+        self._buf = bytearray()
+        super().close()
+
+
+class PartitionedParquetStream:
+    """
+    Um ParquetWriter + S3MultipartWriter por (anomesdia, hh), abertos sob
+    demanda conforme os pedaços do lote chegam.
+    """
+
+    def __init__(self, s3, bucket: str, prefix: str, schema, profile: dict,
+                 part_size: int = MIN_PART_SIZE):
+        self._s3        = s3
+        self._bucket    = bucket
+        self._prefix    = prefix
+        self._schema    = schema
+        self._profile   = profile
+        self._part_size = part_size
+        self._open      = {}
+        self.rows       = 0
+
+    def write(self, batch):
+        """Grava um pedaço (ColumnarBatch) como row group(s) em cada partição."""
+        if not len(batch):
+            return
+        for (d, h), table in batch.partitions():
+            if (d, h) not in self._open:
+                key = f"{self._prefix}/anomesdia={d}/hh={h}/lote-{uuid.uuid4()}.parquet"
+                sink = S3MultipartWriter(self._s3, self._bucket, key, self._part_size)
+                writer = pq.ParquetWriter(sink, self._schema,
+                                          **profiles.writer_options(self._profile, self._schema))
+                self._open[(d, h)] = (writer, sink)
+            writer, _ = self._open[(d, h)]
+            writer.write_table(profiles.sort_table(table, self._profile),
+                               row_group_size=self._profile.get("row_group_rows"))
+            self.rows += table.num_rows
+
+    def close(self) -> list:
+        """Fecha os arquivos e conclui os uploads. Retorna [(key, anomesdia, hh), ...]."""
+        written = []
+        for (d, h), (writer, sink) in self._open.items():
+            writer.close()
+            sink.close()
+            written.append((sink.key, d, h))
+        self._open = {}
+        return written
+
+    def abort(self):
+        for writer, sink in self._open.values():
+            try:
+                writer.close()
+            except Exception:
+                pass
+            sink.abort()
+        self._open = {}
@@ -0,0 +1,103 @@
+# schema.py
+
+import os
+import json
+
+import pyarrow as pa
+
+# ——————————————————————————————————————————————————————————————
+# Carrega o schema do Glue (lista de {"Name":..., "Type":...})
+# ——————————————————————————————————————————————————————————————
+GLUE_SCHEMA_PATH = os.environ.get("GLUE_SCHEMA_PATH", "glue_schema.json")
+
+with open(GLUE_SCHEMA_PATH, "r") as f:
+    SCHEMA_DEFS = json.load(f)
+
+# Map Glue types para PyArrow DataType
+_TYPE_MAP = {
+    "string":    pa.string(),
+    "double":    pa.float64(),
+    "int":       pa.int64(),
+    "timestamp": pa.timestamp("ms"),
+}
+
+# Constrói o pa.Schema
+_fields = []
+for col in SCHEMA_DEFS:
+    dtype = _TYPE_MAP.get(col["Type"])
+    if dtype is None:
+        raise ValueError(f"Tipo desconhecido no schema: {col['Type']}")
+    _fields.append(pa.field(col["Name"], dtype))
+PARQUET_SCHEMA = pa.schema(_fields)
+
+# ——————————————————————————————————————————————————————————————
+# Mapeamento de nomes JSON → nomes do schema Glue
+# (quando diferente; se iguais, bastaria usar identity)
+# ——————————————————————————————————————————————————————————————
+FIELD_MAP = {
+    "codigo_identificacao_pessoa":        "cod_idef_pess",
+    "codigo_tipo_pessoa":                 "cod_tipo_pess",
+    "documento_pessoa":                   "num_cpf_cnpj",
+    "ano_mes_referencia":                 "txt_ano_mes_risc_bace",
+    "origem_risco":                       "cod_orig_risc_bace",
+    "modalidade_risco":                   "cod_moda_cred_risc_bace",
+    "codigo_itau":                        None,  # não persiste
+    "data_atualizacao_risco":             None,  # não persiste
+    "hora_consulta_bacen":                "dat_hor_cslt_risc_bace",
+    "codigo_tipo_consulta":               None,
+    "codigo_tipo_envio":                  None,
+    "codigo_tipo_retorno":                None,
+    "codigo_tipo_autorizacao_cliente":    None,
+    "codigo_tipo_publico_pesquisa":       None,
+    "percentual_remessa_instituicao":     "pct_docm_prcs_risc_bace",
+    "data_inicio_relacionamento":         "dat_inio_rlmt_clie_risc_bace",
+    "vinculo_moeda_estrangeira":          "cod_vncl_moed_esgr_risc_bace",
+    "quantidade_instituicao_financeira_risco": "qtd_inst_finn_risc_bace",
+    "quantidade_operacao_financeira_cliente":  "qtd_totl_oper_finn_rspl_risc",
+    "quantidade_operacao_judice_cliente":      "qtd_oper_judc_risc_bace",
+    "valor_operacao_judice":              "vlr_oper_judc_resp_totl_risc",
+    "quantidade_operacao_discordancia":   "qtd_oper_dsco_risc_bace",
+    "valor_operacao_discordancia":        "vlr_resp_totl_dsco_risc_bace",
+    # buckets “vencer”
+    "valor_vencer_30":                    "vlr_cred_vncr_30_dia_risc",
+    "valor_vencer_60":                    "vlr_cred_vncr_60_dia_risc",
+    "valor_vencer_90":                    "vlr_cred_vncr_90_dia_risc",
+    "valor_vencer_180":                   "vlr_cred_vncr_180_dia_risc",
+    "valor_vencer_360":                   "vlr_cred_vncr_360_dia_risc",
+    "valor_vencer_540":                   "vlr_cred_vncr_5400_dia_risc",
+    "valor_vencer_acima_540":             "vlr_cred_vncr_prz_indm_risc",
+    "valor_total_vencer":                 "vlr_totl_cred_vncr_risc",
+    # buckets “vencido”
+    "valor_vencido_14":                   "vlr_cred_vncd_14_dia_risc",
+    "valor_vencido_30":                   "vlr_cred_vncd_30_dia_risc",
+    "valor_vencido_60":                   "vlr_cred_vncd_60_dia_risc",
+    "valor_vencido_90":                   "vlr_cred_vncd_90_dia_risc",
+    "valor_vencido_120":                  "vlr_cred_vncd_120_dia_risc",
+    "valor_vencido_180":                  "vlr_cred_vncd_180_dia_risc",
+    "valor_vencido_240":                  "vlr_cred_vncd_240_dia_risc",
+    "valor_vencido_300":                  "vlr_cred_vncd_300_dia_risc",
+    "valor_vencido_360":                  "vlr_cred_vncd_360_dia_risc",
+    "valor_vencido_540":                  "vlr_cred_vncd_540_dia_risc",
+    "valor_vencido_acima_540":            "vlr_cred_vncd_acim_540_dia",
+    "valor_total_vencido":                "vlr_totl_cred_vncd_risc",
+    # crédito liberado / vencimento
+    "valor_credito_liberar_ate360":       "vlr_cred_lbra_limi_360_dia",
+    "valor_credito_liberar_mais360":      "vlr_cred_lbra_acim_360_dia",
+    "valor_credito_liberar_total":        "vlr_totl_cred_lbra_dia_risc",
+    "valor_credito_vencimento_ate360":    "vlr_cred_vcto_limi_360_dia",
+    "valor_credito_vencimento_mais360":   "vlr_cred_vcto_acim_360_dia",
+    "valor_credito_vencimento_total":     "vlr_totl_limi_cred_dia_risc",
+    # prejuízo
+    "valor_credito_prejuizo_ate12_cliente":"vlr_cred_prej_12_mes_risc",
+    "valor_credito_prejuizo_12_48":       "vlr_cred_prej_48_mes_risc",
+    "valor_credito_prejuizo_mais12_cliente":"vlr_prej_acim_12_mes_risc",
+    "valor_credito_prejuizo_total":       "vlr_totl_cred_prej_risc",
+    # flags/índices
+    "percentual_informacao_bacen":        "pct_volu_prcs_risc_bace",
+    # metadados finais
+    "codigo_operacao":                    "cod_prco_risc_bace",
+    "sistema":                            "sistema",
+    "codigo_retorno":                     "codigo_retorno",
+    "cliente":                            "cliente",
+    "origem_consulta":                    "origem_consulta",
+}
@@ -0,0 +1,111 @@
+import datetime
+import unittest
+
+import pyarrow as pa
+
+from columnar import ArrowBatch, ColumnarConverter, cast_column, parse_timestamps
+from schema import FIELD_MAP, PARQUET_SCHEMA
+
+
+class TestCastColumn(unittest.TestCase):
+    def test_typed_batch_converts_directly(self):
+        self.assertEqual(cast_column([1, None, 3], pa.int64()).to_pylist(), [1, None, 3])
+        self.assertEqual(cast_column([1.5, 2], pa.float64()).to_pylist(), [1.5, 2.0])
+
+    def test_fractional_numbers_truncate_in_int_columns(self):
+        # mesmo resultado do int(v) por valor do handler anterior
+        self.assertEqual(cast_column([1.5, -2.7, 3], pa.int64()).to_pylist(), [1, -2, 3])
+        self.assertEqual(cast_column([1.9, "4", None], pa.int64()).to_pylist(), [1, 4, None])
+
+    def test_invalid_text_becomes_null(self):
+        self.assertEqual(cast_column(["12", " 7 ", "1.5", "abc"], pa.int64()).to_pylist(), [12, 7, None, None])
+        self.assertEqual(cast_column(["1.25", "x", 2], pa.float64()).to_pylist(), [1.25, None, 2.0])
+
+    def test_strings_keep_the_text(self):
+        self.assertEqual(cast_column(["a", 1, None], pa.string()).to_pylist(), ["a", "1", None])
+
+
+def utc(*args):
+    return datetime.datetime(*args, tzinfo=datetime.timezone.utc)
+
+
+class TestParseTimestamps(unittest.TestCase):
+    def test_formats(self):
+        values = ["2025-01-15T10:00:00Z", "2025-01-15 10:00:00.123456789", "2025-01-15",
+                  "2025-01-15T10:00:00+0000", " 2025-01-15T10:00 "]
+        self.assertEqual(parse_timestamps(values).to_pylist(), [
+            utc(2025, 1, 15, 10), utc(2025, 1, 15, 10, 0, 0, 123000), utc(2025, 1, 15),
+            utc(2025, 1, 15, 10), utc(2025, 1, 15, 10),
+        ])
+
+    def test_invalid_values_become_null(self):
+        self.assertEqual(parse_timestamps(["ontem", None, "2025-13-01T00:00:00", 1736935200]).to_pylist(),
+                         [None, None, None, None])
+
+    def test_offsets_are_converted_to_utc(self):
+        self.assertEqual(parse_timestamps(["2025-01-15T22:30:00-03:00"]).to_pylist(), [utc(2025, 1, 16, 1, 30)])
+
+    def test_partition_comes_from_the_utc_instant(self):
+        # o handler antigo usava a hora local do offset (20250115/22); agora a
+        # partição segue o instante em UTC, como ts_evento gravado
+        batch = ColumnarConverter(FIELD_MAP, PARQUET_SCHEMA).new_batch()
+        batch.append({"id_evento": "e1", "ts_evento": "2025-01-15T22:30:00-03:00"})
+        batch.append({"id_evento": "e2", "ts_evento": "2025-01-15T23:59:59"})
+        meta = batch.metadata()
+        self.assertEqual(list(zip(meta["anomesdia"].to_pylist(), meta["hh"].to_pylist())),
+                         [("20250116", "01"), ("20250115", "23")])
+
+    def test_missing_timestamp_uses_the_batch_time(self):
+        batch = ColumnarConverter(FIELD_MAP, PARQUET_SCHEMA).new_batch()
+        before = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        batch.append({"id_evento": "e1", "ts_evento": "invalido"})
+        (ts,) = batch.metadata()["ts_evento"].to_pylist()
+        self.assertGreaterEqual(ts, before)
+
+
+class TestColumnarBatch(unittest.TestCase):
+    def test_table_follows_the_schema(self):
+        batch = ColumnarConverter(FIELD_MAP, PARQUET_SCHEMA).new_batch()
+        batch.append({"quantidade_instituicao_financeira_risco": 2.0, "documento_pessoa": "123",
+                      "id_evento": "e1", "ts_evento": "2025-01-15T10:00:00Z"})
+        batch.append({"quantidade_instituicao_financeira_risco": "3", "id_evento": "e2"})
+        table = batch.to_table()
+        self.assertEqual(table.schema, PARQUET_SCHEMA)
+        self.assertEqual(table.column("qtd_inst_finn_risc_bace").to_pylist(), [2, 3])
+        self.assertEqual(table.column("num_cpf_cnpj").to_pylist(), ["123", None])
+
+
+class TestPartitions(unittest.TestCase):
+    def setUp(self):
+        self.batch = ColumnarConverter(FIELD_MAP, PARQUET_SCHEMA).new_batch()
+        for n, ts in enumerate(["2025-01-15T10:05:00Z", "2025-01-15T11:00:00Z",
+                                "2025-01-15T10:59:59Z", "2025-01-16T10:00:00Z"]):
+            self.batch.append({"documento_pessoa": str(n), "id_evento": f"e{n}", "ts_evento": ts})
+
+    def docs(self, parts):
+        return [(key, table.column("num_cpf_cnpj").to_pylist()) for key, table in parts]
+
+    def test_one_table_per_day_and_hour(self):
+        self.assertEqual(self.docs(self.batch.partitions()), [
+            (("20250115", "10"), ["0", "2"]),
+            (("20250115", "11"), ["1"]),
+            (("20250116", "10"), ["3"]),
+        ])
+
+    def test_single_partition_is_not_filtered(self):
+        batch = ColumnarConverter(FIELD_MAP, PARQUET_SCHEMA).new_batch()
+        batch.append({"id_evento": "e1", "ts_evento": "2025-01-15T10:00:00Z"})
+        (key, table), = batch.partitions()
+        self.assertEqual((key, table.num_rows), (("20250115", "10"), 1))
+
+    def test_arrow_batch_from_workers_splits_the_same_way(self):
+        batch = ArrowBatch.from_ipc([self.batch.to_ipc()], PARQUET_SCHEMA).take([3, 1, 0])
+        self.assertEqual(self.docs(batch.partitions()), [
+            (("20250115", "10"), ["0"]),
+            (("20250115", "11"), ["1"]),
+            (("20250116", "10"), ["3"]),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
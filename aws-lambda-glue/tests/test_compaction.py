@@ -0,0 +1,99 @@
+import os
+import datetime
+import tempfile
+import unittest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import compaction
+from compaction import LocalStorage, compact
+from schema import PARQUET_SCHEMA
+
+PREFIX = "bronze/eventos"
+PART = f"{PREFIX}/anomesdia=20250115/hh=10"
+NOW = datetime.datetime(2025, 2, 1)
+
+
+class Crash(Exception):
+    pass
+
+
+class TestCompaction(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.storage = LocalStorage(self.tmp.name)
+        os.makedirs(os.path.join(self.tmp.name, PART))
+        for n in range(3):
+            ids = [f"e{n}-{i}" for i in range(5)]
+            table = pa.table({f.name: pa.nulls(5, f.type) for f in PARQUET_SCHEMA}, schema=PARQUET_SCHEMA)
+            table = table.set_column(PARQUET_SCHEMA.get_field_index("num_cpf_cnpj"), "num_cpf_cnpj",
+                                     pa.array(ids))
+            pq.write_table(table, os.path.join(self.tmp.name, PART, f"lote-{n}.parquet"))
+        self.expected = sorted(f"e{n}-{i}" for n in range(3) for i in range(5))
+
+    def files(self):
+        return sorted(os.path.basename(k) for k, _ in self.storage.list(PART + "/"))
+
+    def visible_rows(self):
+        """Linhas que o Athena enxerga: arquivos sem "_" no início."""
+        rows = []
+        for key, _ in self.storage.list(PART + "/"):
+            if not os.path.basename(key).startswith("_"):
+                with self.storage.open_input(key) as f:
+                    rows += pq.read_table(f, columns=["num_cpf_cnpj"]).column(0).to_pylist()
+        return sorted(rows)
+
+    def crash_on(self, method, call=1):
+        """Faz a `call`-ésima chamada de storage.<method> falhar, simulando a queda da execução."""
+        original = getattr(self.storage, method)
+        calls = []
+
+        def failing(*args):
+            calls.append(args)
+            if len(calls) == call:
+                raise Crash(method)
+            return original(*args)
+        setattr(self.storage, method, failing)
+        return lambda: setattr(self.storage, method, original)
+
+    def test_merges_the_inputs(self):
+        result = compact(self.storage, PREFIX, NOW)
+        self.assertEqual((result["files_before"], result["files_after"]), (3, 1))
+        (name,) = self.files()
+        self.assertTrue(name.startswith("compactado-"))
+        self.assertEqual(self.visible_rows(), self.expected)
+
+    def test_crash_after_upload_keeps_only_the_inputs_visible(self):
+        # segunda write_text = commit do manifesto; as saídas já foram enviadas
+        restore = self.crash_on("write_text", call=2)
+        with self.assertRaises(Crash):
+            compact(self.storage, PREFIX, NOW)
+        restore()
+        self.assertIn(compaction.MANIFEST_NAME, self.files())
+        self.assertTrue(any(f.startswith("_compactado-") for f in self.files()))
+        self.assertEqual(self.visible_rows(), self.expected)
+
+        compact(self.storage, PREFIX, NOW)
+        (name,) = self.files()
+        self.assertTrue(name.startswith("compactado-"))
+        self.assertEqual(self.visible_rows(), self.expected)
+
+    def test_crash_after_commit_is_finished_on_the_next_run(self):
+        restore = self.crash_on("delete", call=1)
+        with self.assertRaises(Crash):
+            compact(self.storage, PREFIX, NOW)
+        restore()
+        compact(self.storage, PREFIX, NOW)
+        (name,) = self.files()
+        self.assertTrue(name.startswith("compactado-"))
+        self.assertEqual(self.visible_rows(), self.expected)
+
+    def test_open_hour_is_left_alone(self):
+        self.assertEqual(compact(self.storage, PREFIX, datetime.datetime(2025, 1, 15, 11, 5))["partitions"], [])
+        self.assertEqual(len(self.files()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
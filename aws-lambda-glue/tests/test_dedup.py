@@ -0,0 +1,92 @@
+import time
+import unittest
+
+import boto3
+from moto import mock_aws
+
+from dedup import Deduplicator, DynamoIdempotencyStore, MemoryIdempotencyStore
+
+
+class TestDeduplicator(unittest.TestCase):
+    def test_duplicates_within_the_batch(self):
+        dedup = Deduplicator()
+        self.assertEqual(dedup.select_ids(["a", "a", None, "b", None]), [0, 2, 3, 4])
+        self.assertEqual(dedup.stats["no_lote"], 1)
+
+    def test_committed_ids_are_dropped_by_the_lru(self):
+        dedup = Deduplicator(lru_size=1)
+        dedup.select_ids(["a", "b"])
+        dedup.commit()
+        self.assertEqual(dedup.select_ids(["a", "b"]), [0])
+        self.assertEqual(dedup.stats["lru"], 1)
+
+    def test_rolled_back_ids_are_not_remembered(self):
+        dedup = Deduplicator()
+        dedup.select_ids(["a"])
+        dedup.rollback()
+        self.assertEqual(dedup.select_ids(["a"]), [0])
+
+    def test_duplicates_across_batches_go_through_the_store(self):
+        store = MemoryIdempotencyStore()
+        first, second = Deduplicator(store), Deduplicator(store)
+        self.assertEqual(first.select_ids(["a", "b"]), [0, 1])
+        # reserva pendente já barra outra invocação
+        self.assertEqual(second.select_ids(["b", "c"]), [1])
+        self.assertEqual(second.stats["entre_lotes"], 1)
+        first.commit()
+        self.assertEqual(second.select_ids(["a"]), [])
+
+    def test_rollback_releases_the_claims(self):
+        store = MemoryIdempotencyStore()
+        first, second = Deduplicator(store), Deduplicator(store)
+        first.select_ids(["a"])
+        first.rollback()
+        self.assertEqual(second.select_ids(["a"]), [0])
+
+    def test_expired_pending_claim_can_be_taken_again(self):
+        store = MemoryIdempotencyStore()
+        Deduplicator(store, pending_seconds=-1).select_ids(["a"])
+        self.assertEqual(Deduplicator(store).select_ids(["a"]), [0])
+
+
+@mock_aws
+class TestDynamoIdempotencyStore(unittest.TestCase):
+    def setUp(self):
+        self.client = boto3.client("dynamodb")
+        self.client.create_table(
+            TableName="dedup",
+            KeySchema=[{"AttributeName": "id_evento", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id_evento", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        self.store = DynamoIdempotencyStore(self.client, "dedup")
+
+    def status(self, i):
+        item = self.client.get_item(TableName="dedup", Key={"id_evento": {"S": i}}).get("Item")
+        return item and item["status"]["S"]
+
+    def test_claim_skips_taken_ids(self):
+        later = int(time.time()) + 60
+        self.assertEqual(self.store.claim(["a", "b"], later), ["a", "b"])
+        self.assertEqual(self.store.claim(["b", "c"], later), ["c"])
+        self.assertEqual(self.status("b"), "pendente")
+
+    def test_expired_items_can_be_claimed(self):
+        self.store.claim(["a"], int(time.time()) - 10)
+        self.assertEqual(self.store.claim(["a"], int(time.time()) + 60), ["a"])
+
+    def test_confirm_and_release(self):
+        later = int(time.time()) + 60
+        self.store.claim(["a", "b"], later)
+        self.store.confirm(["a"], later + 3600)
+        self.store.release(["b"])
+        self.assertEqual((self.status("a"), self.status("b")), ("gravado", None))
+
+    def test_more_ids_than_one_transaction(self):
+        ids = [f"e{n}" for n in range(130)]
+        self.store.claim(ids[:10], int(time.time()) + 60)
+        self.assertEqual(self.store.claim(ids, int(time.time()) + 60), ids[10:])
+
+
+if __name__ == "__main__":
+    unittest.main()
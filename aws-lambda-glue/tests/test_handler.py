@@ -0,0 +1,116 @@
+import os
+import json
+import importlib.util
+import unittest
+
+from dedup import Deduplicator, MemoryIdempotencyStore
+from workers import ShardWorkers
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_handler():
+    """lambda.py (no deploy vira app.py; 'lambda' não é importável)."""
+    spec = importlib.util.spec_from_file_location("app", os.path.join(HERE, "lambda.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+app = load_handler()
+
+
+def record(mid, payload):
+    return {"messageId": mid, "body": json.dumps({"Type": "Notification", "Message": json.dumps(payload)})}
+
+
+class TestConvertRecords(unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryIdempotencyStore()
+        app.DEDUP = Deduplicator(self.store)
+        self.normalize = app.normalize
+        self.addCleanup(setattr, app, "normalize", self.normalize)
+
+    def test_duplicates_and_bad_messages(self):
+        failures = []
+        records = [record("m1", {"id_evento": "e1"}), record("m2", {"id_evento": "e1"}),
+                   {"messageId": "m3", "body": "{quebrado"}, record("m4", {"documento_pessoa": "1"})]
+        batch = app.convert_records(records, failures)
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(failures, [{"itemIdentifier": "m3"}])
+        self.assertEqual(app.DEDUP.stats["no_lote"], 1)
+
+    def test_failed_message_is_not_claimed(self):
+        def failing(raw):
+            if raw.get("id_evento") == "e2":
+                raise ValueError("payload inválido")
+            self.normalize(raw)
+        app.normalize = failing
+        failures = []
+        batch = app.convert_records([record("m1", {"id_evento": "e1"}), record("m2", {"id_evento": "e2"})], failures)
+        self.assertEqual((len(batch), failures), (1, [{"itemIdentifier": "m2"}]))
+        app.DEDUP.commit()
+
+        # reenvio do SQS da mensagem que falhou: passa, não é duplicada
+        app.normalize = self.normalize
+        redelivered = app.convert_records([record("m2", {"id_evento": "e2"})], [])
+        self.assertEqual(len(redelivered), 1)
+
+
+class RecordingStream:
+    """Troca o PartitionedParquetStream: guarda os documentos de cada chunk."""
+
+    def __init__(self, *args, **kwargs):
+        self.chunks = []
+        self.rows = 0
+        RecordingStream.last = self
+
+    def write(self, batch):
+        self.chunks.append(batch.to_table().column("num_cpf_cnpj").to_pylist())
+        self.rows += len(batch)
+
+    def close(self):
+        return []
+
+    def abort(self):
+        pass
+
+
+class TestStreamParquet(unittest.TestCase):
+    def test_repeated_id_in_a_later_chunk_is_dropped(self):
+        for name, value in [("DEDUP", Deduplicator()), ("STREAM_CHUNK_RECORDS", 2),
+                            ("PartitionedParquetStream", RecordingStream)]:
+            self.addCleanup(setattr, app, name, getattr(app, name))
+            setattr(app, name, value)
+        records = [record(f"m{n}", {"id_evento": f"e{n % 3}", "documento_pessoa": str(n)}) for n in range(5)]
+
+        rows, _ = app.stream_parquet(records, [])
+
+        self.assertEqual(rows, 3)
+        self.assertEqual(RecordingStream.last.chunks, [["0", "1"], ["2"], []])
+        self.assertEqual(app.DEDUP.stats["no_lote"], 2)
+
+
+class TestConvertParallel(unittest.TestCase):
+    def test_same_rows_as_the_serial_path(self):
+        records = [record(f"m{n}", {"id_evento": f"e{n % 5}", "documento_pessoa": str(n),
+                                    "ts_evento": f"2025-01-15T{10 + n % 2}:00:00Z"}) for n in range(9)]
+        records.insert(4, {"messageId": "ruim", "body": "{quebrado"})
+        workers = ShardWorkers(3, app.convert_shard)
+        self.addCleanup(workers.close)
+
+        app.DEDUP = Deduplicator()
+        serial_failures, parallel_failures = [], []
+        serial = app.convert_records(records, serial_failures).partitions()
+        app.DEDUP = Deduplicator()
+        parallel = app.convert_parallel(records, parallel_failures, workers=workers).partitions()
+
+        def docs(parts):
+            return [(key, table.column("num_cpf_cnpj").to_pylist()) for key, table in parts]
+        self.assertEqual(docs(parallel), docs(serial))
+        self.assertEqual(parallel_failures, serial_failures)
+        self.assertEqual(sum(t.num_rows for _, t in parallel), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
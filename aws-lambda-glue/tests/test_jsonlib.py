@@ -0,0 +1,29 @@
+import unittest
+
+import jsonlib
+
+
+class TestJsonlib(unittest.TestCase):
+    def tearDown(self):
+        jsonlib.use("orjson")
+
+    def test_backends_decode_the_same(self):
+        body = '{"id_evento": "e1", "valor": 1.5, "itens": [1, null]}'
+        for name in ("json", "orjson"):
+            self.assertEqual(jsonlib.use(name), name)
+            self.assertEqual(jsonlib.loads(body), {"id_evento": "e1", "valor": 1.5, "itens": [1, None]})
+
+    def test_decode_errors_are_value_errors(self):
+        for name in ("json", "orjson"):
+            jsonlib.use(name)
+            with self.assertRaises(ValueError):
+                jsonlib.loads("{not json")
+            self.assertTrue(issubclass(jsonlib.JSONDecodeError, ValueError))
+
+    def test_unknown_backend_lists_the_accepted_ones(self):
+        with self.assertRaisesRegex(ValueError, "json, orjson"):
+            jsonlib.use("simdjson")
+
+
+if __name__ == "__main__":
+    unittest.main()
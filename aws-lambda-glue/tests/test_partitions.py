@@ -0,0 +1,80 @@
+import unittest
+
+from partitions import PartitionRegistry
+
+
+class FakeGlue:
+    """get_partitions por dia (ou erro em `fail_seeds` chamadas) e batch_create_partition gravado."""
+
+    def __init__(self, existing=(), fail_seeds=0):
+        self.existing = set(existing)
+        self.fail_seeds = fail_seeds
+        self.seeds = []
+        self.created = []
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, DatabaseName, TableName, Expression):
+        self.seeds.append(Expression)
+        if self.fail_seeds:
+            self.fail_seeds -= 1
+            raise RuntimeError("ThrottlingException")
+        day = Expression.split("'")[1]
+        return iter([{"Partitions": [{"Values": list(p)} for p in sorted(self.existing) if p[0] == day]}])
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        values = [tuple(p["Values"]) for p in PartitionInputList]
+        self.created.append(values)
+        errors = [{"PartitionValues": list(v), "ErrorDetail": {"ErrorCode": "AlreadyExistsException"}}
+                  for v in values if v in self.existing]
+        self.existing.update(values)
+        return {"Errors": errors}
+
+
+def registry(glue):
+    return PartitionRegistry(glue, "db", "eventos", "s3://bucket/bronze/eventos/",
+                             [{"Name": "id_evento", "Type": "string"}])
+
+
+class TestPartitionRegistry(unittest.TestCase):
+    def test_seeds_each_day_once_and_creates_only_new_hours(self):
+        glue = FakeGlue(existing={("20250115", "10")})
+        reg = registry(glue)
+        self.assertEqual(reg.ensure([("20250115", "10"), ("20250115", "11"), ("20250115", "11")]),
+                         [("20250115", "11")])
+        self.assertEqual(reg.ensure([("20250115", "10"), ("20250115", "11")]), [])
+        self.assertEqual(glue.seeds, ["anomesdia = '20250115'"])
+        self.assertEqual(glue.created, [[("20250115", "11")]])
+        self.assertEqual(reg.stats(), {"hits": 3, "misses": 1, "known": 2})
+
+    def test_partition_input_points_at_the_hour_prefix(self):
+        glue = FakeGlue()
+        reg = registry(glue)
+        captured = []
+        glue.batch_create_partition = lambda **kw: captured.extend(kw["PartitionInputList"]) or {}
+        reg.ensure([("20250115", "10")])
+        self.assertEqual(captured[0]["StorageDescriptor"]["Location"],
+                         "s3://bucket/bronze/eventos/anomesdia=20250115/hh=10/")
+
+    def test_failed_seed_is_retried_on_the_next_batch(self):
+        glue = FakeGlue(existing={("20250115", "10"), ("20250115", "11")}, fail_seeds=1)
+        reg = registry(glue)
+        # sem seed a hora vai para o batch_create, que responde AlreadyExists
+        self.assertEqual(reg.ensure([("20250115", "10")]), [("20250115", "10")])
+        self.assertEqual(reg.ensure([("20250115", "11")]), [])
+        self.assertEqual(len(glue.seeds), 2)
+        self.assertEqual(reg.ensure([("20250115", "11")]), [])
+        self.assertEqual(len(glue.seeds), 2)
+
+    def test_failed_create_is_not_cached(self):
+        glue = FakeGlue()
+        reg = registry(glue)
+        glue.batch_create_partition = lambda **kw: {"Errors": [
+            {"PartitionValues": ["20250115", "10"], "ErrorDetail": {"ErrorCode": "InternalServiceException"}}]}
+        reg.ensure([("20250115", "10")])
+        self.assertEqual(reg.ensure([("20250115", "10")]), [("20250115", "10")])
+
+
+if __name__ == "__main__":
+    unittest.main()
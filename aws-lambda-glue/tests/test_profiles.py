@@ -0,0 +1,36 @@
+import io
+import unittest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import profiles
+
+
+class TestProfiles(unittest.TestCase):
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            profiles.get_profile("rapido")
+
+    def test_options_ignore_columns_missing_from_the_schema(self):
+        schema = pa.schema([("num_cpf_cnpj", pa.string()), ("sistema", pa.string())])
+        opts = profiles.writer_options(profiles.get_profile("lookup"), schema)
+        self.assertEqual(opts["use_dictionary"], ["sistema"])
+        self.assertEqual([c.column_index for c in opts["sorting_columns"]], [0])
+        self.assertEqual(profiles.writer_options(profiles.get_profile("legacy"), schema),
+                         {"compression": "snappy"})
+
+    def test_lookup_profile_sorts_and_splits_row_groups(self):
+        n = 20_000
+        table = pa.table({"cod_idef_pess": [f"{i % 7}" for i in range(n)], "num_cpf_cnpj": [f"{i:011d}" for i in range(n)]})
+        buf = io.BytesIO()
+        profiles.write_table(table, buf, profiles.get_profile("lookup"))
+        parquet = pq.ParquetFile(io.BytesIO(buf.getvalue()))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(parquet.metadata.row_group(0).column(0).compression, "ZSTD")
+        keys = parquet.read().column("cod_idef_pess").to_pylist()
+        self.assertEqual(keys, sorted(keys))
+
+
+if __name__ == "__main__":
+    unittest.main()
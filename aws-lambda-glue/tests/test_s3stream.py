@@ -0,0 +1,102 @@
+import io
+import unittest
+
+import pyarrow.parquet as pq
+
+import profiles
+from columnar import ColumnarConverter
+from s3stream import MIN_PART_SIZE, PartitionedParquetStream, S3MultipartWriter
+from schema import FIELD_MAP, PARQUET_SCHEMA
+
+
+class FakeS3:
+    """Objetos concluídos em `objects`; uploads multipart abertos em `uploads`."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"u{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(Key)
+
+
+class TestS3MultipartWriter(unittest.TestCase):
+    def test_small_object_is_a_single_put(self):
+        s3 = FakeS3()
+        with S3MultipartWriter(s3, "bkt", "k") as sink:
+            sink.write(b"abc")
+        self.assertEqual(s3.objects, {"k": b"abc"})
+        self.assertEqual(s3.uploads, {})
+
+    def test_large_object_goes_in_parts(self):
+        s3 = FakeS3()
+        data = bytes(range(256)) * (MIN_PART_SIZE * 2 // 256 + 10)
+        sink = S3MultipartWriter(s3, "bkt", "k")
+        for i in range(0, len(data), 1_000_000):
+            sink.write(data[i:i + 1_000_000])
+        self.assertEqual(len(s3.uploads["u1"]), 2)
+        sink.close()
+        self.assertEqual(s3.objects["k"], data)
+
+    def test_abort_discards_the_upload(self):
+        s3 = FakeS3()
+        sink = S3MultipartWriter(s3, "bkt", "k")
+        sink.write(b"x" * (MIN_PART_SIZE + 1))
+        sink.abort()
+        self.assertEqual((s3.objects, s3.uploads, s3.aborted), ({}, {}, ["k"]))
+        self.assertTrue(sink.closed)
+
+
+class TestPartitionedParquetStream(unittest.TestCase):
+    def setUp(self):
+        self.s3 = FakeS3()
+        self.stream = PartitionedParquetStream(self.s3, "bkt", "bronze/eventos", PARQUET_SCHEMA,
+                                               profiles.get_profile("legacy"))
+
+    def chunk(self, *events):
+        batch = ColumnarConverter(FIELD_MAP, PARQUET_SCHEMA).new_batch()
+        for doc, ts in events:
+            batch.append({"documento_pessoa": doc, "id_evento": doc, "ts_evento": ts})
+        return batch
+
+    def test_one_file_per_partition_with_a_row_group_per_chunk(self):
+        self.stream.write(self.chunk(("1", "2025-01-15T10:00:00Z"), ("2", "2025-01-15T11:00:00Z")))
+        self.stream.write(self.chunk(("3", "2025-01-15T10:30:00Z")))
+        self.assertEqual(self.s3.objects, {})
+        written = self.stream.close()
+        self.assertEqual(self.stream.rows, 3)
+        self.assertEqual(sorted((d, h) for _, d, h in written), [("20250115", "10"), ("20250115", "11")])
+        for key, d, h in written:
+            self.assertTrue(key.startswith(f"bronze/eventos/anomesdia={d}/hh={h}/lote-"))
+        key = next(k for k, _, h in written if h == "10")
+        parquet = pq.ParquetFile(io.BytesIO(self.s3.objects[key]))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        self.assertEqual(parquet.read().column("num_cpf_cnpj").to_pylist(), ["1", "3"])
+
+    def test_abort_writes_nothing(self):
+        self.stream.write(self.chunk(("1", "2025-01-15T10:00:00Z")))
+        self.stream.abort()
+        self.assertEqual(self.s3.objects, {})
+        self.assertEqual(self.stream.close(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
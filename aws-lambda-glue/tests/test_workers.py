@@ -0,0 +1,47 @@
+import os
+import time
+import unittest
+
+from workers import ShardWorkers
+
+
+def work(shard):
+    # shards menores terminam por último: a ordem do resultado não depende de quem acaba antes
+    time.sleep(0.05 / len(shard))
+    if "falha" in shard:
+        raise ValueError("shard inválido")
+    if "morre" in shard:
+        os._exit(3)
+    return [s.upper() for s in shard], os.getpid()
+
+
+class TestShardWorkers(unittest.TestCase):
+    def setUp(self):
+        self.workers = ShardWorkers(3, work)
+        self.addCleanup(self.workers.close)
+
+    def test_results_follow_shard_order(self):
+        results = self.workers.map([["a"], ["b", "c"], ["d", "e", "f"]])
+        self.assertEqual([r for r, _ in results], [["A"], ["B", "C"], ["D", "E", "F"]])
+        self.assertEqual(len({pid for _, pid in results}), 3)
+        self.assertNotIn(os.getpid(), {pid for _, pid in results})
+
+    def test_failure_is_raised_after_draining_every_worker(self):
+        with self.assertRaisesRegex(RuntimeError, "ValueError: shard inválido"):
+            self.workers.map([["a"], ["falha"], ["c"]])
+        # nenhuma resposta sobrou nos pipes para a próxima invocação
+        self.assertEqual([r for r, _ in self.workers.map([["x"], ["y"]])], [["X"], ["Y"]])
+
+    def test_dead_worker_is_replaced(self):
+        with self.assertRaisesRegex(RuntimeError, "morreu"):
+            self.workers.map([["a"], ["morre"]])
+        self.assertEqual(len(self.workers), 3)
+        self.assertEqual([r for r, _ in self.workers.map([["a"], ["b"], ["c"]])], [["A"], ["B"], ["C"]])
+
+    def test_more_shards_than_workers(self):
+        with self.assertRaises(ValueError):
+            self.workers.map([["a"]] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
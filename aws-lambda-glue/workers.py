@@ -0,0 +1,84 @@
+# workers.py
+#
+# Processos de conversão que ficam quentes entre invocações, para usar os
+# vCPUs extras das Lambdas com mais memória.
+#
+# A Lambda não tem /dev/shm, então multiprocessing.Pool/Queue (que dependem
+# de semáforos POSIX) não funcionam; cada worker é um Process com um Pipe
+# próprio. Os processos são criados por fork no cold start, antes de
+# qualquer thread, e herdam a função de trabalho sem precisar de pickle.
+
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+
+def _serve(conn, fn):
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            conn.send((True, fn(task)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class ShardWorkers:
+    """
+    N processos que executam fn(shard). map() distribui um shard por worker
+    e devolve os resultados na ordem dos shards.
+    """
+
+    def __init__(self, size: int, fn):
+        self._ctx   = multiprocessing.get_context("fork")
+        self._fn    = fn
+        self._procs = [self._spawn() for _ in range(size)]
+
+    def __len__(self):
+        return len(self._procs)
+
+    def _spawn(self):
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_serve, args=(child, self._fn), daemon=True)
+        proc.start()
+        child.close()
+        return proc, parent
+
+    def map(self, shards: list) -> list:
+        if len(shards) > len(self._procs):
+            raise ValueError(f"{len(shards)} shards para {len(self._procs)} workers")
+        for (_, conn), shard in zip(self._procs, shards):
+            conn.send(shard)
+
+        # lê todas as respostas antes de falhar, para nenhum pipe ficar com
+        # resultado pendente para a próxima invocação
+        results, error = [], None
+        for n in range(len(shards)):
+            proc, conn = self._procs[n]
+            try:
+                ok, value = conn.recv()
+            except EOFError:
+                logger.error(f"Worker {proc.pid} morreu (exitcode={proc.exitcode}); recriando")
+                self._procs[n] = self._spawn()
+                ok, value = False, f"worker {proc.pid} morreu"
+            if not ok and error is None:
+                error = value
+            results.append(value)
+        if error is not None:
+            raise RuntimeError(f"Falha na conversão em paralelo: {error}")
+        return results
+
+    def close(self):
+        for proc, conn in self._procs:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+            proc.join(timeout=1)
+        self._procs = []
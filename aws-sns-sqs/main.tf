@@ -77,6 +77,10 @@ resource "aws_sns_topic_subscription" "sub_fila1" {
   protocol  = "sqs"
   endpoint  = aws_sqs_queue.fila1.arn
 
+  # entrega o payload sem o envelope SNS (o consumidor lê o JSON uma vez só);
+  # medir com aws-lambda-glue/bench_envelope.py antes de ligar
+  raw_message_delivery = false
+
   depends_on = [aws_sqs_queue_policy.fila1_policy]
 }
 
@@ -85,5 +89,9 @@ resource "aws_sns_topic_subscription" "sub_fila2" {
   protocol  = "sqs"
   endpoint  = aws_sqs_queue.fila2.arn
 
+  # entrega o payload sem o envelope SNS (o consumidor lê o JSON uma vez só);
+  # medir com aws-lambda-glue/bench_envelope.py antes de ligar
+  raw_message_delivery = false
+
   depends_on = [aws_sqs_queue_policy.fila2_policy]
 }
@@ -7,3 +7,5 @@ class Constants:
         "tipo_arquivo", "numero_documento", "data_inicio", "data_fim",
         "cnpj_base_participante", "agencia", "conta", "tipo_pessoa"
     ]
+    # contas por query coalescida (o texto da query do Athena é limitado a 256 KB)
+    MAX_BATCH_ACCOUNTS = 500
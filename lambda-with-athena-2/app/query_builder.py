@@ -1,11 +1,49 @@
+from athena_common import ColumnProjection, PartitionLayout, resolve_layout, resolve_projection, select_list
 from app.constants import Constants
 from app.services.data_service import PayloadModel
 
 class QueryBuilder:
-    def __init__(self, table_name: str = Constants.TABLE_NAME):
+    def __init__(self, table_name: str = Constants.TABLE_NAME, partition_layout: PartitionLayout = None,
+                 column_projection: ColumnProjection = None):
         self.table_name = table_name
+        self._partition_layout = partition_layout
+        self.column_projection = column_projection or resolve_projection(Constants.DATABASE, table_name)
+
+    @property
+    def partition_layout(self) -> PartitionLayout:
+        # resolvido no primeiro uso: ATHENA_PARTITION_LAYOUT ou catálogo do Glue
+        if self._partition_layout is None:
+            self._partition_layout = resolve_layout(Constants.DATABASE, self.table_name)
+        return self._partition_layout
+
+    def columns(self, payload: PayloadModel):
+        """Colunas projetadas (campos, perfil do cliente ou do tipo_arquivo) ou None para todas."""
+        return self.column_projection.columns(
+            payload.campos, payload.tipo_arquivo, payload.cnpj_base_participante
+        )
 
     def build_query(self, payload: PayloadModel) -> str:
+        account_clause = None
+        if payload.agencia and payload.conta:
+            account_clause = f"agencia = '{payload.agencia}' AND conta = '{payload.conta}'"
+        return self._select(self.columns(payload), self._where_clauses(payload, account_clause))
+
+    def build_batch_query(self, payloads: list) -> str:
+        """
+        Uma query para N consultas com a mesma batch_key(): as contas viram
+        um IN de tuplas. agencia/conta entram na projeção e na ordenação para
+        separar as linhas de volta por consulta em streaming, uma conta por vez.
+        """
+        payload = payloads[0]
+        accounts = dict.fromkeys((p.agencia, p.conta) for p in payloads)
+        rows = ", ".join(f"ROW('{agencia}', '{conta}')" for agencia, conta in accounts)
+        columns = self.columns(payload)
+        if columns:
+            columns = list(dict.fromkeys(["agencia", "conta"] + columns))
+        query = self._select(columns, self._where_clauses(payload, f"ROW(agencia, conta) IN ({rows})"))
+        return f"{query}\n        ORDER BY agencia, conta"
+
+    def _where_clauses(self, payload: PayloadModel, account_clause: str = None) -> list:
         where_clauses = []
         if payload.tipo_arquivo:
             where_clauses.append(f"tipo_arquivo = '{payload.tipo_arquivo}'")
@@ -18,14 +56,19 @@ class QueryBuilder:
                 where_clauses.append(f"data_vinculo >= '{payload.data_inicio}'")
         if payload.cnpj_base_participante:
             where_clauses.append(f"cnpj_base_participante = '{payload.cnpj_base_participante}'")
-        if payload.agencia and payload.conta:
-            where_clauses.append(f"agencia = '{payload.agencia}' AND conta = '{payload.conta}'")
+        if account_clause:
+            where_clauses.append(account_clause)
         if payload.tipo_pessoa:
             where_clauses.append(f"tipo_pessoa = '{payload.tipo_pessoa}'")
+        partition_predicate = self.partition_layout.predicate(payload.data_inicio, payload.data_fim)
+        if partition_predicate:
+            where_clauses.append(partition_predicate)
+        return where_clauses
 
+    def _select(self, columns: list, where_clauses: list) -> str:
         where_clause = " AND ".join(where_clauses)
         query = f"""
-        SELECT * 
+        SELECT {select_list(columns)} 
         FROM {self.table_name}
         WHERE {where_clause}
         """
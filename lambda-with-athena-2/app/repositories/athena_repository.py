@@ -1,24 +1,52 @@
-import time
+import os
 import boto3
+from athena_common import (
+    AthenaExecutor, ResultReader, ResultSetDecoder, UnloadExport, admission_from_env, single_flight_from_env,
+)
 
 class AthenaRepository:
     def __init__(self, database: str, output_bucket: str):
         self.client = boto3.client('athena')
         self.database = database
         self.output_bucket = output_bucket
+        self.result_reader = ResultReader(boto3.client('s3'))
+        # tipos das colunas de uma query finalizada (uma chamada a get_query_results)
+        self.decoder = ResultSetDecoder(self.client)
+        # consultas idênticas em andamento compartilham uma execução (None sem tabela de lease)
+        self.single_flight = single_flight_from_env()
+        # ATHENA_ADMISSION_SLOTS: teto de queries em execução entre invocações (None sem configuração)
+        self.admission = admission_from_env(self.client)
+        # um executor por repositório: guarda as execuções aderidas (nunca canceladas
+        # no timeout) e os slots de admissão até o wait_for_query liberá-los
+        self.executor = AthenaExecutor(
+            self.client, database=self.database, output_location=self.output_bucket,
+            result_reuse_minutes=int(os.getenv("ATHENA_RESULT_REUSE_MINUTES", "60")),
+            single_flight=self.single_flight, admission=self.admission,
+        )
+
+    def _unload(self) -> UnloadExport:
+        # ATHENA_UNLOAD_MIN_ROWS: a partir de quantas linhas a consulta vira UNLOAD (0 desliga)
+        return UnloadExport.from_env(self.executor, self.result_reader.s3_client)
 
     def execute_query(self, query: str) -> str:
-        response = self.client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={'Database': self.database},
-            ResultConfiguration={'OutputLocation': self.output_bucket}
-        )
-        return response['QueryExecutionId']
+        return self.executor.start(query)
+
+    def wait_for_query(self, query_execution_id: str, context=None) -> dict:
+        """
+        Aguarda a query com backoff (athena_common). Retorna o QueryExecution
+        em SUCCEEDED; FAILED/CANCELLED/timeout levantam os erros tipados.
+        """
+        return self.executor.wait(query_execution_id, context=context)
+
+    def iter_query_results(self, execution: dict):
+        """Record batches Arrow do CSV de saída, lidos sob demanda e tipados pelo ColumnInfo da query."""
+        schema = self.decoder.schema(execution["QueryExecutionId"])
+        return self.result_reader.iter_batches(execution, schema=schema)
+
+    def should_unload(self, query: str, context=None) -> bool:
+        """COUNT(*) prévio contra ATHENA_UNLOAD_MIN_ROWS (nenhuma query quando é 0)."""
+        return self._unload().should_unload(query, context)
 
-    def wait_for_query(self, query_execution_id: str):
-        while True:
-            response = self.client.get_query_execution(QueryExecutionId=query_execution_id)
-            status = response['QueryExecution']['Status']['State']
-            if status in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                return status
-            time.sleep(2)
+    def execute_unload(self, query: str, destination: str, tipo_arquivo: str, context=None) -> dict:
+        """UNLOAD para `destination`; retorna o manifesto dos arquivos gravados pelo Athena."""
+        return self._unload().run(query, destination, tipo_arquivo, context)
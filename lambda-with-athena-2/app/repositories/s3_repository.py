@@ -1,4 +1,6 @@
+import json
 import boto3
+from athena_common import S3MultipartWriter, deliver_athena_output
 
 class S3Repository:
     def __init__(self, bucket_name: str):
@@ -7,3 +9,24 @@ class S3Repository:
 
     def upload_file(self, file_path: str, key: str):
         self.s3.upload_file(file_path, self.bucket_name, key)
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket_name}/{key}"
+
+    def put_json(self, key: str, data: dict):
+        self.s3.put_object(Bucket=self.bucket_name, Key=key, Body=json.dumps(data, indent=4),
+                           ContentType="application/json")
+
+    def copy(self, source_key: str, key: str):
+        self.s3.copy_object(
+            Bucket=self.bucket_name, Key=key,
+            CopySource={'Bucket': self.bucket_name, 'Key': source_key},
+        )
+
+    def open_writer(self, key: str, content_type: str = "application/json") -> S3MultipartWriter:
+        """Stream de escrita para `key` (multipart upload em paralelo com quem escreve)."""
+        return S3MultipartWriter(self.s3, self.bucket_name, key, content_type=content_type)
+
+    def copy_athena_output(self, execution: dict, key: str):
+        """Entrega o CSV que o Athena gravou por cópia no servidor (multipart para objetos grandes)."""
+        deliver_athena_output(self.s3, execution, self.bucket_name, key)
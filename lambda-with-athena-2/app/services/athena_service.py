@@ -1,19 +1,98 @@
+import os
+from collections import defaultdict
+from athena_common import output_format, reaches_today, use_server_side_copy
 from app.query_builder import QueryBuilder
 
 class AthenaService:
-    def __init__(self, athena_repo, data_service, query_builder=None):
+    def __init__(self, athena_repo, data_service, query_builder=None, result_cache=None):
         self.athena_repo = athena_repo
         self.data_service = data_service
         self.query_builder = query_builder or QueryBuilder()
+        self.result_cache = result_cache
 
-    def query_and_process_data(self, payload, s3_repo, output_key):
+    def query_and_process_data(self, payload, s3_repo, output_key, context=None):
         query = self.query_builder.build_query(payload)
+        table = self.query_builder.table_name
+
+        generation = None
+        if self.result_cache:
+            entry, generation = self.result_cache.lookup(query, table, payload.tipo_arquivo)
+            if entry:
+                # resultado recente da mesma query: cópia no S3, sem Athena
+                s3_repo.copy(entry["output_key"], output_key)
+                return entry["query_execution_id"]
+
+        if self.athena_repo.should_unload(query, context):
+            return self.unload(query, payload, s3_repo, output_key, context)
+
         query_execution_id = self.athena_repo.execute_query(query)
-        status = self.athena_repo.wait_for_query(query_execution_id)
-        
-        if status != "SUCCEEDED":
-            raise Exception(f"Query failed with status: {status}")
-        
-        df = self.athena_repo.get_query_results_as_dataframe(query_execution_id)
-        json_data = self.data_service.convert_to_json(df)
-        self.data_service.save(json_data, s3_repo=s3_repo, key=output_key)
+        execution = self.athena_repo.wait_for_query(query_execution_id, context=context)
+
+        if use_server_side_copy(output_format(payload.tipo_arquivo, default="json")):
+            # o CSV de saída do Athena já é o arquivo pedido: cópia no S3, sem passar pela Lambda
+            s3_repo.copy_athena_output(execution, output_key)
+        else:
+            batches = self.athena_repo.iter_query_results(execution)
+            self.data_service.stream_output(batches, s3_repo, output_key, self.query_builder.columns(payload),
+                                            payload.tipo_arquivo)
+
+        if self.result_cache:
+            self.result_cache.store(query, table, query_execution_id, output_key,
+                                    generation, payload.tipo_arquivo, recent=reaches_today(payload.data_fim))
+        return query_execution_id
+
+    def unload(self, query, payload, s3_repo, output_key, context=None):
+        """
+        Consulta grande: o Athena grava os arquivos direto em `<output_key sem extensão>/`
+        via UNLOAD, sem as linhas passarem pela Lambda; o manifesto dos arquivos vai
+        para `<output_key sem extensão>.manifest.json`.
+        """
+        base = os.path.splitext(output_key)[0]
+        manifest = self.athena_repo.execute_unload(query, s3_repo.uri(f"{base}/"),
+                                                   payload.tipo_arquivo or "json", context)
+        manifest["campos"] = self.query_builder.columns(payload)
+        s3_repo.put_json(f"{base}.manifest.json", manifest)
+        return manifest["query_execution_id"]
+
+    def query_and_process_batch(self, batch, s3_repo, output_keys: list, context=None) -> list:
+        """
+        N consultas da mesma rajada (BatchPayloadModel), uma saída por consulta
+        em output_keys. Consultas que só diferem em agencia/conta viram uma
+        query só; o resultado, ordenado por conta, é lido em streaming e
+        separado de volta por (agencia, conta). Cada consulta continua no
+        cache com a sua query individual.
+
+        Returns:
+            list: query_execution_id de cada consulta, na ordem de batch.consultas.
+        """
+        table = self.query_builder.table_name
+        query_ids = [None] * len(batch.consultas)
+        groups = defaultdict(list)
+        for i, payload in enumerate(batch.consultas):
+            query = self.query_builder.build_query(payload)
+            generation = None
+            if self.result_cache:
+                entry, generation = self.result_cache.lookup(query, table, payload.tipo_arquivo)
+                if entry:
+                    s3_repo.copy(entry["output_key"], output_keys[i])
+                    query_ids[i] = entry["query_execution_id"]
+                    continue
+            groups[payload.batch_key()].append((i, payload, query, generation))
+
+        for pending in groups.values():
+            payloads = [payload for _, payload, _, _ in pending]
+            query_execution_id = self.athena_repo.execute_query(self.query_builder.build_batch_query(payloads))
+            execution = self.athena_repo.wait_for_query(query_execution_id, context=context)
+            outputs = defaultdict(list)
+            for i, payload, _, _ in pending:
+                outputs[(payload.agencia, payload.conta)].append(output_keys[i])
+            # mesma batch_key: projeção e tipo_arquivo iguais em todo o grupo
+            self.data_service.stream_accounts(self.athena_repo.iter_query_results(execution), s3_repo, outputs,
+                                              self.query_builder.columns(payloads[0]), payloads[0].tipo_arquivo)
+
+            for i, payload, query, generation in pending:
+                query_ids[i] = query_execution_id
+                if self.result_cache:
+                    self.result_cache.store(query, table, query_execution_id, output_keys[i], generation,
+                                            payload.tipo_arquivo, recent=reaches_today(payload.data_fim))
+        return query_ids
@@ -1,5 +1,12 @@
 import json
-from pydantic import BaseModel, ValidationError
+from itertools import groupby
+from operator import itemgetter
+import pyarrow as pa
+import pyarrow.compute as pc
+from athena_common import output_format
+from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError
+from app.constants import Constants
 
 class PayloadModel(BaseModel):
     tipo_arquivo: str
@@ -10,13 +17,70 @@ class PayloadModel(BaseModel):
     agencia: str
     conta: str
     tipo_pessoa: str
+    # projeção opcional; sem ela vale o perfil do cliente / tipo_arquivo
+    campos: Optional[List[str]] = None
+
+    def batch_key(self) -> tuple:
+        """Tudo menos agencia/conta: consultas com a mesma chave cabem em uma query só."""
+        fields = self.model_dump(exclude={"agencia", "conta"})
+        fields["campos"] = tuple(fields["campos"] or ())
+        return tuple(sorted(fields.items()))
+
+class BatchPayloadModel(BaseModel):
+    """Rajada de consultas (N contas) validadas com o PayloadModel de sempre."""
+    consultas: List[PayloadModel] = Field(..., min_length=1, max_length=Constants.MAX_BATCH_ACCOUNTS)
 
 class DataService:
-    def convert_to_json(self, df) -> str:
-        return df.to_json(orient='records', indent=4)
-
-    def save(self, json_data: str, s3_repo, key: str):
-        temp_file_path = '/tmp/temp_result.json'
-        with open(temp_file_path, 'w') as temp_file:
-            temp_file.write(json_data)
-        s3_repo.upload_file(temp_file_path, key)
+    def stream_output(self, batches, s3_repo, key: str, columns: list = None, tipo_arquivo: str = None) -> int:
+        """
+        Grava os record batches em `key` à medida que são lidos, via multipart
+        upload, no formato do tipo_arquivo (json, ndjson gzip, csv, parquet;
+        outros valores saem em JSON). Retorna o número de registros.
+        """
+        output = output_format(tipo_arquivo, default="json")
+        with s3_repo.open_writer(key, content_type=output.content_type) as writer:
+            return output.write(batches, writer, columns)
+
+    def stream_accounts(self, batches, s3_repo, outputs: dict, columns: list = None,
+                        tipo_arquivo: str = None) -> dict:
+        """
+        Separa o resultado de uma query coalescida (ordenado por agencia, conta)
+        em uma saída por conta, em streaming: cada trecho contíguo de uma conta
+        vai direto para o arquivo dela, então só um arquivo fica aberto por vez.
+
+        Args:
+            outputs (dict): {(agencia, conta): [key, ...]}; contas sem linhas
+                recebem um arquivo vazio e keys repetidas da mesma conta, uma cópia.
+
+        Returns:
+            dict: {key: número de registros}.
+        """
+        rows, seen = {}, set()
+        for account, runs in groupby(_account_runs(batches), key=itemgetter(0)):
+            if account in seen:
+                raise ValueError(f"Resultado fora de ordem: a conta {account} reapareceu")
+            seen.add(account)
+            keys = outputs.get(account)
+            if keys:
+                rows[keys[0]] = self.stream_output((batch for _, batch in runs), s3_repo, keys[0],
+                                                   columns, tipo_arquivo)
+        for account, keys in outputs.items():
+            if account not in seen:
+                rows[keys[0]] = self.stream_output(iter(()), s3_repo, keys[0], columns, tipo_arquivo)
+            for key in keys[1:]:
+                s3_repo.copy(keys[0], key)
+                rows[key] = rows[keys[0]]
+        return rows
+
+def _account_runs(batches):
+    """((agencia, conta), fatia do record batch) para cada trecho contíguo de uma mesma conta."""
+    for batch in batches:
+        if not batch.num_rows:
+            continue
+        agencia, conta = batch.column("agencia"), batch.column("conta")
+        # colunas tipadas pelo schema da query: a chave de comparação é sempre texto
+        keys = pc.binary_join_element_wise(pc.cast(agencia, pa.string()), pc.cast(conta, pa.string()), "\x1f")
+        changes = pc.indices_nonzero(pc.not_equal(keys[1:], keys[:-1])).to_pylist()
+        starts = [0] + [i + 1 for i in changes]
+        for start, end in zip(starts, starts[1:] + [batch.num_rows]):
+            yield (agencia[start].as_py(), conta[start].as_py()), batch.slice(start, end - start)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# athena_common é compartilhado entre os fluxos Athena (no deploy vai em uma layer)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "athena-common"))
@@ -2,8 +2,9 @@ from pydantic import BaseModel, ValidationError, validator
 import boto3
 import json
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+from athena_common import PartitionLayout, resolve_layout, resolve_projection, select_list
 
 # Configurações iniciais
 ATHENA_DATABASE = os.getenv("ATHENA_DATABASE")
@@ -21,6 +22,7 @@ class PayloadModel(BaseModel):
     data_inicio: Optional[str]
     data_fim: Optional[str]
     tipo_pessoa: Optional[str]
+    campos: Optional[List[str]] = None
 
     @validator("data_inicio", "data_fim", pre=True, always=True)
     def validate_dates(cls, value):
@@ -37,8 +39,11 @@ class PayloadModel(BaseModel):
 
 # Query Builder class
 class QueryBuilder:
-    def __init__(self, table: str):
+    def __init__(self, table: str, partition_layout: Optional[PartitionLayout] = None,
+                 columns: Optional[List[str]] = None):
         self.table = table
+        self.partition_layout = partition_layout
+        self.columns = columns
         self.conditions = []
 
     def add_condition(self, column: str, operator: str, value: Any, cast: Optional[str] = None):
@@ -49,10 +54,11 @@ class QueryBuilder:
         self.conditions.append(condition)
 
     def build(self) -> str:
+        projection = select_list(self.columns)
         if not self.conditions:
-            return f"SELECT * FROM {self.table}"
+            return f"SELECT {projection} FROM {self.table}"
         conditions_str = " AND ".join(self.conditions)
-        return f"SELECT * FROM {self.table} WHERE {conditions_str}"
+        return f"SELECT {projection} FROM {self.table} WHERE {conditions_str}"
 
     def from_payload(self, payload: PayloadModel) -> str:
         if payload.cnpj_base_participante:
@@ -65,6 +71,11 @@ class QueryBuilder:
             self.add_condition("data_inicio", ">=", f"DATE('{payload.data_inicio}')", cast="DATE")
         if payload.data_fim:
             self.add_condition("data_fim", "<=", f"DATE('{payload.data_fim}')", cast="DATE")
+        if self.partition_layout:
+            # poda de partições: o Athena só lista/lê as partições do intervalo
+            partition_predicate = self.partition_layout.predicate(payload.data_inicio, payload.data_fim)
+            if partition_predicate:
+                self.conditions.append(partition_predicate)
         return self.build()
 
 # Repository: Gerenciamento de dados com AWS
@@ -109,7 +120,11 @@ class QueryService:
             raise ValueError(f"Payload inválido: {e}")
 
         # Constrói a query usando o QueryBuilder
-        qb = QueryBuilder(ATHENA_TABLE)
+        # projeção validada contra o schema; coluna desconhecida vira 400 (ValueError)
+        columns = resolve_projection(ATHENA_DATABASE, ATHENA_TABLE).columns(
+            validated_payload.campos, validated_payload.tipo_arquivo, validated_payload.cnpj_base_participante
+        )
+        qb = QueryBuilder(ATHENA_TABLE, resolve_layout(ATHENA_DATABASE, ATHENA_TABLE), columns)
         query = qb.from_payload(validated_payload)
 
         # Executa a query no Athena
@@ -1,13 +1,85 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from app.repositories.athena_repository import AthenaRepository
+from athena_common import AdmissionController, QueryFailedError, QueryTimeoutError, result_schema
+from athena_common.singleflight import MemoryLeaseIndex, SingleFlight, query_hash
+
+MODULE = "app.repositories.athena_repository"
 
 class TestAthenaRepository(unittest.TestCase):
     def setUp(self):
-        self.repo = AthenaRepository("test_database", "s3://test-bucket/")
-        self.repo.client = MagicMock()
+        self.client = MagicMock()
+        self.repo = self.make_repo()
+
+    def make_repo(self, single_flight=None, admission=None):
+        with patch(f"{MODULE}.boto3.client", return_value=self.client), \
+                patch(f"{MODULE}.single_flight_from_env", return_value=single_flight), \
+                patch(f"{MODULE}.admission_from_env", return_value=admission):
+            return AthenaRepository("test_database", "s3://test-bucket/")
+
+    def running(self, query_execution_id):
+        self.client.get_query_execution.return_value = {
+            "QueryExecution": {"QueryExecutionId": query_execution_id, "Status": {"State": "RUNNING"}}
+        }
 
     def test_execute_query(self):
-        self.repo.client.start_query_execution.return_value = {"QueryExecutionId": "test_id"}
+        self.client.start_query_execution.return_value = {"QueryExecutionId": "test_id"}
         query_id = self.repo.execute_query("SELECT * FROM test_table")
         self.assertEqual(query_id, "test_id")
+
+    def test_wait_for_query_raises_on_failure(self):
+        self.client.get_query_execution.return_value = {
+            "QueryExecution": {"QueryExecutionId": "test_id",
+                               "Status": {"State": "FAILED", "StateChangeReason": "SYNTAX_ERROR"}}
+        }
+        with self.assertRaises(QueryFailedError):
+            self.repo.wait_for_query("test_id")
+
+    def test_wait_for_query_returns_execution(self):
+        self.client.get_query_execution.return_value = {
+            "QueryExecution": {"QueryExecutionId": "test_id", "Status": {"State": "SUCCEEDED"}}
+        }
+        execution = self.repo.wait_for_query("test_id")
+        self.assertEqual(execution["Status"]["State"], "SUCCEEDED")
+
+    def test_joined_query_is_not_stopped_on_timeout(self):
+        index = MemoryLeaseIndex()
+        repo = self.make_repo(single_flight=SingleFlight(index))
+        # outra invocação já lidera a mesma consulta
+        key = query_hash("SELECT 1", "test_database|s3://test-bucket/|None|")
+        index.acquire(key, "outra", 10 ** 10, 0)
+        index.attach(key, "outra", "lider_id")
+        self.running("lider_id")
+
+        query_id = repo.execute_query("SELECT 1")
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 1000
+        with self.assertRaises(QueryTimeoutError):
+            repo.wait_for_query(query_id, context)
+
+        self.assertEqual(query_id, "lider_id")
+        self.client.start_query_execution.assert_not_called()
+        self.client.stop_query_execution.assert_not_called()
+
+    def test_admission_slot_is_released_when_the_query_finishes(self):
+        index = MemoryLeaseIndex()
+        repo = self.make_repo(admission=AdmissionController(index, self.client, capacity=1))
+        self.client.start_query_execution.return_value = {"QueryExecutionId": "test_id"}
+        repo.execute_query("SELECT 1")
+        self.assertEqual(index.leases["slot#0"]["query_execution_id"], "test_id")
+
+        self.client.get_query_execution.return_value = {
+            "QueryExecution": {"QueryExecutionId": "test_id", "Status": {"State": "SUCCEEDED"}}
+        }
+        repo.wait_for_query("test_id")
+        self.assertEqual(index.leases, {})
+
+    def test_results_are_read_with_the_query_schema(self):
+        column_info = [{"Name": "agencia", "Type": "varchar"}, {"Name": "quantidade", "Type": "bigint"}]
+        self.client.get_query_results.return_value = {
+            "ResultSet": {"Rows": [], "ResultSetMetadata": {"ColumnInfo": column_info}}
+        }
+        self.repo.result_reader = MagicMock()
+        execution = {"QueryExecutionId": "test_id"}
+        self.repo.iter_query_results(execution)
+        self.repo.result_reader.iter_batches.assert_called_once_with(execution, schema=result_schema(column_info))
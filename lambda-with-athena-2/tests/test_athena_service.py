@@ -0,0 +1,153 @@
+import io
+import unittest
+from io import StringIO
+import pandas as pd
+import pyarrow as pa
+from unittest.mock import MagicMock
+from app.query_builder import QueryBuilder
+from app.services.athena_service import AthenaService
+from app.services.data_service import BatchPayloadModel, DataService, PayloadModel
+from athena_common import ColumnProjection, MemoryCacheIndex, PartitionLayout, ResultCache
+
+class ClosingBuffer(io.BytesIO):
+    """BytesIO que guarda o conteúdo ao fechar (no lugar do S3MultipartWriter)."""
+
+    def close(self):
+        self.value = self.getvalue()
+        super().close()
+
+def record_batch(**columns):
+    return pa.RecordBatch.from_pydict(columns)
+
+class TestAthenaService(unittest.TestCase):
+    def setUp(self):
+        self.athena_repo = MagicMock()
+        self.athena_repo.execute_query.return_value = "qid"
+        self.athena_repo.should_unload.return_value = False
+        self.data_service = MagicMock()
+        self.s3_repo = MagicMock()
+        self.service = AthenaService(self.athena_repo, self.data_service,
+                                     query_builder=QueryBuilder(partition_layout=PartitionLayout([]),
+                                                                column_projection=ColumnProjection()),
+                                     result_cache=ResultCache(MemoryCacheIndex()))
+        self.payload = PayloadModel(
+            tipo_arquivo="json", numero_documento="123", data_inicio="2023-01-01",
+            data_fim="2023-12-31", cnpj_base_participante="987654321",
+            agencia="1234", conta="567890", tipo_pessoa="F"
+        )
+
+    def test_repeated_lookup_is_served_from_cache(self):
+        self.service.query_and_process_data(self.payload, self.s3_repo, "out/1.json")
+        query_id = self.service.query_and_process_data(self.payload, self.s3_repo, "out/2.json")
+        self.assertEqual(query_id, "qid")
+        self.athena_repo.execute_query.assert_called_once()
+        self.s3_repo.copy.assert_called_once_with("out/1.json", "out/2.json")
+
+    def test_serializer_gets_the_projected_columns(self):
+        self.payload.campos = ["conta", "valor"]
+        self.service.query_and_process_data(self.payload, self.s3_repo, "out/1.json")
+        batches = self.athena_repo.iter_query_results.return_value
+        self.data_service.stream_output.assert_called_once_with(batches, self.s3_repo, "out/1.json",
+                                                                ["conta", "valor"], "json")
+        query = self.athena_repo.execute_query.call_args[0][0]
+        self.assertTrue(query.startswith("SELECT conta, valor"))
+
+    def test_large_lookup_is_unloaded(self):
+        self.athena_repo.should_unload.return_value = True
+        self.athena_repo.execute_unload.return_value = {"query_execution_id": "qid-unload", "arquivos": []}
+        self.s3_repo.uri.side_effect = lambda key: f"s3://bucket/{key}"
+
+        query_id = self.service.query_and_process_data(self.payload, self.s3_repo, "out/1.json")
+
+        self.assertEqual(query_id, "qid-unload")
+        self.athena_repo.execute_query.assert_not_called()
+        self.data_service.stream_output.assert_not_called()
+        query, destination, tipo_arquivo, _ = self.athena_repo.execute_unload.call_args[0]
+        self.assertEqual((destination, tipo_arquivo), ("s3://bucket/out/1/", "json"))
+        self.s3_repo.put_json.assert_called_once_with(
+            "out/1.manifest.json", {"query_execution_id": "qid-unload", "arquivos": [], "campos": None}
+        )
+
+    def test_batch_runs_one_query_and_splits_rows(self):
+        self.service.data_service = DataService()
+        written = {}
+        self.s3_repo.open_writer.side_effect = lambda key, content_type: written.setdefault(key, ClosingBuffer())
+        other = self.payload.model_copy(update={"agencia": "0002", "conta": "42"})
+        missing = self.payload.model_copy(update={"agencia": "0003", "conta": "7"})
+        # ordenado por agencia, conta; a conta 1234/567890 atravessa dois record batches
+        self.athena_repo.iter_query_results.return_value = iter([
+            record_batch(agencia=["0002", "1234"], conta=["42", "567890"], valor=["2", "1"]),
+            record_batch(agencia=["1234"], conta=["567890"], valor=["3"]),
+        ])
+        batch = BatchPayloadModel(consultas=[self.payload, other, missing])
+
+        ids = self.service.query_and_process_batch(batch, self.s3_repo, ["out/a.json", "out/b.json", "out/c.json"])
+
+        self.assertEqual(ids, ["qid", "qid", "qid"])
+        self.athena_repo.execute_query.assert_called_once()
+        self.assertTrue(self.athena_repo.execute_query.call_args[0][0].endswith("ORDER BY agencia, conta"))
+        saved = {key: pd.read_json(StringIO(buffer.value.decode()), dtype=str) for key, buffer in written.items()}
+        self.assertEqual(list(saved["out/a.json"]["valor"]), ["1", "3"])
+        self.assertEqual(list(saved["out/b.json"]["valor"]), ["2"])
+        self.assertTrue(saved["out/c.json"].empty)
+
+    def test_batch_copies_the_output_of_a_repeated_account(self):
+        self.service.data_service = DataService()
+        written = {}
+        self.s3_repo.open_writer.side_effect = lambda key, content_type: written.setdefault(key, ClosingBuffer())
+        self.athena_repo.iter_query_results.return_value = iter([
+            record_batch(agencia=["1234"], conta=["567890"], valor=["1"]),
+        ])
+        batch = BatchPayloadModel(consultas=[self.payload, self.payload])
+
+        self.service.query_and_process_batch(batch, self.s3_repo, ["out/a.json", "out/b.json"])
+
+        self.assertEqual(list(written), ["out/a.json"])
+        self.s3_repo.copy.assert_called_once_with("out/a.json", "out/b.json")
+
+    def test_batch_rejects_unordered_results(self):
+        self.service.data_service = DataService()
+        self.s3_repo.open_writer.side_effect = lambda key, content_type: ClosingBuffer()
+        other = self.payload.model_copy(update={"agencia": "0002", "conta": "42"})
+        self.athena_repo.iter_query_results.return_value = iter([
+            record_batch(agencia=["1234", "0002", "1234"], conta=["567890", "42", "567890"]),
+        ])
+        with self.assertRaises(ValueError):
+            self.service.query_and_process_batch(BatchPayloadModel(consultas=[self.payload, other]),
+                                                 self.s3_repo, ["out/a.json", "out/b.json"])
+
+    def test_batch_serves_cached_lookups_and_queries_the_rest(self):
+        self.service.query_and_process_data(self.payload, self.s3_repo, "out/1.json")
+        other = self.payload.model_copy(update={"agencia": "0002", "conta": "42"})
+        self.athena_repo.execute_query.return_value = "qid2"
+        self.athena_repo.iter_query_results.return_value = iter([record_batch(agencia=["0002"], conta=["42"])])
+        batch = BatchPayloadModel(consultas=[self.payload, other])
+
+        ids = self.service.query_and_process_batch(batch, self.s3_repo, ["out/a.json", "out/b.json"])
+
+        self.assertEqual(ids, ["qid", "qid2"])
+        self.s3_repo.copy.assert_called_once_with("out/1.json", "out/a.json")
+        batch_query = self.athena_repo.execute_query.call_args[0][0]
+        self.assertIn("IN (ROW('0002', '42'))", batch_query)
+
+    def test_batch_output_follows_tipo_arquivo(self):
+        self.service.data_service = DataService()
+        written = {}
+        self.s3_repo.open_writer.side_effect = lambda key, content_type: written.setdefault(
+            key, (ClosingBuffer(), content_type))[0]
+        self.athena_repo.iter_query_results.return_value = iter([record_batch(agencia=["1234"], conta=["567890"])])
+        payload = self.payload.model_copy(update={"tipo_arquivo": "csv"})
+
+        self.service.query_and_process_batch(BatchPayloadModel(consultas=[payload]), self.s3_repo, ["out/a.csv"])
+
+        buffer, content_type = written["out/a.csv"]
+        self.assertEqual(content_type, "text/csv")
+        self.assertEqual(buffer.value, b'"agencia","conta"\n"1234","567890"\n')
+
+    def test_csv_is_delivered_by_server_side_copy(self):
+        payload = self.payload.model_copy(update={"tipo_arquivo": "csv"})
+        execution = self.athena_repo.wait_for_query.return_value
+        self.service.query_and_process_data(payload, self.s3_repo, "out/1.csv")
+        self.s3_repo.copy_athena_output.assert_called_once_with(execution, "out/1.csv")
+        self.athena_repo.iter_query_results.assert_not_called()
+        self.data_service.stream_output.assert_not_called()
@@ -1,13 +1,19 @@
+import datetime
 import unittest
+from types import SimpleNamespace
+from athena_common import ColumnProjection, InvalidColumnsError, PartitionLayout
 from app.query_builder import QueryBuilder
 from app.services.data_service import PayloadModel
 
 class TestQueryBuilder(unittest.TestCase):
     def setUp(self):
-        self.query_builder = QueryBuilder()
-
-    def test_build_query(self):
-        payload = PayloadModel(
+        self.projection = ColumnProjection(
+            {"tipo_arquivo": {"csv": ["agencia", "conta", "valor"]}},
+            ["tipo_arquivo", "agencia", "conta", "valor", "data_vinculo", "anomesdia"],
+        )
+        self.query_builder = QueryBuilder(partition_layout=PartitionLayout.parse("anomesdia"),
+                                          column_projection=self.projection)
+        self.payload = PayloadModel(
             tipo_arquivo="example",
             numero_documento="123456789",
             data_inicio="2023-01-01",
@@ -17,5 +23,61 @@ class TestQueryBuilder(unittest.TestCase):
             conta="567890",
             tipo_pessoa="F"
         )
-        query = self.query_builder.build_query(payload)
+
+    def test_build_query(self):
+        query = self.query_builder.build_query(self.payload)
         self.assertIn("tipo_arquivo = 'example'", query)
+
+    def test_build_query_prunes_partitions(self):
+        query = self.query_builder.build_query(self.payload)
+        self.assertIn("data_vinculo BETWEEN '2023-01-01' AND '2023-12-31'", query)
+        self.assertTrue(query.endswith("AND anomesdia BETWEEN '20230101' AND '20231231'"))
+
+    def test_build_query_without_partition_layout(self):
+        query = QueryBuilder(partition_layout=PartitionLayout([]),
+                             column_projection=self.projection).build_query(self.payload)
+        self.assertNotIn("anomesdia", query)
+
+    def test_build_query_selects_every_column_without_projection(self):
+        self.assertTrue(self.query_builder.build_query(self.payload).startswith("SELECT * \n"))
+
+    def test_build_query_projects_profile_and_campos(self):
+        self.payload.tipo_arquivo = "csv"
+        self.assertTrue(self.query_builder.build_query(self.payload).startswith("SELECT agencia, conta, valor \n"))
+        self.payload.campos = ["valor", "data_vinculo"]
+        self.assertTrue(self.query_builder.build_query(self.payload).startswith("SELECT valor, data_vinculo \n"))
+
+    def test_build_query_rejects_unknown_columns(self):
+        self.payload.campos = ["saldo"]
+        with self.assertRaises(InvalidColumnsError):
+            self.query_builder.build_query(self.payload)
+
+    def test_build_batch_query_coalesces_accounts(self):
+        other = self.payload.model_copy(update={"agencia": "0002", "conta": "42"})
+        self.assertEqual(self.payload.batch_key(), other.batch_key())
+        query = self.query_builder.build_batch_query([self.payload, other, self.payload])
+        self.assertIn("ROW(agencia, conta) IN (ROW('1234', '567890'), ROW('0002', '42'))", query)
+        self.assertNotIn("agencia = ", query)
+        self.assertTrue(query.endswith("\n        ORDER BY agencia, conta"))
+
+    def test_build_batch_query_keeps_routing_columns(self):
+        self.payload.campos = ["valor"]
+        query = self.query_builder.build_batch_query([self.payload])
+        self.assertTrue(query.startswith("SELECT agencia, conta, valor \n"))
+
+    def test_main_query_builder_prunes_partitions(self):
+        import main
+        payload = SimpleNamespace(
+            cnpj_base_participante="987654321", agencia="1234", conta="567890",
+            data_inicio=datetime.date(2023, 2, 1), data_fim=datetime.date(2023, 2, 28)
+        )
+        layout = PartitionLayout.parse("ano:%Y:int,mes:%m")
+        query = main.QueryBuilder("tb_detalhamento_spec", layout, ["conta", "valor"]).from_payload(payload)
+        self.assertEqual(
+            query,
+            "SELECT conta, valor FROM tb_detalhamento_spec WHERE cnpj_base_participante = '987654321' "
+            "AND agencia = '1234' AND conta = '567890' "
+            "AND CAST(data_inicio AS DATE) >= DATE('2023-02-01') "
+            "AND CAST(data_fim AS DATE) <= DATE('2023-02-28') "
+            "AND ano = 2023 AND mes = '02'"
+        )
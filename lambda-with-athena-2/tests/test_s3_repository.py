@@ -10,3 +10,10 @@ class TestS3Repository(unittest.TestCase):
     def test_upload_file(self):
         self.repo.upload_file("path/to/file", "key")
         self.repo.s3.upload_file.assert_called_once_with("path/to/file", "test-bucket", "key")
+
+    def test_open_writer_small_object_is_a_put(self):
+        with self.repo.open_writer("out/1.json") as writer:
+            writer.write(b"[]")
+        self.repo.s3.put_object.assert_called_once_with(
+            Bucket="test-bucket", Key="out/1.json", Body=b"[]", ContentType="application/json"
+        )
@@ -1,31 +1,57 @@
 from config import ATHENA_DATABASE, S3_BUCKET, S3_PREFIX, logger
 from models.payload_model import PayloadModel
-from services.athena_service import execute_query, fetch_query_results
-from repository.s3_repository import save_to_s3
-from utils.query_builder import build_athena_query
+from services.athena_service import execute_query, wait_for_query, iter_query_results
+from repository.s3_repository import copy_athena_output, stream_to_s3
+from utils.query_builder import build_athena_query, TABLE_NAME
+from athena_common import cache_from_env, output_format, resolve_projection, use_server_side_copy
+
+# None quando RESULT_CACHE_TABLE / RESULT_CACHE_BUCKET não estão configurados
+result_cache = cache_from_env()
 
 def lambda_handler(event, context):
     try:
         logger.info("Validating input payload.")
         payload = PayloadModel(**event["payload"])
+        columns = resolve_projection(ATHENA_DATABASE, TABLE_NAME).columns(
+            payload.campos, payload.tipo_arquivo, payload.cnpj_base_participante
+        )
         query = build_athena_query(
             cnpj=payload.cnpj_base_participante,
             agencia=payload.agencia,
             conta=payload.conta,
+            columns=columns,
         )
+        generation = None
+        if result_cache:
+            entry, generation = result_cache.lookup(query, TABLE_NAME, payload.tipo_arquivo)
+            if entry:
+                return {"status": "success", "query_execution_id": entry["query_execution_id"],
+                        "s3_key": entry["output_key"]}
         logger.info("Executing Athena query.")
         query_execution_id = execute_query(
             query=query,
             database=ATHENA_DATABASE,
             output_location=f"s3://{S3_BUCKET}/{S3_PREFIX}",
         )
-        logger.info("Fetching query results.")
-        query_results = fetch_query_results(query_execution_id)
-        logger.info("Saving results to S3.")
-        s3_key = f"{S3_PREFIX}/{query_execution_id}.json"
-        save_to_s3(S3_BUCKET, s3_key, query_results)
+        execution = wait_for_query(query_execution_id, context)
+        output = output_format(payload.tipo_arquivo, default="json")
+        s3_key = output.file_name(f"{S3_PREFIX}/{query_execution_id}")
+        if output.extension == "csv":
+            # {qid}.csv é o próprio OutputLocation do Athena: entregar nessa chave copiaria
+            # o objeto sobre si mesmo (ou reescreveria o arquivo lido no streaming)
+            s3_key = output.file_name(f"{S3_PREFIX}/entregas/{query_execution_id}")
+        if use_server_side_copy(output):
+            logger.info("Copying Athena CSV output to S3.")
+            copy_athena_output(S3_BUCKET, s3_key, execution)
+        else:
+            logger.info("Streaming query results to S3.")
+            stream_to_s3(S3_BUCKET, s3_key, iter_query_results(execution), columns, output)
+        if result_cache:
+            # sem filtro de data, a consulta sempre alcança as partições do dia corrente
+            result_cache.store(query, TABLE_NAME, query_execution_id, s3_key,
+                               generation, payload.tipo_arquivo, recent=True)
         logger.info(f"Query executed successfully. Results saved to {s3_key}")
-        return {"status": "success", "query_execution_id": query_execution_id}
+        return {"status": "success", "query_execution_id": query_execution_id, "s3_key": s3_key}
     except Exception as e:
         logger.exception(f"Error occurred: {e}")
         return {"status": "error", "message": str(e)}
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 class PayloadModel(BaseModel):
@@ -9,3 +10,4 @@ class PayloadModel(BaseModel):
     agencia: str = Field(..., description="Bank branch")
     conta: str = Field(..., description="Account number")
     tipo_pessoa: str = Field(..., description="Person type (e.g., F for individual)")
+    campos: Optional[List[str]] = Field(None, description="Columns to return (default: profile or all)")
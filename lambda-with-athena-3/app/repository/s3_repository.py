@@ -1,19 +1,34 @@
-import json
 import boto3
+from athena_common import OutputFormat, S3MultipartWriter, deliver_athena_output, output_format
 from config import logger
 
 s3_client = boto3.client("s3")
 
-def save_to_s3(bucket: str, key: str, data: dict):
+def stream_to_s3(bucket: str, key: str, batches, columns: list = None, output: OutputFormat = None) -> int:
+    """
+    Serializa os record batches no formato pedido (JSON por padrão) enquanto
+    são lidos e envia por multipart upload; a memória fica limitada a poucas partes.
+    """
+    output = output or output_format("json")
     try:
-        logger.info(f"Saving JSON to S3: Bucket={bucket}, Key={key}")
-        s3_client.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=json.dumps(data, indent=4),
-            ContentType="application/json",
-        )
-        logger.info("JSON successfully saved to S3.")
+        logger.info(f"Streaming {output.name} to S3: Bucket={bucket}, Key={key}")
+        with S3MultipartWriter(s3_client, bucket, key, content_type=output.content_type) as writer:
+            rows = output.write(batches, writer, columns)
+        logger.info(f"File successfully saved to S3 ({rows} records).")
+        return rows
     except Exception as e:
         logger.exception(f"Failed to save to S3: {e}")
         raise
+
+
+def copy_athena_output(bucket: str, key: str, execution: dict) -> int:
+    """
+    Entrega o CSV que o Athena gravou em OutputLocation por cópia no servidor
+    (multipart para objetos grandes): os bytes do resultado não passam pela Lambda.
+    """
+    try:
+        logger.info(f"Copying Athena output to S3: Bucket={bucket}, Key={key}")
+        return deliver_athena_output(s3_client, execution, bucket, key)
+    except Exception as e:
+        logger.exception(f"Failed to copy Athena output: {e}")
+        raise
@@ -1,36 +1,36 @@
+import os
 import boto3
 from botocore.exceptions import ClientError
+from athena_common import AthenaExecutor, ResultReader, ResultSetDecoder, admission_from_env, single_flight_from_env
 from config import logger
 
 athena_client = boto3.client("athena")
+athena_executor = AthenaExecutor(
+    athena_client, result_reuse_minutes=int(os.getenv("ATHENA_RESULT_REUSE_MINUTES", "60")),
+    # consultas idênticas em andamento compartilham uma execução (None sem tabela de lease)
+    single_flight=single_flight_from_env(),
+    # ATHENA_ADMISSION_SLOTS: teto de queries em execução entre invocações (None sem configuração)
+    admission=admission_from_env(athena_client),
+)
+result_reader = ResultReader(boto3.client("s3"))
+# tipos das colunas de uma query finalizada (uma chamada a get_query_results)
+result_decoder = ResultSetDecoder(athena_client)
 
 def execute_query(query: str, database: str, output_location: str) -> str:
     try:
         logger.info(f"Executing Athena query: {query.strip()}")
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={"Database": database},
-            ResultConfiguration={"OutputLocation": output_location},
-        )
-        return response["QueryExecutionId"]
+        return athena_executor.start(query, database=database, output_location=output_location)
     except ClientError as e:
         logger.exception(f"Error executing Athena query: {e}")
         raise
 
-def fetch_query_results(query_execution_id: str) -> list:
-    try:
-        logger.info(f"Fetching Athena query results: QueryExecutionId={query_execution_id}")
-        results_paginator = athena_client.get_paginator("get_query_results")
-        results_iterator = results_paginator.paginate(QueryExecutionId=query_execution_id)
-        rows = []
-        for page in results_iterator:
-            rows.extend(page["ResultSet"]["Rows"])
-        headers = [col["VarCharValue"] for col in rows[0]["Data"]]
-        data = [
-            {headers[i]: value.get("VarCharValue", "") for i, value in enumerate(row["Data"])}
-            for row in rows[1:]
-        ]
-        return data
-    except ClientError as e:
-        logger.exception(f"Error fetching Athena query results: {e}")
-        raise
+def wait_for_query(query_execution_id: str, context=None) -> dict:
+    logger.info(f"Waiting for Athena query: QueryExecutionId={query_execution_id}")
+    return athena_executor.wait(query_execution_id, context=context)
+
+def iter_query_results(execution: dict):
+    logger.info(f"Fetching Athena query results: QueryExecutionId={execution['QueryExecutionId']}")
+    # CSV de saída do Athena lido por range GETs, em record batches sob demanda e tipados;
+    # NULL de texto vira "" como antes
+    schema = result_decoder.schema(execution["QueryExecutionId"])
+    return result_reader.iter_batches(execution, nulls=False, schema=schema)
@@ -1,6 +1,12 @@
-def build_athena_query(cnpj: str, agencia: str, conta: str) -> str:
+from athena_common import select_list
+
+TABLE_NAME = "tb_detalhamento_spec"
+
+# sem predicado de partição: a consulta do v3 não filtra por data_inicio/data_fim,
+# e podar partições pelo intervalo mudaria o resultado
+def build_athena_query(cnpj: str, agencia: str, conta: str, columns: list = None) -> str:
     return f"""
-    SELECT * FROM tb_detalhamento_spec
+    SELECT {select_list(columns)} FROM {TABLE_NAME}
     WHERE cnpj_base_participante = '{cnpj}'
       AND agencia = '{agencia}'
       AND conta = '{conta}'
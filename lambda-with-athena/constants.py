@@ -1,10 +1,16 @@
 
+DATABASE = "your_database_name"
+TABLE_NAME = "tb_detalhamento_spec"
+
+# {select_list}: projected columns (athena_common.projection), * when none were asked for
+# {partition_filter}: predicate on the table's date partitions (athena_common.partitions),
+# empty when the table has no date partition layout
 QUERY_TEMPLATE = """ 
-SELECT * 
+SELECT {select_list} 
 FROM tb_detalhamento_spec 
 WHERE data_inicio_vinculo BETWEEN '{data_inicio}' AND '{data_fim}' 
   AND numero_cnpj_base_instituicao_financeira = '{cnpj_base_participante}' 
   AND agencia_conta = '{agencia}' 
   AND numero_conta = '{conta}' 
-  AND tipo_pessoa = '{tipo_pessoa}';
+  AND tipo_pessoa = '{tipo_pessoa}'{partition_filter};
 """
@@ -2,6 +2,15 @@
 from models import QueryPayload
 from service import QueryService
 from pydantic import ValidationError
+from athena_common import (
+    SUCCEEDED,
+    AthenaThrottledError,
+    InvalidColumnsError,
+    QueryFailedError,
+    QueryTimeoutError,
+    complete_job,
+    jobs_from_env,
+)
 from aws_lambda_powertools import Logger
 
 logger = Logger(service="AthenaQueryService")
@@ -12,7 +21,14 @@ def lambda_handler(event, context):
         logger.info("Received event: %s", event)
         payload = QueryPayload(**event)
         query_service = QueryService()
-        result = query_service.execute_query(payload)
+        if query_service.jobs and not query_service.is_sharded(payload):
+            result = query_service.submit_query(payload, context)
+            return {
+                # 202 + job id; 200 when the cache already had the output
+                'statusCode': 202 if 'job_id' in result else 200,
+                'body': result
+            }
+        result = query_service.execute_query(payload, context)
         return {
             'statusCode': 200,
             'body': result
@@ -23,8 +39,68 @@ def lambda_handler(event, context):
             'statusCode': 400,
             'body': {'error': str(ve)}
         }
+    except InvalidColumnsError as ce:
+        logger.error("Invalid projection: %s", ce)
+        return {
+            'statusCode': 400,
+            'body': {'error': str(ce), 'campos': ce.columns}
+        }
+    except QueryFailedError as qe:
+        logger.error("Athena query failed: %s", qe)
+        return {
+            # ErrorCategory 2 = user error (invalid query)
+            'statusCode': 400 if qe.error_category == 2 else 500,
+            'body': {'error': str(qe), 'query_execution_id': qe.query_execution_id}
+        }
+    except AthenaThrottledError as re:
+        # no Athena slot (admission queue full or waited too long) or Athena throttled
+        logger.warning("Athena query not admitted: %s", re)
+        return {
+            'statusCode': 429,
+            'body': {'error': str(re)}
+        }
+    except QueryTimeoutError as te:
+        logger.error("Athena query timed out: %s", te)
+        return {
+            'statusCode': 504,
+            'body': {'error': str(te), 'query_execution_id': te.query_execution_id}
+        }
     except Exception as e:
         logger.exception("Unexpected error occurred: %s", e)
         return {
             'statusCode': 500,
             'body': {'error': 'An unexpected error occurred.', 'details': str(e)}}
+
+
+@logger.inject_lambda_context
+def status_handler(event, context):
+    """GET /jobs/{job_id}: state of an asynchronous lookup and, once delivered, where the output is."""
+    job_id = (event.get('pathParameters') or {}).get('job_id') or event.get('job_id')
+    jobs = jobs_from_env()
+    job = jobs.get(job_id) if jobs and job_id else None
+    if job is None:
+        return {
+            'statusCode': 404,
+            'body': {'error': 'Job not found.', 'job_id': job_id}
+        }
+    body = {'job_id': job_id, 'estado': job['estado']}
+    if job['resultado']:
+        body.update(job['resultado'])
+    if job['erro']:
+        body['error'] = job['erro']
+    return {
+        'statusCode': 200 if job['estado'] == SUCCEEDED or job['erro'] else 202,
+        'body': body
+    }
+
+
+@logger.inject_lambda_context
+def completion_handler(event, context):
+    """
+    Target of the EventBridge rule on "Athena Query State Change": delivers
+    the output of the job whose query finished and marks it done.
+    """
+    query_service = QueryService()
+    return complete_job(event, query_service.jobs, query_service.complete_job,
+                        query_service.athena_repository.athena_client,
+                        query_service.athena_repository.executor.admission)
@@ -1,9 +1,9 @@
 
 from pydantic import BaseModel, ConfigDict
-from typing import Literal
+from typing import List, Literal, Optional
 
 class QueryPayload(BaseModel):
-    tipo_arquivo: Literal['json', 'csv']
+    tipo_arquivo: Literal['json', 'csv', 'ndjson', 'parquet']
     numero_documento: str
     data_inicio: str
     data_fim: str
@@ -11,6 +11,8 @@ class QueryPayload(BaseModel):
     agencia: str
     conta: str
     tipo_pessoa: Literal['fisica', 'juridica']
+    # optional projection; falls back to the client / tipo_arquivo profile
+    campos: Optional[List[str]] = None
 
     model_config = ConfigDict(
         str_max_length=100,
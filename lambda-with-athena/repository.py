@@ -1,7 +1,17 @@
 
+import os
 import boto3
 from botocore.exceptions import ClientError
-from utils import AthenaUtils
+from athena_common import (
+    AthenaExecutor,
+    ResultReader,
+    ResultSetDecoder,
+    ShardedExport,
+    UnloadExport,
+    admission_from_env,
+    single_flight_from_env,
+)
+from constants import DATABASE
 from aws_lambda_powertools import Logger
 
 logger = Logger(service="AthenaRepository")
@@ -11,43 +21,93 @@ class AthenaRepository:
         self.athena_client = boto3.client('athena')
         self.s3_bucket = "ccsrelacionamentocliente-detalhamento-dev"
         self.s3_prefix = "athena_results/"
+        self.executor = AthenaExecutor(
+            self.athena_client,
+            database=DATABASE,
+            output_location=f's3://{self.s3_bucket}/{self.s3_prefix}',
+            result_reuse_minutes=int(os.getenv("ATHENA_RESULT_REUSE_MINUTES", "60")),
+            # identical lookups in flight share one execution (None without a lease table)
+            single_flight=single_flight_from_env(),
+            # ATHENA_ADMISSION_SLOTS caps running queries across invocations (None when unset)
+            admission=admission_from_env(self.athena_client)
+        )
+        self.result_reader = ResultReader()
+        # column types of a finished query (one get_query_results call), for the CSV reader
+        self.decoder = ResultSetDecoder(self.athena_client)
+        self.sharded_export = ShardedExport(
+            self.executor,
+            parallelism=int(os.getenv("ATHENA_SHARD_PARALLELISM", "4")),
+            unit=os.getenv("ATHENA_SHARD_UNIT", "month"),
+            # QUERY_TEMPLATE filters data_inicio_vinculo BETWEEN the shard's dates: one shard per row
+            disjoint=True
+        )
+        # ATHENA_UNLOAD_MIN_ROWS: from this many rows the lookup is exported by UNLOAD
+        self.unload_export = UnloadExport.from_env(self.executor)
 
-    def execute_and_fetch_results(self, query: str):
+    def execute(self, query: str, context=None):
+        """Run the query and return (query_execution_id, SUCCEEDED QueryExecution)."""
         try:
             logger.info("Executing Athena query...")
-            response = self.athena_client.start_query_execution(
-                QueryString=query,
-                QueryExecutionContext={'Database': 'your_database_name'},
-                ResultConfiguration={'OutputLocation': f's3://{self.s3_bucket}/{self.s3_prefix}'}
-            )
-            query_execution_id = response['QueryExecutionId']
-            logger.info(f"Athena query started with execution ID: {query_execution_id}")
-
-            results = self._fetch_results(query_execution_id)
-            return query_execution_id, results
+            query_execution_id = self.executor.start(query)
+            return query_execution_id, self.executor.wait(query_execution_id, context=context)
         except ClientError as e:
             logger.exception(f"Error executing query in Athena: {e}")
             raise
 
-    def _fetch_results(self, query_execution_id: str):
-        state = 'RUNNING'
-        while state in ['RUNNING', 'QUEUED']:
-            response = self.athena_client.get_query_execution(QueryExecutionId=query_execution_id)
-            state = response['QueryExecution']['Status']['State']
-            if state == 'SUCCEEDED':
-                logger.info("Athena query succeeded.")
-                break
-            elif state == 'FAILED':
-                reason = response['QueryExecution']['Status']['StateChangeReason']
-                logger.error(f"Athena query failed: {reason}")
-                raise RuntimeError(f"Athena query failed: {reason}")
-            elif state == 'CANCELLED':
-                logger.error("Athena query was cancelled.")
-                raise RuntimeError("Athena query was cancelled.")
-
-        paginator = self.athena_client.get_query_results(QueryExecutionId=query_execution_id)
-        rows = paginator['ResultSet']['Rows']
-
-        # Use utility class to transform results into a DataFrame
-        df = AthenaUtils.transform_results_to_dataframe(rows)
-        return df
+    def start(self, query: str, variant: str = "") -> str:
+        """
+        Submit the query without waiting (asynchronous jobs); returns its
+        QueryExecutionId. Identical in-flight queries with the same variant
+        share an execution, and so a job.
+        """
+        try:
+            logger.info("Submitting Athena query...")
+            return self.executor.submit(query, variant=variant)
+        except ClientError as e:
+            logger.exception(f"Error submitting query to Athena: {e}")
+            raise
+
+    def stream_results(self, execution: dict):
+        """
+        The CSV Athena wrote to OutputLocation, as an iterator of Arrow
+        record batches read on demand (all rows, never the whole result at once),
+        typed from the query's ColumnInfo.
+        """
+        schema = self.decoder.schema(execution['QueryExecutionId'])
+        return self.result_reader.iter_batches(execution, schema=schema)
+
+    def execute_sharded(self, data_inicio: str, data_fim: str, build_query, context=None) -> dict:
+        """
+        Run the export as one query per partition-aligned date shard, up to
+        ATHENA_SHARD_PARALLELISM at a time. Returns the manifest listing the
+        shard outputs in date order (read back with iter_manifest_batches).
+        """
+        try:
+            logger.info(f"Executing sharded Athena export {data_inicio}..{data_fim}")
+            return self.sharded_export.run([(data_inicio, data_fim)], build_query, context)
+        except ClientError as e:
+            logger.exception(f"Error executing sharded export in Athena: {e}")
+            raise
+
+    def should_unload(self, query: str, context=None) -> bool:
+        """Preflight COUNT(*) against ATHENA_UNLOAD_MIN_ROWS (no query when it is 0)."""
+        return self.unload_export.should_unload(query, context)
+
+    def execute_unload(self, query: str, destination: str, tipo_arquivo: str, context=None) -> dict:
+        """
+        UNLOAD the query into `destination`: Athena writes the files in
+        parallel, nothing is read back here. Returns the manifest of the files.
+        """
+        try:
+            logger.info(f"Executing Athena UNLOAD to {destination}")
+            return self.unload_export.run(query, destination, tipo_arquivo, context)
+        except ClientError as e:
+            logger.exception(f"Error executing UNLOAD in Athena: {e}")
+            raise
+
+    def start_unload(self, query: str, destination: str, tipo_arquivo: str) -> str:
+        """Submit the UNLOAD without waiting; unload_manifest() lists its files once it finished."""
+        return self.unload_export.start(query, destination, tipo_arquivo)
+
+    def unload_manifest(self, execution: dict, destination: str, tipo_arquivo: str) -> dict:
+        return self.unload_export.manifest(execution, destination, tipo_arquivo)
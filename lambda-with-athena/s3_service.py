@@ -1,5 +1,7 @@
 
+import json
 import boto3
+from athena_common import OutputFormat, S3MultipartWriter, deliver_athena_output, output_format
 from aws_lambda_powertools import Logger
 
 logger = Logger(service="S3Service")
@@ -10,22 +12,58 @@ class S3Service:
         self.s3_bucket = "ccsrelacionamentocliente-detalhamento-dev"
         self.s3_prefix = "athena_results/"
 
-    def save_dataframe_to_s3(self, df, file_name: str):
+    def save_batches_to_s3(self, batches, file_name: str, columns: list = None, output: OutputFormat = None):
         """
-        Save a Pandas DataFrame to S3 as a JSON file.
+        Stream query results to S3, serializing each record batch as it is
+        read and uploading through multipart upload.
 
         Args:
-            df (pd.DataFrame): DataFrame to save.
+            batches: Iterable of Arrow record batches (AthenaRepository.execute_and_stream_results).
             file_name (str): Name of the file to save in S3.
+            columns (list): Projected columns, in output order (None keeps the result's).
+            output (OutputFormat): File format (JSON array when None).
         """
-        json_content = df.to_json(orient="records", indent=4, force_ascii=False)
+        output = output or output_format("json")
         s3_path = f"{self.s3_prefix}{file_name}"
 
+        with S3MultipartWriter(self.s3_client, self.s3_bucket, s3_path,
+                               content_type=output.content_type) as writer:
+            rows = output.write(batches, writer, columns)
+        logger.info(f"{output.name} file with {rows} records saved to S3 at s3://{self.s3_bucket}/{s3_path}")
+        return s3_path
+
+    def copy_athena_output(self, execution: dict, file_name: str, metadata: dict = None):
+        """
+        Deliver a CSV result by server-side copy of the file Athena wrote
+        (multipart copy for large objects); no result bytes go through Lambda.
+
+        Args:
+            execution (dict): SUCCEEDED QueryExecution.
+            file_name (str): Name of the file to save in S3.
+            metadata (dict): Extra S3 metadata for the delivered object.
+        """
+        s3_path = f"{self.s3_prefix}{file_name}"
+        deliver_athena_output(self.s3_client, execution, self.s3_bucket, s3_path, metadata)
+        return s3_path
+
+    def s3_uri(self, file_name: str) -> str:
+        """s3:// URI of `file_name` under the results prefix (e.g. an UNLOAD destination)."""
+        return f"s3://{self.s3_bucket}/{self.s3_prefix}{file_name}"
+
+    def save_manifest(self, manifest: dict, file_name: str):
+        """
+        Save the manifest of a sharded or UNLOAD export (the output files, in order).
+
+        Args:
+            manifest (dict): Manifest built by ShardedExport or UnloadExport.
+            file_name (str): Name of the file to save in S3.
+        """
+        s3_path = f"{self.s3_prefix}{file_name}"
         self.s3_client.put_object(
             Bucket=self.s3_bucket,
             Key=s3_path,
-            Body=json_content,
+            Body=json.dumps(manifest, indent=4),
             ContentType="application/json"
         )
-        logger.info(f"JSON file saved to S3 at s3://{self.s3_bucket}/{s3_path}")
+        logger.info(f"Manifest saved to S3 at s3://{self.s3_bucket}/{s3_path}")
         return s3_path
@@ -1,8 +1,20 @@
 
+import os
 from repository import AthenaRepository
 from s3_service import S3Service
 from models import QueryPayload
-from constants import QUERY_TEMPLATE
+from constants import QUERY_TEMPLATE, TABLE_NAME, DATABASE
+from athena_common import (
+    RUNNING,
+    cache_from_env,
+    jobs_from_env,
+    output_format,
+    reaches_today,
+    resolve_layout,
+    resolve_projection,
+    select_list,
+    use_server_side_copy,
+)
 from datetime import datetime
 from aws_lambda_powertools import Logger
 
@@ -12,26 +24,162 @@ class QueryService:
     def __init__(self):
         self.athena_repository = AthenaRepository()
         self.s3_service = S3Service()
+        # None when neither RESULT_CACHE_TABLE nor RESULT_CACHE_BUCKET is set
+        self.result_cache = cache_from_env()
+        # ATHENA_PARTITION_LAYOUT or the Glue catalog (cached per container)
+        self.partition_layout = resolve_layout(DATABASE, TABLE_NAME)
+        # ATHENA_COLUMN_PROFILES, checked against the Glue schema
+        self.column_projection = resolve_projection(DATABASE, TABLE_NAME)
+        # ATHENA_JOBS_TABLE: lookups are answered with 202 and a job id (None = synchronous)
+        self.jobs = jobs_from_env()
 
-    def execute_query(self, payload: QueryPayload):
-        query = QUERY_TEMPLATE.format(
+    def columns(self, payload: QueryPayload):
+        return self.column_projection.columns(
+            payload.campos, payload.tipo_arquivo, payload.cnpj_base_participante
+        )
+
+    def build_query(self, payload: QueryPayload, columns: list = None) -> str:
+        partition_predicate = self.partition_layout.predicate(payload.data_inicio, payload.data_fim)
+        return QUERY_TEMPLATE.format(
+            select_list=select_list(columns),
             data_inicio=payload.data_inicio,
             data_fim=payload.data_fim,
             cnpj_base_participante=payload.cnpj_base_participante,
             agencia=payload.agencia,
             conta=payload.conta,
-            tipo_pessoa=payload.tipo_pessoa
+            tipo_pessoa=payload.tipo_pessoa,
+            partition_filter=f"\n  AND {partition_predicate}" if partition_predicate else ""
         )
-        logger.info(f"Generated query: {query}")
 
-        query_execution_id, df = self.athena_repository.execute_and_fetch_results(query)
+    def is_sharded(self, payload: QueryPayload) -> bool:
+        """Ranges longer than ATHENA_SHARD_MIN_DAYS (0 = never) go through execute_sharded."""
+        min_days = int(os.getenv("ATHENA_SHARD_MIN_DAYS", "0"))
+        if not min_days:
+            return False
+        span = datetime.strptime(payload.data_fim, "%Y-%m-%d") - datetime.strptime(payload.data_inicio, "%Y-%m-%d")
+        return span.days + 1 > min_days
+
+    def execute_sharded(self, payload: QueryPayload, context=None):
+        columns = self.columns(payload)
+
+        def build_shard_query(data_inicio, data_fim):
+            shard = payload.model_copy(update={'data_inicio': data_inicio, 'data_fim': data_fim})
+            return self.build_query(shard, columns)
+
+        manifest = self.athena_repository.execute_sharded(
+            payload.data_inicio, payload.data_fim, build_shard_query, context
+        )
+        manifest['tipo_arquivo'] = payload.tipo_arquivo
+        manifest['campos'] = columns
 
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        file_name = f"{payload.tipo_arquivo}_{timestamp}.json"
+        manifest_path = self.s3_service.save_manifest(manifest, f"{payload.tipo_arquivo}_{timestamp}.manifest.json")
+        return {
+            'query_execution_ids': [shard['query_execution_id'] for shard in manifest['shards']],
+            'manifest_path': manifest_path
+        }
+
+    def _base_name(self, tipo_arquivo: str) -> str:
+        return f"{tipo_arquivo}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+    def _save_unload_manifest(self, manifest: dict, base: str, columns: list = None):
+        manifest['campos'] = columns
+        return {
+            'query_execution_id': manifest['query_execution_id'],
+            'manifest_path': self.s3_service.save_manifest(manifest, f"{base}.manifest.json")
+        }
+
+    def execute_unload(self, payload: QueryPayload, query: str, columns: list = None, context=None):
+        base = self._base_name(payload.tipo_arquivo)
+        manifest = self.athena_repository.execute_unload(
+            query, self.s3_service.s3_uri(f"{base}/"), payload.tipo_arquivo, context
+        )
+        return self._save_unload_manifest(manifest, base, columns)
 
-        s3_path = self.s3_service.save_dataframe_to_s3(df, file_name)
+    def _cached(self, query: str, payload: QueryPayload):
+        """(response for a cache hit or None, cache generation to store the new result under)."""
+        if not self.result_cache:
+            return None, None
+        entry, generation = self.result_cache.lookup(query, TABLE_NAME, payload.tipo_arquivo)
+        if entry:
+            return {'query_execution_id': entry['query_execution_id'], 's3_path': entry['output_key']}, generation
+        return None, generation
+
+    def deliver(self, execution: dict, tipo_arquivo: str, columns: list = None, query: str = None,
+                generation: int = None, recent: bool = False):
+        """Write the output file of a SUCCEEDED query and cache it."""
+        output = output_format(tipo_arquivo)
+        file_name = output.file_name(self._base_name(tipo_arquivo))
+
+        if use_server_side_copy(output):
+            # Athena already wrote this exact CSV (same projection): copy it
+            s3_path = self.s3_service.copy_athena_output(execution, file_name)
+        else:
+            batches = self.athena_repository.stream_results(execution)
+            s3_path = self.s3_service.save_batches_to_s3(batches, file_name, columns, output)
+
+        if self.result_cache and query:
+            self.result_cache.store(query, TABLE_NAME, execution['QueryExecutionId'], s3_path,
+                                    generation, tipo_arquivo, recent=recent)
 
         return {
-            'query_execution_id': query_execution_id,
+            'query_execution_id': execution['QueryExecutionId'],
             's3_path': s3_path
         }
+
+    def execute_query(self, payload: QueryPayload, context=None):
+        if self.is_sharded(payload):
+            return self.execute_sharded(payload, context)
+
+        columns = self.columns(payload)
+        query = self.build_query(payload, columns)
+        logger.info(f"Generated query: {query}")
+
+        cached, generation = self._cached(query, payload)
+        if cached:
+            return cached
+
+        if self.athena_repository.should_unload(query, context):
+            return self.execute_unload(payload, query, columns, context)
+
+        _, execution = self.athena_repository.execute(query, context)
+        return self.deliver(execution, payload.tipo_arquivo, columns, query, generation,
+                            reaches_today(payload.data_fim))
+
+    def submit_query(self, payload: QueryPayload, context=None):
+        """
+        Asynchronous lookup: start the query, record the job and return
+        without waiting (the job id is the QueryExecutionId). complete_job
+        delivers the output when Athena's state-change event arrives.
+        A cache hit is answered right away, with no job.
+        """
+        columns = self.columns(payload)
+        query = self.build_query(payload, columns)
+        logger.info(f"Generated query: {query}")
+
+        cached, generation = self._cached(query, payload)
+        if cached:
+            return cached
+
+        request = {'tipo_arquivo': payload.tipo_arquivo, 'campos': columns}
+        if self.athena_repository.should_unload(query, context):
+            base = self._base_name(payload.tipo_arquivo)
+            destination = self.s3_service.s3_uri(f"{base}/")
+            job_id = self.athena_repository.start_unload(query, destination, payload.tipo_arquivo)
+            request.update(modo='unload', base=base, destino=destination)
+        else:
+            job_id = self.athena_repository.start(query, payload.tipo_arquivo)
+            request.update(modo='select', query=query, generation=generation,
+                           recente=reaches_today(payload.data_fim))
+
+        self.jobs.create(job_id, request)
+        return {'job_id': job_id, 'estado': RUNNING}
+
+    def complete_job(self, job: dict, execution: dict):
+        """Deliver the output of a finished job (see athena_common.complete_job)."""
+        request = job['pedido']
+        if request['modo'] == 'unload':
+            manifest = self.athena_repository.unload_manifest(execution, request['destino'], request['tipo_arquivo'])
+            return self._save_unload_manifest(manifest, request['base'], request['campos'])
+        return self.deliver(execution, request['tipo_arquivo'], request['campos'],
+                            request['query'], request['generation'], request.get('recente', True))